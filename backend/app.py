@@ -1,25 +1,60 @@
 from fastapi import FastAPI, Depends
-from sqlalchemy import create_engine
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from .models import Base, Task, StatusEnum, User, Contract, Payment, Shop, SecurityLog
+from .models import Base, Task, StatusEnum, User, Contract, Payment, Shop, Counter
 from datetime import datetime
-from .routes import shops, reports, cctv
-from .routes import contracts
-from .routes import permits
 from prometheus_fastapi_instrumentator import Instrumentator
+from .async_db import DB_MODE, get_async_db, dispose_async_engine
+from .db_config import DATABASE_URL, build_engine, log_active_profile
+from .migrate import upgrade_database
+from .write_queue import WRITE_QUEUE_ENABLED, writer
+from .services import counter_service
+from .db_metrics import QueryMetricsMiddleware
+from .password_hashing import pool as password_pool
+from .services import pdf_render_service, outbox_service, delivery_transport_service, blob_service, security_log_service
 
-DATABASE_URL = "sqlite:///../database/mall.db"
-engine = create_engine(DATABASE_URL, echo=True)
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+upgrade_database(engine)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# روترها get_db را از همین ماژول می‌گیرند؛ بعد از تعریف آن import می‌شوند
+from .routes import shops, reports, cctv
+from .routes import contracts
+from .routes import permits
+from .routes import blobs
+from .routes import search
+from .routes import operations
+from .routes import maintenance
+from .routes import tasks
 
 app = FastAPI(title="Mall System", version="1.0.0")
+if DB_MODE == "async":
+    # روترهای async قبل از نسخه sync ثبت می‌شوند تا مسیرهای مشترک را در اختیار بگیرند؛
+    # مسیرهایی که نسخه async ندارند (مثل PUT/DELETE تسک) از روتر sync سرویس داده می‌شوند
+    from .routes import tasks_async, permits_async, operations_async
+    app.include_router(tasks_async.router)
+    app.include_router(permits_async.router)
+    app.include_router(operations_async.router)
 app.include_router(shops.router)
 app.include_router(reports.router)
 app.include_router(cctv.router)
 app.include_router(contracts.router)
 app.include_router(permits.router)
+app.include_router(blobs.router)
+app.include_router(search.router)
+app.include_router(operations.router)
+app.include_router(maintenance.router)
+app.include_router(tasks.router)
+app.add_middleware(QueryMetricsMiddleware)
 Instrumentator().instrument(app).expose(app)
 
 class TaskCreate(BaseModel):
@@ -33,13 +68,6 @@ class TaskResponse(BaseModel):
     class Config:
         orm_mode = True
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @app.post("/api/tasks", response_model=TaskResponse)
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     new_task = Task(title=task.title)
@@ -53,15 +81,80 @@ def get_tasks(db: Session = Depends(get_db)):
     tasks = db.query(Task).all()
     return tasks
 
-@app.get("/api/dashboard/summary")
+DASHBOARD_COUNTERS = {
+    "active_users": "users.active",
+    "active_contracts": "contracts.active",
+    "open_tasks": "tasks.open",
+    "security_events": "security_logs.total"
+}
+
 def dashboard_summary(db: Session = Depends(get_db)):
-    active_users = db.query(User).filter(User.is_active == "1").count()
-    active_contracts = db.query(Contract).filter(Contract.status == "active").count()
-    open_tasks = db.query(Task).filter(Task.status != "green").count()
-    security_events = db.query(SecurityLog).count()
-    return {
-        "active_users": active_users,
-        "active_contracts": active_contracts,
-        "open_tasks": open_tasks,
-        "security_events": security_events
-    } 
\ No newline at end of file
+    values = counter_service.read_counters(db, list(DASHBOARD_COUNTERS.values()))
+    return {key: values[name] for key, name in DASHBOARD_COUNTERS.items()}
+
+async def dashboard_summary_async(db: AsyncSession = Depends(get_async_db)):
+    names = list(DASHBOARD_COUNTERS.values())
+    result = await db.execute(select(Counter.name, Counter.value).where(Counter.name.in_(names)))
+    values = dict(result.all())
+    return {key: values.get(name, 0) for key, name in DASHBOARD_COUNTERS.items()}
+
+app.add_api_route("/api/dashboard/summary", dashboard_summary_async if DB_MODE == "async" else dashboard_summary, methods=["GET"])
+
+@app.on_event("startup")
+def report_db_profile():
+    log_active_profile(engine)
+
+@app.on_event("startup")
+def start_db_writer():
+    if WRITE_QUEUE_ENABLED:
+        writer.start(sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine))
+
+@app.on_event("startup")
+def start_counter_reconciler():
+    counter_service.reconciler.start(engine)
+
+@app.on_event("startup")
+def start_outbox_dispatcher():
+    outbox_service.dispatcher.start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_outbox_dispatcher():
+    outbox_service.dispatcher.stop()
+    delivery_transport_service.close()
+
+@app.on_event("startup")
+def start_blob_collector():
+    blob_service.collector.start(engine)
+
+@app.on_event("shutdown")
+def stop_blob_collector():
+    blob_service.collector.stop()
+
+@app.on_event("startup")
+def start_security_log_maintainer():
+    security_log_service.maintainer.start(engine)
+
+@app.on_event("shutdown")
+def stop_security_log_maintainer():
+    security_log_service.maintainer.stop()
+
+@app.on_event("shutdown")
+def stop_counter_reconciler():
+    counter_service.reconciler.stop()
+
+@app.on_event("shutdown")
+def stop_db_writer():
+    writer.stop()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_pdf_render_pool():
+    pdf_render_service.pool.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
+
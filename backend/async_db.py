@@ -0,0 +1,38 @@
+# async_db.py
+# مسیر اختیاری async برای دیتابیس: AsyncEngine و AsyncSession به‌جای get_db
+# با DB_MODE=async در app.py روترهای async جایگزین مسیرهای پرترافیک می‌شوند
+
+import os
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from .db_config import DATABASE_URL, get_profile, engine_options, apply_sqlite_pragmas
+
+DB_MODE = os.environ.get("DB_MODE", "sync")  # sync | async
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+
+_async_engine = None
+_async_sessionmaker = None
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, profile_name: str = None):
+    profile = get_profile(profile_name)
+    engine = create_async_engine(url, **engine_options(url, profile, is_async=True))
+    apply_sqlite_pragmas(engine.sync_engine, profile["pragmas"])
+    return engine
+
+# موتور فقط در اولین استفاده ساخته می‌شود تا حالت sync به درایور async نیاز نداشته باشد
+def get_async_sessionmaker():
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        _async_engine = create_async_db_engine()
+        _async_sessionmaker = async_sessionmaker(_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_sessionmaker = None
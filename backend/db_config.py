@@ -0,0 +1,104 @@
+# db_config.py
+# پروفایل موتور دیتابیس: WAL، pragmaها، busy_timeout و pool مناسب SQLite فایل‌محور
+# انتخاب با متغیرهای محیطی DB_PROFILE (production | development) و SQL_ECHO
+
+import logging
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+# لاگر uvicorn در سطح INFO پیکربندی شده و گزارش شروع را نمایش می‌دهد
+logger = logging.getLogger("uvicorn.error")
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///../database/mall.db")
+DB_PROFILE = os.environ.get("DB_PROFILE", "production")
+SQL_ECHO = os.environ.get("SQL_ECHO", "0") == "1"
+
+PROFILES = {
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536")),  # مقدار منفی یعنی KiB
+            "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            "temp_store": "MEMORY",
+        },
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": 30,
+    },
+    "development": {
+        "pragmas": {
+            "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        },
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+    },
+}
+
+def get_profile(name: str = None) -> dict:
+    name = name or DB_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {name}")
+    return PROFILES[name]
+
+def is_memory_sqlite(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+# pragmaها روی هر اتصال جدید اعمال می‌شوند (برای موتور async روی engine.sync_engine)
+def apply_sqlite_pragmas(engine, pragmas: dict):
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+def engine_options(url, profile: dict, is_async: bool = False) -> dict:
+    options = {"echo": SQL_ECHO}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=profile["pool_size"], max_overflow=profile["max_overflow"], pool_timeout=profile["pool_timeout"], pool_pre_ping=True)
+        return options
+    if not is_async:
+        # اتصال در threadpool استارلت بین threadها جابه‌جا می‌شود
+        options["connect_args"] = {"check_same_thread": False}
+    if is_memory_sqlite(url):
+        # دیتابیس حافظه‌ای فقط روی یک اتصال مشترک معنا دارد
+        options["poolclass"] = StaticPool
+    else:
+        if not is_async:
+            options["poolclass"] = QueuePool
+        options.update(pool_size=profile["pool_size"], max_overflow=profile["max_overflow"], pool_timeout=profile["pool_timeout"])
+    return options
+
+def build_engine(url: str = DATABASE_URL, profile_name: str = None):
+    profile = get_profile(profile_name)
+    engine = create_engine(url, **engine_options(url, profile))
+    apply_sqlite_pragmas(engine, profile["pragmas"])
+    return engine
+
+def describe_engine(engine, profile_name: str = None) -> str:
+    profile_name = profile_name or DB_PROFILE
+    parts = [
+        f"profile={profile_name}",
+        f"url={engine.url.render_as_string(hide_password=True)}",
+        f"pool={type(engine.pool).__name__}(size={engine.pool.size() if hasattr(engine.pool, 'size') else 1})",
+        f"echo={SQL_ECHO}",
+    ]
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            for key in get_profile(profile_name)["pragmas"]:
+                parts.append(f"{key}={conn.exec_driver_sql(f'PRAGMA {key}').scalar()}")
+    return " ".join(parts)
+
+def log_active_profile(engine, profile_name: str = None):
+    logger.info("database engine: %s", describe_engine(engine, profile_name))
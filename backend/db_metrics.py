@@ -0,0 +1,114 @@
+# db_metrics.py
+# شمارش و زمان‌سنجی کوئری‌های SQL به‌ازای هر مسیر (route template) و خروجی Prometheus
+# رویدادهای cursor_execute روی همه Engineها ثبت می‌شوند؛ آمار هر درخواست در یک contextvar نگه داشته می‌شود
+# و در پایان درخواست در هیستوگرام‌ها کنار /metrics موجود ثبت می‌شود.
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377)
+
+DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "Number of SQL statements executed per request",
+    ["handler"],
+    buckets=STATEMENT_BUCKETS,
+)
+DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Total time spent in SQL statements per request",
+    ["handler"],
+)
+DB_SLOWEST = Histogram(
+    "http_request_db_slowest_statement_seconds",
+    "Duration of the slowest SQL statement per request",
+    ["handler"],
+)
+
+class QueryStats:
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.statements = [] if keep_statements else None
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        if self.statements is not None:
+            self.statements.append(statement)
+
+_current_stats = contextvars.ContextVar("db_query_stats", default=None)
+_observers = []
+
+# زمان شروع روی execution context همان دستور نگه داشته می‌شود؛ اگر دستور خطا بدهد after_cursor_execute
+# اجرا نمی‌شود و چیزی روی اتصال باقی نمی‌ماند
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "none"
+
+class QueryMetricsMiddleware:
+    # middleware خام ASGI؛ endpointهای sync در threadpool همان context را کپی می‌کنند
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats(keep_statements=bool(_observers))
+        token = _current_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_stats.reset(token)
+            handler = route_template(scope)
+            DB_STATEMENTS.labels(handler).observe(stats.count)
+            DB_TIME.labels(handler).observe(stats.total)
+            DB_SLOWEST.labels(handler).observe(stats.slowest)
+            for observer in list(_observers):
+                observer(handler, stats)
+
+# برای تست‌ها: آمار همه درخواست‌هایی که داخل بلوک اجرا می‌شوند جمع‌آوری می‌شود
+@contextmanager
+def capture_requests():
+    captured = []
+    observer = lambda handler, stats: captured.append((handler, stats))
+    _observers.append(observer)
+    try:
+        yield captured
+    finally:
+        _observers.remove(observer)
+
+# برای کارهای پس‌زمینه (بیرون از درخواست HTTP): دستورهای اجراشده داخل بلوک نگه داشته می‌شوند
+@contextmanager
+def capture_statements():
+    stats = QueryStats(keep_statements=True)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
@@ -0,0 +1,27 @@
+# migrate.py
+# اجرای مهاجرت‌های Alembic به‌جای Base.metadata.create_all
+# دیتابیس‌های قدیمی که با create_all ساخته شده‌اند ابتدا روی نسخه پایه stamp می‌شوند
+
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_REVISION = "0001"
+
+def alembic_config(connection=None) -> Config:
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def upgrade_database(engine, revision: str = "head"):
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables and "tasks" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
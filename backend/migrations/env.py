@@ -0,0 +1,58 @@
+import re
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from backend.db_config import DATABASE_URL
+from backend.models import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+PARTITION_TABLE = re.compile(r"^security_logs_\d{6}$")
+
+def include_name(name, type_, parent_names):
+    # جدول مجازی FTS5 جستجو و جدول‌های سایه آن خارج از metadata هستند (مهاجرت 0008)
+    if type_ == "table" and name is not None and (name == "search_index" or name.startswith("search_index_")):
+        return False
+    # پارتیشن‌های ماهانه لاگ امنیتی در زمان اجرا ساخته می‌شوند (security_log_service)
+    if type_ == "table" and name is not None and PARTITION_TABLE.match(name):
+        return False
+    return True
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or DATABASE_URL,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        render_as_batch=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # اتصال از migrate.upgrade_database (هنگام شروع برنامه) پاس داده می‌شود
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    section = config.get_section(config.config_ini_section, {})
+    section.setdefault("sqlalchemy.url", DATABASE_URL)
+    connectable = engine_from_config(section, prefix="sqlalchemy.", poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,85 @@
+"""search index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 08:55:26.285279
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# جستجوی FTS5 فقط روی SQLite؛ دستورها از search_service.schema_statements/backfill_statements (نسخه همین مهاجرت)
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(kind, title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6')",
+    "CREATE TRIGGER IF NOT EXISTS search_permit_requests_ai AFTER INSERT ON permit_requests BEGIN INSERT INTO search_documents (kind, ref_id) VALUES ('permit', new.id); INSERT INTO search_index (rowid, kind, title, body) VALUES ((SELECT id FROM search_documents WHERE kind = 'permit' AND ref_id = new.id), 'permit', COALESCE(new.company_name, ''), COALESCE(new.job_description, '') || ' ' || COALESCE(new.contact_no, '') || ' ' || COALESCE(new.job_location, '') || ' ' || COALESCE(new.onsite_in_charge, '') || ' ' || COALESCE(new.requested_by, '') || ' ' || COALESCE(new.ref, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS search_permit_requests_au AFTER UPDATE OF company_name, job_description, contact_no, job_location, onsite_in_charge, requested_by, ref ON permit_requests BEGIN UPDATE search_index SET title = COALESCE(new.company_name, ''), body = COALESCE(new.job_description, '') || ' ' || COALESCE(new.contact_no, '') || ' ' || COALESCE(new.job_location, '') || ' ' || COALESCE(new.onsite_in_charge, '') || ' ' || COALESCE(new.requested_by, '') || ' ' || COALESCE(new.ref, '') WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'permit' AND ref_id = new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_permit_requests_ad AFTER DELETE ON permit_requests BEGIN DELETE FROM search_index WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'permit' AND ref_id = old.id); DELETE FROM search_documents WHERE kind = 'permit' AND ref_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_tasks_ai AFTER INSERT ON tasks BEGIN INSERT INTO search_documents (kind, ref_id) VALUES ('task', new.id); INSERT INTO search_index (rowid, kind, title, body) VALUES ((SELECT id FROM search_documents WHERE kind = 'task' AND ref_id = new.id), 'task', COALESCE(new.title, ''), COALESCE(new.description, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS search_tasks_au AFTER UPDATE OF title, description ON tasks BEGIN UPDATE search_index SET title = COALESCE(new.title, ''), body = COALESCE(new.description, '') WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'task' AND ref_id = new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_tasks_ad AFTER DELETE ON tasks BEGIN DELETE FROM search_index WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'task' AND ref_id = old.id); DELETE FROM search_documents WHERE kind = 'task' AND ref_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_contracts_ai AFTER INSERT ON contracts BEGIN INSERT INTO search_documents (kind, ref_id) VALUES ('contract', new.id); INSERT INTO search_index (rowid, kind, title, body) VALUES ((SELECT id FROM search_documents WHERE kind = 'contract' AND ref_id = new.id), 'contract', COALESCE((SELECT shop_name FROM tenants WHERE id = new.tenant_id), ''), COALESCE((SELECT name FROM shops WHERE id = new.shop_id), '') || ' ' || COALESCE((SELECT location FROM shops WHERE id = new.shop_id), '')); END",
+    "CREATE TRIGGER IF NOT EXISTS search_contracts_au AFTER UPDATE OF tenant_id, shop_id ON contracts BEGIN UPDATE search_index SET title = COALESCE((SELECT shop_name FROM tenants WHERE id = new.tenant_id), ''), body = COALESCE((SELECT name FROM shops WHERE id = new.shop_id), '') || ' ' || COALESCE((SELECT location FROM shops WHERE id = new.shop_id), '') WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'contract' AND ref_id = new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_contracts_ad AFTER DELETE ON contracts BEGIN DELETE FROM search_index WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'contract' AND ref_id = old.id); DELETE FROM search_documents WHERE kind = 'contract' AND ref_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_tenants_contracts_au AFTER UPDATE OF shop_name ON tenants BEGIN UPDATE search_index SET title = COALESCE((SELECT shop_name FROM tenants WHERE id = src.tenant_id), ''), body = COALESCE((SELECT name FROM shops WHERE id = src.shop_id), '') || ' ' || COALESCE((SELECT location FROM shops WHERE id = src.shop_id), '') FROM (SELECT d.id AS doc_id, c.* FROM contracts c JOIN search_documents d ON d.kind = 'contract' AND d.ref_id = c.id WHERE c.tenant_id = new.id) AS src WHERE search_index.rowid = src.doc_id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_shops_contracts_au AFTER UPDATE OF name, location ON shops BEGIN UPDATE search_index SET title = COALESCE((SELECT shop_name FROM tenants WHERE id = src.tenant_id), ''), body = COALESCE((SELECT name FROM shops WHERE id = src.shop_id), '') || ' ' || COALESCE((SELECT location FROM shops WHERE id = src.shop_id), '') FROM (SELECT d.id AS doc_id, c.* FROM contracts c JOIN search_documents d ON d.kind = 'contract' AND d.ref_id = c.id WHERE c.shop_id = new.id) AS src WHERE search_index.rowid = src.doc_id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_tenants_ai AFTER INSERT ON tenants BEGIN INSERT INTO search_documents (kind, ref_id) VALUES ('tenant', new.id); INSERT INTO search_index (rowid, kind, title, body) VALUES ((SELECT id FROM search_documents WHERE kind = 'tenant' AND ref_id = new.id), 'tenant', COALESCE(new.shop_name, ''), COALESCE(new.contract_info, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS search_tenants_au AFTER UPDATE OF shop_name, contract_info ON tenants BEGIN UPDATE search_index SET title = COALESCE(new.shop_name, ''), body = COALESCE(new.contract_info, '') WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'tenant' AND ref_id = new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_tenants_ad AFTER DELETE ON tenants BEGIN DELETE FROM search_index WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'tenant' AND ref_id = old.id); DELETE FROM search_documents WHERE kind = 'tenant' AND ref_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS search_complaints_ai AFTER INSERT ON complaints BEGIN INSERT INTO search_documents (kind, ref_id) VALUES ('complaint', new.id); INSERT INTO search_index (rowid, kind, title, body) VALUES ((SELECT id FROM search_documents WHERE kind = 'complaint' AND ref_id = new.id), 'complaint', COALESCE(new.description, ''), ''); END",
+    "CREATE TRIGGER IF NOT EXISTS search_complaints_au AFTER UPDATE OF description ON complaints BEGIN UPDATE search_index SET title = COALESCE(new.description, ''), body = '' WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'complaint' AND ref_id = new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_complaints_ad AFTER DELETE ON complaints BEGIN DELETE FROM search_index WHERE rowid = (SELECT id FROM search_documents WHERE kind = 'complaint' AND ref_id = old.id); DELETE FROM search_documents WHERE kind = 'complaint' AND ref_id = old.id; END",
+]
+
+BACKFILL = [
+    "INSERT INTO search_documents (kind, ref_id) SELECT 'permit', id FROM permit_requests WHERE true ORDER BY rowid ON CONFLICT (kind, ref_id) DO NOTHING",
+    "INSERT INTO search_index (rowid, kind, title, body) SELECT d.id, 'permit', COALESCE(c.company_name, ''), COALESCE(c.job_description, '') || ' ' || COALESCE(c.contact_no, '') || ' ' || COALESCE(c.job_location, '') || ' ' || COALESCE(c.onsite_in_charge, '') || ' ' || COALESCE(c.requested_by, '') || ' ' || COALESCE(c.ref, '') FROM permit_requests c JOIN search_documents d ON d.kind = 'permit' AND d.ref_id = c.id ORDER BY d.id",
+    "INSERT INTO search_documents (kind, ref_id) SELECT 'task', id FROM tasks WHERE true ORDER BY rowid ON CONFLICT (kind, ref_id) DO NOTHING",
+    "INSERT INTO search_index (rowid, kind, title, body) SELECT d.id, 'task', COALESCE(c.title, ''), COALESCE(c.description, '') FROM tasks c JOIN search_documents d ON d.kind = 'task' AND d.ref_id = c.id ORDER BY d.id",
+    "INSERT INTO search_documents (kind, ref_id) SELECT 'contract', id FROM contracts WHERE true ORDER BY rowid ON CONFLICT (kind, ref_id) DO NOTHING",
+    "INSERT INTO search_index (rowid, kind, title, body) SELECT d.id, 'contract', COALESCE((SELECT shop_name FROM tenants WHERE id = c.tenant_id), ''), COALESCE((SELECT name FROM shops WHERE id = c.shop_id), '') || ' ' || COALESCE((SELECT location FROM shops WHERE id = c.shop_id), '') FROM contracts c JOIN search_documents d ON d.kind = 'contract' AND d.ref_id = c.id ORDER BY d.id",
+    "INSERT INTO search_documents (kind, ref_id) SELECT 'tenant', id FROM tenants WHERE true ORDER BY rowid ON CONFLICT (kind, ref_id) DO NOTHING",
+    "INSERT INTO search_index (rowid, kind, title, body) SELECT d.id, 'tenant', COALESCE(c.shop_name, ''), COALESCE(c.contract_info, '') FROM tenants c JOIN search_documents d ON d.kind = 'tenant' AND d.ref_id = c.id ORDER BY d.id",
+    "INSERT INTO search_documents (kind, ref_id) SELECT 'complaint', id FROM complaints WHERE true ORDER BY rowid ON CONFLICT (kind, ref_id) DO NOTHING",
+    "INSERT INTO search_index (rowid, kind, title, body) SELECT d.id, 'complaint', COALESCE(c.description, ''), '' FROM complaints c JOIN search_documents d ON d.kind = 'complaint' AND d.ref_id = c.id ORDER BY d.id",
+    "INSERT INTO search_index (search_index) VALUES ('optimize')",
+]
+
+TRIGGERS = [st.split()[5] for st in SCHEMA[1:]]
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('ref_id', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('search_documents', schema=None) as batch_op:
+        batch_op.create_index('ix_search_documents_kind_ref_id', ['kind', 'ref_id'], unique=True)
+
+    # ### end Alembic commands ###
+
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SCHEMA + BACKFILL:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS search_index')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('search_documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_documents_kind_ref_id')
+
+    op.drop_table('search_documents')
+    # ### end Alembic commands ###
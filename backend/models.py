@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum as SqlEnum, DateTime, ForeignKey, Text, Integer, Float, Table
+from sqlalchemy import Column, String, Enum as SqlEnum, Date, DateTime, ForeignKey, Text, Integer, Float, Table, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 from enum import Enum
@@ -21,6 +21,11 @@ class TaskStatusEnum(str, Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_department_created_at", "department_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at", "status", "created_at", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
@@ -35,6 +40,9 @@ class Task(Base):
 
 class WorkflowStep(Base):
     __tablename__ = "workflow_steps"
+    __table_args__ = (
+        Index("ix_workflow_steps_task_timestamp", "task_id", "timestamp"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     task_id = Column(String, ForeignKey('tasks.id'))
     step = Column(String)
@@ -54,6 +62,9 @@ class Complaint(Base):
 
 class MaintenanceRequest(Base):
     __tablename__ = "maintenance_requests"
+    __table_args__ = (
+        Index("ix_maintenance_requests_status_created_at", "status", "created_at", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = Column(String, ForeignKey('tenants.id'))
     description = Column(String, nullable=False)
@@ -78,6 +89,12 @@ class ContractStatusEnum(str, Enum):
 
 class Contract(Base):
     __tablename__ = "contracts"
+    __table_args__ = (
+        Index("ix_contracts_start_date_id", "start_date", "id"),
+        Index("ix_contracts_shop_status_dates", "shop_id", "status", "start_date", "end_date"),
+        Index("ix_contracts_status_start_date", "status", "start_date", "id"),
+        Index("ix_contracts_tenant_start_date", "tenant_id", "start_date", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = Column(String, ForeignKey('tenants.id'))
     shop_id = Column(String, ForeignKey('shops.id'), nullable=False)  # ارتباط با مغازه
@@ -96,16 +113,27 @@ class Payment(Base):
     paid_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="paid")
 
-class SecurityLog(Base):
-    __tablename__ = "security_logs"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    store_id = Column(String, nullable=False)
-    check_time = Column(DateTime, default=datetime.utcnow)
-    status = Column(String, nullable=False)
-    guard_id = Column(String, ForeignKey('users.id'))
+class SecurityLogPartition(Base):
+    # فهرست پارتیشن‌های ماهانه لاگ امنیتی (جدول‌های security_logs_YYYYMM در security_log_service ساخته می‌شوند)
+    __tablename__ = "security_log_partitions"
+    __table_args__ = (
+        Index("ix_security_log_partitions_state_starts_at", "state", "starts_at"),
+    )
+    month = Column(String, primary_key=True)  # YYYY-MM
+    table_name = Column(String, nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)  # انحصاری: ابتدای ماه بعد
+    state = Column(String, nullable=False, default="active")  # active, archived
+    row_count = Column(Integer, nullable=True)  # تعداد سطرها هنگام آرشیو
+    archive_path = Column(String, nullable=True)  # فایل NDJSON.gz آرشیو (اگر SECURITY_LOG_ARCHIVE_DIR تنظیم شده باشد)
+    archived_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Shop(Base):
     __tablename__ = "shops"
+    __table_args__ = (
+        Index("ix_shops_location_id", "location", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False)
     location = Column(String)
@@ -113,6 +141,10 @@ class Shop(Base):
 
 class Rental(Base):
     __tablename__ = "rentals"
+    __table_args__ = (
+        Index("ix_rentals_start_date_id", "start_date", "id"),
+        Index("ix_rentals_shop_start_date", "shop_id", "start_date", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     shop_id = Column(String, ForeignKey('shops.id'))
     tenant = Column(String, nullable=False)
@@ -143,6 +175,10 @@ class Department(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_id", "role_id"),
+        Index("ix_users_department_id", "department_id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     username = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
@@ -161,10 +197,13 @@ class Tenant(Base):
     shop_name = Column(String, nullable=False)
     user_id = Column(String, ForeignKey('users.id'))
     contract_info = Column(String, nullable=True)
-    user = relationship("User") 
+    user = relationship("User", foreign_keys=[user_id])
 
 class ContractWorkflowStep(Base):
     __tablename__ = "contract_workflow_steps"
+    __table_args__ = (
+        Index("ix_contract_workflow_steps_contract_timestamp", "contract_id", "timestamp"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     contract_id = Column(String, ForeignKey('contracts.id'))
     step = Column(String)  # نام مرحله (مثلاً: ثبت اولیه، تایید مدیر، ...)
@@ -176,6 +215,14 @@ class ContractWorkflowStep(Base):
 
 class PermitRequest(Base):
     __tablename__ = "permit_requests"
+    __table_args__ = (
+        Index("ix_permit_requests_date_id", "date", "id"),
+        Index("ix_permit_requests_status_date", "status", "date", "id"),
+        Index("ix_permit_requests_facilities_approved", "facilities_approved"),
+        Index("ix_permit_requests_marketing_approved", "marketing_approved"),
+        Index("ix_permit_requests_operations_approved", "operations_approved"),
+        Index("ix_permit_requests_company_license_sha256", "company_license_sha256"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     date = Column(DateTime, default=datetime.utcnow)
     company_name = Column(String)
@@ -212,26 +259,66 @@ class PermitRequest(Base):
     need_mall_staff = Column(String, nullable=True)  # نیاز به همراهی پرسنل مال
     extra_notes = Column(Text, nullable=True)  # توضیحات تکمیلی
     company_license_url = Column(String, nullable=True)  # آدرس فایل مجوز شرکت
+    company_license_sha256 = Column(String, ForeignKey('blobs.sha256', name='fk_permit_requests_company_license_sha256'), nullable=True)
 
 class WorkerPermit(Base):
     __tablename__ = "worker_permits"
+    __table_args__ = (
+        Index("ix_worker_permits_permit_request_id", "permit_request_id"),
+        Index("ix_worker_permits_id_card_sha256", "id_card_sha256"),
+        Index("ix_worker_permits_insurance_sha256", "insurance_sha256"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     permit_request_id = Column(String, ForeignKey('permit_requests.id'))
     name = Column(String, nullable=False)
     code = Column(String, nullable=True)
     id_card_url = Column(String, nullable=True)  # آدرس تصویر کارت شناسایی
     insurance_url = Column(String, nullable=True)  # آدرس فایل بیمه
+    id_card_sha256 = Column(String, ForeignKey('blobs.sha256', name='fk_worker_permits_id_card_sha256'), nullable=True)
+    insurance_sha256 = Column(String, ForeignKey('blobs.sha256', name='fk_worker_permits_insurance_sha256'), nullable=True)
     permit_request = relationship("PermitRequest", backref="workers")
 
+class PermitApproval(Base):
+    # وضعیت تایید هر دپارتمان برای مجوز (facilities, marketing, operations)؛ ستون‌های *_approved مجوز هم‌زمان به‌روز می‌شوند
+    __tablename__ = "permit_approvals"
+    __table_args__ = (
+        Index("ix_permit_approvals_department_state", "department", "state", "permit_request_id"),
+    )
+    permit_request_id = Column(String, ForeignKey('permit_requests.id', name='fk_permit_approvals_permit_request_id', ondelete="CASCADE"), primary_key=True)
+    department = Column(String, primary_key=True)
+    state = Column(String, nullable=False, default="pending")  # pending, approved
+    approved_by = Column(String, nullable=True)
+    approved_at = Column(DateTime, nullable=True)
+
+class PermitCalendarSlot(Base):
+    # بازه کاری روزانه هر مجوز برای هر محل (یک ردیف برای هر روز؛ کار شبانه در روز بعد ادامه پیدا می‌کند)
+    __tablename__ = "permit_calendar_slots"
+    __table_args__ = (
+        Index("ix_permit_calendar_slots_location_day", "location", "day", "start_minute", "end_minute"),
+        Index("ix_permit_calendar_slots_day_location", "day", "location", "start_minute"),
+        Index("ix_permit_calendar_slots_permit_request_id", "permit_request_id"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    permit_request_id = Column(String, ForeignKey('permit_requests.id', name='fk_permit_calendar_slots_permit_request_id', ondelete="CASCADE"), nullable=False)
+    location = Column(String, nullable=False)  # job_location نرمال‌شده (فاصله‌ها یکی، حروف کوچک)
+    day = Column(Date, nullable=False)
+    start_minute = Column(Integer, nullable=False)  # دقیقه از ابتدای روز
+    end_minute = Column(Integer, nullable=False)  # انحصاری، حداکثر 1440
+
 # جدول واسط برای ارتباط چند به چند Notification و Tenant
 notification_tenant = Table(
     'notification_tenant', Base.metadata,
     Column('notification_id', String, ForeignKey('notifications.id')),
-    Column('tenant_id', String, ForeignKey('tenants.id'))
+    Column('tenant_id', String, ForeignKey('tenants.id')),
+    Index("ix_notification_tenant_notification", "notification_id", "tenant_id"),
+    Index("ix_notification_tenant_tenant", "tenant_id", "notification_id")
 )
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_created_at_id", "created_at", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
@@ -251,6 +338,9 @@ class Survey(Base):
 
 class SurveyResponse(Base):
     __tablename__ = "survey_responses"
+    __table_args__ = (
+        Index("ix_survey_responses_survey_id", "survey_id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     survey_id = Column(String, ForeignKey('surveys.id'))
     customer_name = Column(String, nullable=True)
@@ -260,6 +350,10 @@ class SurveyResponse(Base):
 
 class ShopUpdate(Base):
     __tablename__ = "shop_updates"
+    __table_args__ = (
+        Index("ix_shop_updates_updated_at_id", "updated_at", "id"),
+        Index("ix_shop_updates_shop_updated_at", "shop_id", "updated_at", "id"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     shop_id = Column(String, ForeignKey('shops.id'))
     updated_by = Column(String, ForeignKey('users.id'))
@@ -271,6 +365,9 @@ class ShopUpdate(Base):
 
 class MaintenanceWorkflowStep(Base):
     __tablename__ = "maintenance_workflow_steps"
+    __table_args__ = (
+        Index("ix_maintenance_workflow_steps_request_timestamp", "maintenance_request_id", "timestamp"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     maintenance_request_id = Column(String, ForeignKey('maintenance_requests.id'))
     step = Column(String)  # نام مرحله (مثلاً: ثبت اولیه، تایید مدیر عملیات، ...)
@@ -278,4 +375,58 @@ class MaintenanceWorkflowStep(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     note = Column(String, nullable=True)
     maintenance_request = relationship("MaintenanceRequest", backref="workflow_steps")
-    user = relationship("User") 
\ No newline at end of file
+    user = relationship("User")
+
+# شمارنده‌های داشبورد (به‌روزرسانی با رویدادهای ORM در services/counter_service.py)
+class Counter(Base):
+    __tablename__ = "counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OutboxMessage(Base):
+    # پیام‌های ایمیل/پیامک که در همان تراکنش رکورد اصلی ثبت و توسط dispatcher ارسال می‌شوند
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        Index("ix_outbox_messages_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_outbox_messages_source", "source_type", "source_id", "created_at"),
+        Index("ix_outbox_messages_claim_token", "claim_token"),
+    )
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    channel = Column(String, nullable=False)  # email, sms
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=True)
+    body = Column(Text, nullable=False)
+    source_type = Column(String, nullable=True)  # notification, maintenance_request, contract
+    source_id = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+class Blob(Base):
+    # فایل‌های پیوست بر اساس محتوا (sha256)؛ ref_count تعداد ارجاع از ردیف‌های مجوز
+    __tablename__ = "blobs"
+    __table_args__ = (
+        Index("ix_blobs_ref_count_orphaned_at", "ref_count", "orphaned_at"),
+    )
+    sha256 = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    orphaned_at = Column(DateTime, nullable=True)  # زمانی که ref_count به صفر رسید
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SearchDocument(Base):
+    # نگاشت ردیف‌های جدول FTS5 (search_index.rowid = id) به رکورد منبع؛ با triggerها پر می‌شود
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        Index("ix_search_documents_kind_ref_id", "kind", "ref_id", unique=True),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # permit, task, contract, tenant, complaint
+    ref_id = Column(String, nullable=False)
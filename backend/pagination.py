@@ -0,0 +1,126 @@
+# pagination.py
+# صفحه‌بندی مبتنی بر کلید (keyset) با کرسر مات برای همه لیست‌ها
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_, DateTime
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BooleanClauseList
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+@dataclass
+class PageParams:
+    cursor: Optional[str] = None
+    limit: int = DEFAULT_LIMIT
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit)
+
+def encode_cursor(sort_value, row_id) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_value is not None and isinstance(sort_column.type, DateTime):
+            sort_value = datetime.fromisoformat(sort_value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+def filter_date_range(stmt, column, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # بازه تاریخ به‌صورت [date_from, date_to) در SQL اعمال می‌شود
+    if date_from is not None:
+        stmt = stmt.filter(column >= date_from)
+    if date_to is not None:
+        stmt = stmt.filter(column < date_to)
+    return stmt
+
+def _ordered(stmt, columns, descending: bool, limit: int):
+    return stmt.order_by(*[c.desc() if descending else c.asc() for c in columns]).limit(limit + 1)
+
+def apply_keyset(stmt, params: PageParams, sort_column, id_column, descending: bool = False):
+    # روی Query و Select هر دو کار می‌کند؛ یک سطر اضافه برای تشخیص صفحه بعد خوانده می‌شود
+    if params.cursor:
+        sort_value, row_id = decode_cursor(params.cursor, sort_column)
+        # مقایسه row-value تا SQLite مستقیم روی ایندکس (sort, id) جست‌وجو کند
+        if sort_column is id_column:
+            key, value = id_column, row_id
+        else:
+            key, value = tuple_(sort_column, id_column), tuple_(sort_value, row_id)
+        stmt = stmt.filter(key < value if descending else key > value)
+    order = [sort_column] if sort_column is id_column else [sort_column, id_column]
+    return _ordered(stmt, order, descending, params.limit)
+
+RANGE_OPERATORS = (operators.eq, operators.ne, operators.lt, operators.le, operators.gt, operators.ge)
+
+def _excludes_nulls(stmt, column) -> bool:
+    # مقایسه مستقیم ستون در شرط‌های AND سطح اول (مثل filter_date_range) سطرهای NULL را حذف می‌کند
+    where = stmt.whereclause
+    if where is None:
+        return False
+    clauses = where.clauses if isinstance(where, BooleanClauseList) and where.operator is operators.and_ else [where]
+    target = getattr(column, "expression", column)
+    return any(
+        isinstance(c, BinaryExpression) and c.operator in RANGE_OPERATORS and c.left.compare(target)
+        for c in clauses
+    )
+
+def keyset_statements(stmt, params: PageParams, sort_column, id_column, descending: bool = False):
+    # کوئری‌های یک صفحه به ترتیب؛ تا پر شدن صفحه (limit + 1 سطر) اجرا می‌شوند.
+    # NULL در SQLite کوچک‌ترین مقدار است (نزولی: آخر، صعودی: اول) و مقایسه row-value با NULL
+    # هیچ سطری را برنمی‌گرداند؛ برای ستون nullable بخش NULL کوئری جدا روی همان ایندکس است
+    # تا جست‌وجوی (sort, id) با OR از ایندکس خارج نشود.
+    if sort_column is id_column or not sort_column.nullable or not params.cursor or _excludes_nulls(stmt, sort_column):
+        return [apply_keyset(stmt, params, sort_column, id_column, descending)]
+    sort_value, row_id = decode_cursor(params.cursor, sort_column)
+    order = [sort_column, id_column]
+    nulls = stmt.filter(sort_column.is_(None))
+    if sort_value is None:
+        rest = _ordered(nulls.filter(id_column < row_id if descending else id_column > row_id), order, descending, params.limit)
+        if descending:
+            return [rest]
+        return [rest, _ordered(stmt.filter(sort_column.isnot(None)), order, descending, params.limit)]
+    seek = apply_keyset(stmt, params, sort_column, id_column, descending)
+    if descending:
+        return [seek, _ordered(nulls, order, descending, params.limit)]
+    return [seek]
+
+def finish_page(rows, params: PageParams, response: Response, sort_attr: str, id_attr: str = "id"):
+    rows = list(rows)
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+    return rows
+
+def paginate(query, params: PageParams, response: Response, sort_column, id_column, descending: bool = False):
+    rows = []
+    for stmt in keyset_statements(query, params, sort_column, id_column, descending):
+        rows.extend(stmt.all())
+        if len(rows) > params.limit:
+            break
+    return finish_page(rows, params, response, sort_column.key, id_column.key)
+
+async def paginate_async(db, stmt, params: PageParams, response: Response, sort_column, id_column, descending: bool = False):
+    rows = []
+    for page_stmt in keyset_statements(stmt, params, sort_column, id_column, descending):
+        rows.extend((await db.execute(page_stmt)).scalars().all())
+        if len(rows) > params.limit:
+            break
+    return finish_page(rows, params, response, sort_column.key, id_column.key)
@@ -0,0 +1,77 @@
+# password_hashing.py
+# هش و بررسی رمز عبور خارج از event loop و threadpool درخواست‌ها
+# یک CryptContext مشترک و یک thread pool اختصاصی (bcrypt در حین هش GIL را آزاد می‌کند).
+# تعداد کارهای در انتظار محدود است؛ بیش از آن 503 برمی‌گردد تا هجوم ورود بقیه endpointها را قفل نکند.
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+QUEUE_DEPTH = Gauge("password_hash_queue_depth", "Password hash/verify jobs waiting or running")
+REJECTED = Counter("password_hash_rejected_total", "Password hash/verify jobs rejected because the queue was full")
+
+class HashingPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwd-hash")
+            return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                REJECTED.inc()
+                raise HTTPException(status_code=503, detail="Authentication is busy, try again shortly", headers={"Retry-After": "1"})
+            self._pending += 1
+        QUEUE_DEPTH.inc()
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+        QUEUE_DEPTH.dec()
+
+    async def run(self, fn, *args):
+        self._admit()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+pool = HashingPool()
+
+async def hash_password(password: str) -> str:
+    return await pool.run(pwd_context.hash, password)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await pool.run(pwd_context.verify, password, password_hash)
+
+# اگر هش با BCRYPT_ROUNDS فعلی ساخته نشده باشد، هش جدید هم برگردانده می‌شود
+async def verify_and_update(password: str, password_hash: str):
+    return await pool.run(pwd_context.verify_and_update, password, password_hash)
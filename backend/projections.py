@@ -0,0 +1,88 @@
+# projections.py
+# شکل پاسخ برای روترها: فیلدها و روابط مورد نیاز یک بار اعلام می‌شوند و Shape آن را به
+# selectinload/joinedload روی Query/Select یا یک select Core با join تبدیل می‌کند
+# تا تعداد کوئری هر endpoint مستقل از تعداد سطرها بماند (بدون N+1).
+#
+#   USER_ROW = Shape(User, "id", "username", role=Pluck("name"))
+#   db.execute(USER_ROW.select()).mappings()         # یک کوئری با outer join
+#   USER_ROW.apply(db.query(User)).all()              # ORM با eager loading
+#   USER_ROW.dump(user)                               # {"id": ..., "username": ..., "role": "manager"}
+
+from sqlalchemy import select
+from sqlalchemy import orm
+from sqlalchemy.orm import aliased, load_only
+
+STRATEGIES = {"joined": "joinedload", "selectin": "selectinload"}
+
+def _check_strategy(strategy):
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown loading strategy: {strategy}")
+    return strategy
+
+class Pluck:
+    # فقط یک ستون از رابطه؛ برای collection لیست مقادیر برمی‌گردد
+    def __init__(self, field: str, strategy: str = "joined"):
+        self.field = field
+        self.strategy = _check_strategy(strategy)
+
+    def options(self, target):
+        return [load_only(getattr(target, self.field))]
+
+    def dump(self, obj):
+        return getattr(obj, self.field)
+
+class Shape:
+    def __init__(self, model, *fields, strategy: str = "selectin", **relations):
+        self.model = model
+        self.fields = fields
+        self.strategy = _check_strategy(strategy)
+        self.relations = relations
+
+    def _loader_options(self):
+        opts = []
+        for name, rel in self.relations.items():
+            attr = getattr(self.model, name)
+            target = attr.property.mapper.class_
+            loader = getattr(orm, STRATEGIES[rel.strategy])(attr)
+            opts.append(loader.options(*rel.options(target)))
+        return opts
+
+    def options(self, target=None):
+        # وقتی Shape به‌عنوان رابطه تو در تو استفاده می‌شود
+        opts = self._loader_options()
+        if self.fields:
+            opts.append(load_only(*[getattr(self.model, f) for f in self.fields]))
+        return opts
+
+    def apply(self, query):
+        # روی Query و Select هر دو کار می‌کند؛ ستون‌های والد محدود نمی‌شوند تا کلیدهای خارجی
+        # و ستون‌های مرتب‌سازی در دسترس بمانند
+        return query.options(*self._loader_options())
+
+    def dump(self, obj):
+        if obj is None:
+            return None
+        data = {f: getattr(obj, f) for f in self.fields}
+        for name, rel in self.relations.items():
+            value = getattr(obj, name)
+            if isinstance(value, (list, set, tuple)):
+                data[name] = [rel.dump(v) for v in value]
+            else:
+                data[name] = rel.dump(value) if value is not None else None
+        return data
+
+    def select(self):
+        # یک select Core با outer join؛ فقط برای روابط many-to-one از نوع Pluck
+        columns = [getattr(self.model, f).label(f) for f in self.fields]
+        joins = []
+        for name, rel in self.relations.items():
+            attr = getattr(self.model, name)
+            if not isinstance(rel, Pluck) or attr.property.uselist:
+                raise ValueError(f"Shape.select() supports only many-to-one Pluck relations, not {name!r}")
+            target = aliased(attr.property.mapper.class_)
+            columns.append(getattr(target, rel.field).label(name))
+            joins.append(attr.of_type(target))
+        stmt = select(*columns).select_from(self.model)
+        for onclause in joins:
+            stmt = stmt.outerjoin(onclause)
+        return stmt
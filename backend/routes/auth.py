@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Security
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import User, Role, Department, Base
 from ..app import get_db
+from ..async_db import get_async_db
+from ..services.principal_service import Principal, load_principal, load_principal_async
+from ..password_hashing import hash_password, verify_and_update
 from pydantic import BaseModel
 from typing import Optional
-from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta
 import os
@@ -14,7 +18,6 @@ from jose import JWTError, jwt
 SECRET_KEY = os.environ.get("SECRET_KEY", "secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -44,12 +47,6 @@ class MeResponse(BaseModel):
         orm_mode = True
 
 # --- Utils ---
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -60,47 +57,80 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 def decode_token(token: str):
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except jwt.PyJWTError:
+    except JWTError:
         return None
 
-def get_current_user(token: str = Depends(lambda: None), db: Session = Depends(get_db)):
+# کاربر جاری از کش principal خوانده می‌شود (بدون کوئری) و در صورت نبودن با یک کوئری join‌شده
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    payload = decode_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user = load_principal(db, payload.get("sub"))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
     payload = decode_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(User).filter(User.id == payload.get("sub")).first()
+    user = await load_principal_async(db, payload.get("sub"))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
 # Middleware/Dependency برای کنترل نقش
 def require_roles(*roles):
-    def role_checker(user: User = Depends(get_current_user)):
+    def role_checker(user: Principal = Depends(get_current_user)):
+        if not user or not user.role or user.role.name not in roles:
+            raise HTTPException(status_code=403, detail="Access denied")
+        return user
+    return role_checker
+
+def require_roles_async(*roles):
+    async def role_checker(user: Principal = Depends(get_current_user_async)):
         if not user or not user.role or user.role.name not in roles:
             raise HTTPException(status_code=403, detail="Access denied")
         return user
     return role_checker
 
 # --- Endpoints ---
+# کارهای DB endpointهای async در threadpool اجرا می‌شوند؛ bcrypt در pool اختصاصی password_hashing
+def check_new_user(db: Session, username: str, role_id: str, department_id: str):
+    if db.query(User).filter(User.username == username).first():
+        raise HTTPException(status_code=400, detail="Username already exists")
+    role = db.query(Role).filter(Role.id == role_id).first()
+    department = db.query(Department).filter(Department.id == department_id).first()
+    if not role or not department:
+        raise HTTPException(status_code=400, detail="Invalid role or department")
+    return role, department
+
+def save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+def find_login_user(db: Session, username: str):
+    return db.query(User).options(joinedload(User.role), joinedload(User.department)).filter(User.username == username).first()
+
+def store_password_hash(db: Session, user: User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+
 @router.post("/register", response_model=MeResponse)
-def register(req: RegisterRequest, db: Session = Depends(get_db), current_user: User = Depends(lambda: None)):
+async def register(req: RegisterRequest, db: Session = Depends(get_db), current_user: User = Depends(lambda: None)):
     # فقط سوپر ادمین می‌تواند ثبت‌نام کند
     if current_user and current_user.role and current_user.role.name != "superadmin":
         raise HTTPException(status_code=403, detail="Access denied")
-    if db.query(User).filter(User.username == req.username).first():
-        raise HTTPException(status_code=400, detail="Username already exists")
-    role = db.query(Role).filter(Role.id == req.role_id).first()
-    department = db.query(Department).filter(Department.id == req.department_id).first()
-    if not role or not department:
-        raise HTTPException(status_code=400, detail="Invalid role or department")
+    role, department = await run_in_threadpool(check_new_user, db, req.username, req.role_id, req.department_id)
     user = User(
         username=req.username,
-        password_hash=get_password_hash(req.password),
+        password_hash=await hash_password(req.password),
         role_id=role.id,
         department_id=department.id
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = await run_in_threadpool(save_user, db, user)
     return MeResponse(
         id=user.id,
         username=user.username,
@@ -110,27 +140,29 @@ def register(req: RegisterRequest, db: Session = Depends(get_db), current_user:
     )
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_login_user, db, form_data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update(form_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    role = db.query(Role).filter(Role.id == user.role_id).first()
-    department = db.query(Department).filter(Department.id == user.department_id).first()
+    if new_hash:
+        # هش با BCRYPT_ROUNDS قدیمی ساخته شده بود
+        await run_in_threadpool(store_password_hash, db, user, new_hash)
     access_token = create_access_token({
         "sub": user.id,
-        "role": role.name if role else None,
-        "department": department.name if department else None
+        "role": user.role.name if user.role else None,
+        "department": user.department.name if user.department else None
     })
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=MeResponse)
-def me(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    role = db.query(Role).filter(Role.id == user.role_id).first()
-    department = db.query(Department).filter(Department.id == user.department_id).first()
+def me(user: Principal = Depends(get_current_user)):
     return MeResponse(
         id=user.id,
         username=user.username,
-        role=role.name if role else None,
-        department=department.name if department else None,
+        role=user.role.name if user.role else None,
+        department=user.department.name if user.department else None,
         is_active=user.is_active
     ) 
\ No newline at end of file
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Header, Path
+from sqlalchemy.orm import Session
+from ..app import get_db
+from ..services import blob_service
+from typing import Optional
+
+router = APIRouter(prefix="/api/blobs", tags=["blobs"])
+
+# دانلود فایل پیوست بر اساس sha256؛ HEAD برای بررسی وجود قبل از آپلود، Range و If-None-Match پشتیبانی می‌شوند
+@router.api_route("/{sha256}", methods=["GET", "HEAD"])
+def get_blob(
+    sha256: str = Path(..., pattern="^[0-9a-fA-F]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    sha256 = sha256.lower()
+    if blob_service.etag_matches(if_none_match, sha256):
+        return blob_service.not_modified(sha256)
+    return blob_service.blob_response(blob_service.find_blob(db, sha256))
@@ -1,16 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from ..models import Contract, ContractStatusEnum, ContractWorkflowStep, Shop, User, Role
 from ..app import get_db
+from ..pagination import PageParams, page_params, paginate, filter_date_range
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from fastapi.responses import StreamingResponse
-import io
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import qrcode
-from ..services import notification_service, security_service
+import base64
+from ..services import outbox_service, security_service, lease_index_service, pdf_render_service, qr_cache_service, export_service
 
 router = APIRouter(prefix="/api/contracts", tags=["contracts"])
 
@@ -38,24 +36,25 @@ class ContractResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class ContractOverlap(BaseModel):
+    id: str
+    start_date: datetime
+    end_date: datetime
+    status: ContractStatusEnum
+
 # اعتبارسنجی تداخل رزرو
+# یک EXISTS روی ایندکس (shop_id, status, start_date, end_date)؛ بازه‌ها نیمه‌باز [start, end) هستند
 
 def check_overlap(db: Session, shop_id: str, start_date: datetime, end_date: datetime, exclude_contract_id: Optional[str] = None):
-    q = db.query(Contract).filter(
+    q = db.query(Contract.id).filter(
         Contract.shop_id == shop_id,
-        Contract.status.in_([
-            ContractStatusEnum.active,
-            ContractStatusEnum.signed,
-            ContractStatusEnum.approved,
-            ContractStatusEnum.pending_approval
-        ])
+        Contract.status.in_(lease_index_service.BLOCKING_STATUSES),
+        Contract.start_date < end_date,
+        Contract.end_date > start_date
     )
     if exclude_contract_id:
         q = q.filter(Contract.id != exclude_contract_id)
-    for c in q:
-        if not (end_date <= c.start_date or start_date >= c.end_date):
-            return True
-    return False
+    return db.query(q.exists()).scalar()
 
 @router.post("/", response_model=ContractResponse)
 def create_contract(contract: ContractCreate, db: Session = Depends(get_db)):
@@ -112,9 +111,33 @@ def update_contract(contract_id: str, update: ContractUpdate, db: Session = Depe
     return contract
 
 @router.get("/", response_model=List[ContractResponse])
-def list_contracts(db: Session = Depends(get_db)):
-    contracts = db.query(Contract).all()
-    return contracts
+def list_contracts(
+    response: Response,
+    status: Optional[ContractStatusEnum] = None,
+    shop_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = db.query(Contract)
+    if status:
+        q = q.filter(Contract.status == status)
+    if shop_id:
+        q = q.filter(Contract.shop_id == shop_id)
+    if tenant_id:
+        q = q.filter(Contract.tenant_id == tenant_id)
+    q = filter_date_range(q, Contract.start_date, date_from, date_to)
+    return paginate(q, page, response, Contract.start_date, Contract.id, descending=True)
+
+# پاسخ از ایندکس بازه‌ای در حافظه؛ برای پیش‌نمایش در فرم‌ها، نه اعتبارسنجی نهایی
+@router.get("/overlaps", response_model=List[ContractOverlap])
+def list_overlaps(shop_id: str, start_date: datetime, end_date: datetime, exclude_contract_id: Optional[str] = None, db: Session = Depends(get_db)):
+    if end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    rows = lease_index_service.overlapping_contracts(db, shop_id, start_date, end_date, exclude_contract_id)
+    return [ContractOverlap(id=cid, start_date=start, end_date=end, status=status) for start, end, cid, status in rows]
 
 @router.get("/{contract_id}", response_model=ContractResponse)
 def get_contract(contract_id: str, db: Session = Depends(get_db)):
@@ -128,55 +151,76 @@ def get_contract_workflow(contract_id: str, db: Session = Depends(get_db)):
     steps = db.query(ContractWorkflowStep).filter(ContractWorkflowStep.contract_id == contract_id).order_by(ContractWorkflowStep.timestamp).all()
     return [f"{s.timestamp}: {s.step} - {s.note}" for s in steps]
 
-@router.get("/{contract_id}/pdf")
-def get_contract_pdf(contract_id: str, db: Session = Depends(get_db)):
+def contract_document(db: Session, contract_id: str):
     contract = db.query(Contract).filter(Contract.id == contract_id).first()
     if not contract:
         raise HTTPException(status_code=404, detail="قرارداد یافت نشد.")
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    p.setFont("Helvetica", 14)
-    p.drawString(100, 800, f"قرارداد شماره: {contract.id}")
-    p.drawString(100, 780, f"مستاجر: {contract.tenant_id}")
-    p.drawString(100, 760, f"مغازه: {contract.shop_id}")
-    p.drawString(100, 740, f"تاریخ شروع: {contract.start_date}")
-    p.drawString(100, 720, f"تاریخ پایان: {contract.end_date}")
-    p.drawString(100, 700, f"مبلغ: {contract.amount}")
-    p.drawString(100, 680, f"وضعیت: {contract.status.value}")
-    # تاریخچه گردش کار
     steps = db.query(ContractWorkflowStep).filter(ContractWorkflowStep.contract_id == contract_id).order_by(ContractWorkflowStep.timestamp).all()
-    y = 650
-    p.setFont("Helvetica", 10)
-    for s in steps:
-        p.drawString(100, y, f"{s.timestamp}: {s.step} - {s.note or ''}")
-        y -= 20
-        if y < 100:
-            p.showPage()
-            y = 800
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    # Notify security after PDF generation
+    return export_service.contract_doc(contract, steps)
+
+def notify_security(db: Session, contract_id: str, message: str, event: str):
     security_role = db.query(Role).filter(Role.name == "security").first()
     if security_role:
         security_users = db.query(User).filter(User.role_id == security_role.id).all()
         for sec_user in security_users:
-            notification_service.send_sms(sec_user.username, f"قرارداد جدید PDF تولید شد: {contract.id}")
-            security_service.log_security_event({"contract_id": contract.id, "event": "pdf_generated", "user_id": sec_user.id})
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=contract_{contract_id}.pdf"})
+            outbox_service.enqueue(db, "sms", sec_user.username, message, source_type="contract", source_id=contract_id)
+            security_service.log_security_event({"contract_id": contract_id, "event": event, "user_id": sec_user.id})
+        db.commit()
+
+# PDF در process pool رندر و بر اساس hash محتوا و گردش کار روی دیسک کش می‌شود
+@router.get("/{contract_id}/pdf")
+async def get_contract_pdf(contract_id: str, db: Session = Depends(get_db), if_none_match: Optional[str] = Header(None)):
+    doc = await run_in_threadpool(contract_document, db, contract_id)
+    key = pdf_render_service.document_key("contract", doc)
+    if pdf_render_service.etag_matches(if_none_match, key):
+        return pdf_render_service.not_modified(key)
+    path = await pdf_render_service.pool.render("contract", doc, key)
+    # Notify security after PDF generation
+    await run_in_threadpool(notify_security, db, contract_id, f"قرارداد جدید PDF تولید شد: {contract_id}", "pdf_generated")
+    return pdf_render_service.pdf_response(path, key, f"contract_{contract_id}.pdf")
+
+def contract_qr_payload(contract_id: str) -> str:
+    return f"Contract ID: {contract_id}"
 
+# تصویر QR بر اساس payload کش می‌شود و با ETag قوی و Cache-Control طولانی برمی‌گردد
 @router.get("/{contract_id}/qrcode")
-def get_contract_qrcode(contract_id: str, db: Session = Depends(get_db)):
-    img = qrcode.make(f"Contract ID: {contract_id}")
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+def get_contract_qrcode(contract_id: str, db: Session = Depends(get_db), if_none_match: Optional[str] = Header(None)):
+    payload = contract_qr_payload(contract_id)
+    key = qr_cache_service.payload_key(payload)
+    if qr_cache_service.etag_matches(if_none_match, key):
+        return qr_cache_service.not_modified(key)
+    key, png, _ = qr_cache_service.cache.get(payload)
     # Notify security after QR generation
-    security_role = db.query(Role).filter(Role.name == "security").first()
-    contract = db.query(Contract).filter(Contract.id == contract_id).first()
-    if security_role and contract:
-        security_users = db.query(User).filter(User.role_id == security_role.id).all()
-        for sec_user in security_users:
-            notification_service.send_sms(sec_user.username, f"QR جدید برای قرارداد: {contract.id}")
-            security_service.log_security_event({"contract_id": contract.id, "event": "qr_generated", "user_id": sec_user.id})
-    return StreamingResponse(buf, media_type="image/png") 
\ No newline at end of file
+    # مثل PDF برای هر دریافت تصویر، مستقل از اینکه از کش آمده باشد
+    if db.query(Contract.id).filter(Contract.id == contract_id).first():
+        notify_security(db, contract_id, f"QR جدید برای قرارداد: {contract_id}", "qr_generated")
+    return qr_cache_service.png_response(key, png)
+
+MAX_QR_BATCH = 500
+
+class ContractQrBatch(BaseModel):
+    contract_ids: List[str]
+
+class ContractQr(BaseModel):
+    contract_id: str
+    etag: str
+    png_base64: str
+
+class ContractQrBatchResponse(BaseModel):
+    items: List[ContractQr]
+    missing: List[str]
+
+@router.post("/qrcodes", response_model=ContractQrBatchResponse)
+def get_contract_qrcodes(batch: ContractQrBatch, db: Session = Depends(get_db)):
+    ids = list(dict.fromkeys(batch.contract_ids))
+    if len(ids) > MAX_QR_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QR_BATCH} contracts per request")
+    found = {row.id for row in db.query(Contract.id).filter(Contract.id.in_(ids))}
+    items = []
+    for contract_id in ids:
+        if contract_id not in found:
+            continue
+        key, png, _ = qr_cache_service.cache.get(contract_qr_payload(contract_id))
+        notify_security(db, contract_id, f"QR جدید برای قرارداد: {contract_id}", "qr_generated")
+        items.append(ContractQr(contract_id=contract_id, etag=qr_cache_service.etag_for(key), png_base64=base64.b64encode(png).decode()))
+    return ContractQrBatchResponse(items=items, missing=[i for i in ids if i not in found])
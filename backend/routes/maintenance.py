@@ -1,17 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..models import MaintenanceRequest, MaintenanceWorkflowStep, User, Department
+from ..models import MaintenanceRequest, MaintenanceWorkflowStep
 from ..app import get_db
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from fastapi.responses import StreamingResponse
-import io
-import qrcode
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 import os
-from ..services.notification_service import send_email
+from ..services import pdf_render_service, outbox_service, maintenance_routing_service, export_service
 import json
 
 router = APIRouter(prefix="/api/maintenance", tags=["maintenance"])
@@ -86,25 +82,19 @@ def create_maintenance_request(data: MaintenanceRequestCreate, db: Session = Dep
         workers=json.dumps(data.workers) if data.workers else None
     )
     db.add(req)
-    db.commit()
-    db.refresh(req)
-    # اطلاع‌رسانی خودکار به مدیر عملیات و FM
-    ops_dept = db.query(Department).filter(Department.name.ilike('%عملیات%')).first()
-    fm_dept = db.query(Department).filter(Department.name.ilike('%fm%')).first()
-    recipients = []
-    if ops_dept:
-        recipients += db.query(User).filter(User.department_id == ops_dept.id).all()
-    if fm_dept:
-        recipients += db.query(User).filter(User.department_id == fm_dept.id).all()
-    for user in recipients:
-        send_email(user.username, "درخواست تعمیرات جدید", f"شرح: {data.description}\nنوع خرابی: {data.category}\nزمان پیشنهادی: {data.suggested_time}")
-    return MaintenanceRequestOut(
+    db.flush()
+    # گیرندگان از جدول مسیریابی کش‌شده (عملیات و FM به‌طور پیش‌فرض)؛ اعلان در همان تراکنش در outbox ثبت می‌شود
+    body = f"شرح: {data.description}\nنوع خرابی: {data.category}\nزمان پیشنهادی: {data.suggested_time}"
+    for _, username in maintenance_routing_service.recipients(db, data.category):
+        outbox_service.enqueue(db, "email", username, body, subject="درخواست تعمیرات جدید", source_type="maintenance_request", source_id=req.id)
+    # مقادیر پیش‌فرض بعد از flush روی شیء هستند؛ پاسخ قبل از commit ساخته می‌شود تا نیازی به refresh نباشد
+    result = MaintenanceRequestOut(
         id=req.id,
         tenant_id=req.tenant_id,
         description=req.description,
         category=req.category,
         suggested_time=req.suggested_time,
-        workers=json.loads(req.workers) if req.workers else [],
+        workers=data.workers or [],
         status=req.status,
         assigned_to=req.assigned_to,
         created_at=req.created_at,
@@ -112,49 +102,24 @@ def create_maintenance_request(data: MaintenanceRequestCreate, db: Session = Dep
         pdf_url=req.pdf_url,
         qr_code=req.qr_code
     )
+    db.commit()
+    return result
 
-@router.get("/pdf/{maintenance_request_id}")
-def generate_maintenance_pdf(maintenance_request_id: str, db: Session = Depends(get_db)):
+def maintenance_document(db: Session, maintenance_request_id: str):
     req = db.query(MaintenanceRequest).filter(MaintenanceRequest.id == maintenance_request_id).first()
     if not req:
         raise HTTPException(status_code=404, detail="MaintenanceRequest not found")
     # فقط برای درخواست تایید شده
     if req.status != "approved":
         raise HTTPException(status_code=400, detail="Request is not approved")
-    # تولید QR Code با اطلاعات کامل
-    workers_list = json.loads(req.workers) if req.workers else []
-    qr_data = json.dumps({
-        "id": req.id,
-        "tenant_id": req.tenant_id,
-        "category": req.category,
-        "suggested_time": req.suggested_time.isoformat() if req.suggested_time else None,
-        "workers": workers_list
-    }, ensure_ascii=False)
-    qr_img = qrcode.make(qr_data)
-    qr_buffer = io.BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
-    # تولید PDF
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    p.setFont("Helvetica", 14)
-    p.drawString(100, 800, f"درخواست تعمیرات شماره: {req.id}")
-    p.drawString(100, 780, f"مستاجر: {req.tenant_id}")
-    p.drawString(100, 760, f"نوع خرابی: {req.category}")
-    p.drawString(100, 740, f"زمان پیشنهادی: {req.suggested_time}")
-    p.drawString(100, 720, f"توضیحات: {req.description}")
-    p.drawString(100, 700, f"وضعیت: {req.status}")
-    p.drawString(100, 680, f"کارگران:")
-    y = 660
-    for w in workers_list:
-        p.drawString(120, y, f"- {w}")
-        y -= 20
-        if y < 100:
-            p.showPage()
-            y = 800
-    # درج QR Code
-    p.drawInlineImage(qr_buffer, 400, 650, width=100, height=100)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=maintenance_{req.id}.pdf"}) 
\ No newline at end of file
+    steps = db.query(MaintenanceWorkflowStep).filter(MaintenanceWorkflowStep.maintenance_request_id == maintenance_request_id).order_by(MaintenanceWorkflowStep.timestamp).all()
+    return export_service.maintenance_doc(req, steps)
+
+@router.get("/pdf/{maintenance_request_id}")
+async def generate_maintenance_pdf(maintenance_request_id: str, db: Session = Depends(get_db), if_none_match: Optional[str] = Header(None)):
+    doc = await run_in_threadpool(maintenance_document, db, maintenance_request_id)
+    key = pdf_render_service.document_key("maintenance", doc)
+    if pdf_render_service.etag_matches(if_none_match, key):
+        return pdf_render_service.not_modified(key)
+    path = await pdf_render_service.pool.render("maintenance", doc, key)
+    return pdf_render_service.pdf_response(path, key, f"maintenance_{maintenance_request_id}.pdf")
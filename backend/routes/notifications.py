@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.orm import Session, joinedload
 from ..models import Notification, Tenant, User, notification_tenant
 from ..app import get_db
-from ..services.notification_service import send_email
+from ..projections import Shape, Pluck
+from ..pagination import PageParams, page_params, paginate, filter_date_range
+from ..services import outbox_service
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -30,23 +32,34 @@ def get_current_user():
     # TODO: Replace with real authentication
     return "admin-user-id"
 
+NOTIFICATION_ROW = Shape(
+    Notification, "id", "title", "message", "created_at", "sent_by", "email_sent",
+    recipients=Pluck("id", strategy="selectin")
+)
+
 @router.get("/", response_model=List[NotificationResponse])
-def list_notifications(db: Session = Depends(get_db)):
-    notifications = db.query(Notification).all()
-    return [NotificationResponse(
-        id=n.id,
-        title=n.title,
-        message=n.message,
-        created_at=n.created_at,
-        sent_by=n.sent_by,
-        recipients=[t.id for t in n.recipients],
-        email_sent=n.email_sent
-    ) for n in notifications]
+def list_notifications(
+    response: Response,
+    email_sent: Optional[str] = None,
+    sent_by: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = NOTIFICATION_ROW.apply(db.query(Notification))
+    if email_sent:
+        q = q.filter(Notification.email_sent == email_sent)
+    if sent_by:
+        q = q.filter(Notification.sent_by == sent_by)
+    q = filter_date_range(q, Notification.created_at, date_from, date_to)
+    notifications = paginate(q, page, response, Notification.created_at, Notification.id, descending=True)
+    return [NotificationResponse(**NOTIFICATION_ROW.dump(n)) for n in notifications]
 
 @router.post("/", response_model=NotificationResponse)
 def create_notification(data: NotificationCreate, db: Session = Depends(get_db)):
     current_user_id = get_current_user()
-    tenants = db.query(Tenant).filter(Tenant.id.in_(data.recipient_ids)).all()
+    tenants = db.query(Tenant).options(joinedload(Tenant.user)).filter(Tenant.id.in_(data.recipient_ids)).all()
     if not tenants:
         raise HTTPException(status_code=404, detail="Recipients not found")
     notification = Notification(
@@ -56,23 +69,43 @@ def create_notification(data: NotificationCreate, db: Session = Depends(get_db))
         recipients=tenants
     )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    # ارسال ایمیل
-    email_status = "pending"
+    db.flush()
+    # ایمیل‌ها در همان تراکنش در outbox ثبت و در پس‌زمینه ارسال می‌شوند؛ email_sent را dispatcher به‌روز می‌کند
     if data.send_email:
+        queued = 0
         for tenant in tenants:
-            if tenant.user and hasattr(tenant.user, 'username'):
-                send_email(tenant.user.username, data.title, data.message)
-        email_status = "sent"
-        notification.email_sent = email_status
-        db.commit()
+            if tenant.user and tenant.user.username:
+                outbox_service.enqueue(db, "email", tenant.user.username, data.message, subject=data.title, source_type="notification", source_id=notification.id)
+                queued += 1
+        if not queued:
+            notification.email_sent = "sent"
+    db.commit()
     return NotificationResponse(
         id=notification.id,
         title=notification.title,
         message=notification.message,
         created_at=notification.created_at,
         sent_by=notification.sent_by,
-        recipients=[t.id for t in notification.recipients],
+        recipients=[t.id for t in tenants],
         email_sent=notification.email_sent
-    ) 
\ No newline at end of file
+    )
+
+class DeliveryOut(BaseModel):
+    id: str
+    channel: str
+    recipient: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str]
+    created_at: datetime
+    sent_at: Optional[datetime]
+    class Config:
+        orm_mode = True
+
+# وضعیت ارسال ایمیل به هر گیرنده
+@router.get("/{notification_id}/deliveries", response_model=List[DeliveryOut])
+def list_deliveries(notification_id: str, db: Session = Depends(get_db)):
+    if not db.query(Notification.id).filter(Notification.id == notification_id).first():
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return outbox_service.deliveries(db, "notification", notification_id)
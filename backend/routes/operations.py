@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..models import SecurityLog, Shop, User
+from ..models import Shop, User
 from ..app import get_db
+from ..pagination import PageParams, page_params, finish_page
+from ..write_queue import run_write
+from ..services import permit_import_service, security_log_service
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 router = APIRouter(prefix="/api/operations", tags=["operations"])
@@ -25,18 +29,43 @@ class SecurityLogOut(BaseModel):
 
 @router.post("/securitylog", response_model=SecurityLogOut)
 def create_security_log(data: SecurityLogCreate, db: Session = Depends(get_db)):
-    log = SecurityLog(
-        store_id=data.store_id,
-        status=data.status,
-        guard_id=data.guard_id,
-        check_time=data.check_time or datetime.utcnow()
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    def unit(session):
+        return security_log_service.create_log(session.connection(), data)
+    return run_write(db, unit)
+
+# یک دور گشت کامل از دستگاه دستی (NDJSON، هر خط یک لاگ) در یک درخواست و یک تراکنش
+@router.post("/securitylog/batch", openapi_extra={"requestBody": {"content": {"application/x-ndjson": {"schema": {"type": "string"}}}}})
+async def ingest_security_logs(request: Request, db: Session = Depends(get_db)):
+    chunks = permit_import_service.stream_chunks(request.stream())
+    batch = await run_in_threadpool(security_log_service.read_batch, chunks)
+    def unit(session):
+        return security_log_service.write_batch(session.connection(), batch)
+    return await run_in_threadpool(run_write, db, unit)
 
 @router.get("/securitylog", response_model=List[SecurityLogOut])
-def list_security_logs(db: Session = Depends(get_db)):
-    logs = db.query(SecurityLog).order_by(SecurityLog.check_time.desc()).all()
-    return logs 
\ No newline at end of file
+def list_security_logs(
+    response: Response,
+    store_id: Optional[str] = None,
+    status: Optional[str] = None,
+    guard_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    # فقط پارتیشن‌های ماهانه هم‌پوشان با بازه، از جدید به قدیم
+    rows = security_log_service.list_logs(db, page, store_id, status, guard_id, date_from, date_to)
+    return finish_page(rows, page, response, "check_time")
+
+@router.get("/securitylog/partitions")
+def list_security_log_partitions(db: Session = Depends(get_db)):
+    return [
+        {
+            "month": p.month,
+            "table_name": p.table_name,
+            "state": p.state,
+            "row_count": p.row_count,
+            "archive_path": p.archive_path,
+            "archived_at": p.archived_at,
+        } for p in security_log_service.list_partitions(db)
+    ]
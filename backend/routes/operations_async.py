@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from .operations import SecurityLogCreate, SecurityLogOut
+from ..async_db import get_async_db
+from ..pagination import PageParams, page_params, finish_page
+from ..services import permit_import_service, security_log_service
+from typing import List, Optional
+from datetime import datetime
+
+# نسخه async لاگ امنیتی (فقط با DB_MODE=async فعال می‌شود)
+router = APIRouter(prefix="/api/operations", tags=["operations"])
+
+@router.post("/securitylog", response_model=SecurityLogOut)
+async def create_security_log(data: SecurityLogCreate, db: AsyncSession = Depends(get_async_db)):
+    log = await db.run_sync(lambda session: security_log_service.create_log(session.connection(), data))
+    await db.commit()
+    return log
+
+@router.post("/securitylog/batch", openapi_extra={"requestBody": {"content": {"application/x-ndjson": {"schema": {"type": "string"}}}}})
+async def ingest_security_logs(request: Request, db: AsyncSession = Depends(get_async_db)):
+    chunks = permit_import_service.stream_chunks(request.stream())
+    batch = await run_in_threadpool(security_log_service.read_batch, chunks)
+    result = await db.run_sync(lambda session: security_log_service.write_batch(session.connection(), batch))
+    await db.commit()
+    return result
+
+@router.get("/securitylog", response_model=List[SecurityLogOut])
+async def list_security_logs(
+    response: Response,
+    store_id: Optional[str] = None,
+    status: Optional[str] = None,
+    guard_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    rows = await db.run_sync(security_log_service.list_logs, page, store_id, status, guard_id, date_from, date_to)
+    return finish_page(rows, page, response, "check_time")
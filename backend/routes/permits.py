@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Query, status, File, UploadFile, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from ..models import PermitRequest, User, WorkerPermit
 from ..app import get_db
+from ..projections import Shape
+from ..pagination import PageParams, page_params, paginate, filter_date_range
+from ..write_queue import run_write
+from ..services import approval_service, calendar_service, counter_service, upload_service, blob_service, permit_import_service
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
-import shutil
-import os
+from typing import List, Literal, Optional
+from datetime import date, datetime
 import json
+import uuid
 
 router = APIRouter(prefix="/api/permits", tags=["permits"])
 
@@ -101,12 +105,8 @@ def get_current_user_role():
     # In production, extract from JWT or session
     return "facilities_manager"  # or "marketing_manager", "operations_manager"
 
-@router.post("/request")
-def create_permit_request(
-    data: PermitRequestCreate,
-    db: Session = Depends(get_db)
-):
-    permit = PermitRequest(
+def new_permit_request(data: PermitRequestCreate) -> PermitRequest:
+    return PermitRequest(
         company_name=data.company_name,
         job_location=data.job_location,
         onsite_in_charge=data.onsite_in_charge,
@@ -120,21 +120,74 @@ def create_permit_request(
         job_description=data.job_description,
         requested_by=data.requested_by
     )
-    db.add(permit)
-    db.commit()
-    db.refresh(permit)
-    # ثبت کارگران
-    for w in data.workers:
-        worker = WorkerPermit(
-            permit_request_id=permit.id,
+
+# ثبت کارگران
+def new_worker_permits(permit_id: str, workers) -> List[WorkerPermit]:
+    return [
+        WorkerPermit(
+            permit_request_id=permit_id,
             name=w.name,
             code=w.code,
             id_card_url=None,  # آپلود فایل در نسخه بعدی
             insurance_url=None
-        )
-        db.add(worker)
-    db.commit()
-    return {"id": permit.id, "status": permit.status}
+        ) for w in workers or []
+    ]
+
+PERMIT_DASHBOARD_COUNTERS = ["permits.total", "permits.approved", "permits.rejected", "permits.incomplete", "permits.pending"]
+
+def permit_brief(p):
+    return {
+        "id": p.id,
+        "company_name": p.company_name,
+        "job_location": p.job_location,
+        "job_date_from": p.job_date_from,
+        "status": p.status
+    }
+
+def worker_out(w):
+    return {
+        "id": w.id,
+        "name": w.name,
+        "code": w.code,
+        "id_card_url": w.id_card_url,
+        "insurance_url": w.insurance_url
+    }
+
+# کارگرها در همان کوئری مجوز با join بارگذاری می‌شوند
+PERMIT_WITH_WORKERS = Shape(PermitRequest, workers=Shape(WorkerPermit, "id", "name", "code", "id_card_url", "insurance_url", strategy="joined"))
+
+def permit_detail(permit, workers):
+    return {
+        "id": permit.id,
+        "company_name": permit.company_name,
+        "job_location": permit.job_location,
+        "onsite_in_charge": permit.onsite_in_charge,
+        "contact_no": permit.contact_no,
+        "tenant_or_contractor": permit.tenant_or_contractor,
+        "job_date_from": permit.job_date_from,
+        "job_date_to": permit.job_date_to,
+        "job_time_from": permit.job_time_from,
+        "job_time_to": permit.job_time_to,
+        "job_type": permit.job_type,
+        "job_description": permit.job_description,
+        "requested_by": permit.requested_by,
+        "status": permit.status,
+        "workers": [worker_out(w) for w in workers]
+    }
+
+@router.post("/request")
+def create_permit_request(
+    data: PermitRequestCreate,
+    db: Session = Depends(get_db)
+):
+    def unit(session):
+        permit = new_permit_request(data)
+        session.add(permit)
+        session.flush()
+        session.add_all(new_worker_permits(permit.id, data.workers))
+        # تداخل با کارهای دیگر همان محل فقط اطلاع داده می‌شود و مانع ثبت نیست
+        return {"id": permit.id, "status": permit.status, "conflicts": calendar_service.permit_conflicts(session, permit)}
+    return run_write(db, unit)
 
 @router.post("/request/full")
 def create_permit_request_full(
@@ -163,21 +216,24 @@ def create_permit_request_full(
         need_mall_staff=data.need_mall_staff,
         extra_notes=data.extra_notes
     )
-    db.add(permit)
-    db.commit()
-    db.refresh(permit)
-    # ثبت کارگران
-    for w in data.workers:
-        worker = WorkerPermit(
-            permit_request_id=permit.id,
-            name=w.name,
-            code=w.code,
-            id_card_url=None,
-            insurance_url=None
-        )
-        db.add(worker)
-    db.commit()
-    return {"id": permit.id, "status": permit.status}
+    def unit(session):
+        session.add(permit)
+        session.flush()
+        session.add_all(new_worker_permits(permit.id, data.workers))
+        # تداخل با کارهای دیگر همان محل فقط اطلاع داده می‌شود و مانع ثبت نیست
+        return {"id": permit.id, "status": permit.status, "conflicts": calendar_service.permit_conflicts(session, permit)}
+    return run_write(db, unit)
+
+# ورود دسته‌ای از CSV/NDJSON؛ بدنه استریمی خوانده و در تکه‌های چندصدتایی با insert دسته‌ای ثبت می‌شود
+@router.post("/bulk", openapi_extra={"requestBody": {"content": {"text/csv": {"schema": {"type": "string"}}, "application/x-ndjson": {"schema": {"type": "string"}}}}})
+async def bulk_import_permits(
+    request: Request,
+    fmt: Optional[Literal["csv", "ndjson"]] = Query(None, alias="format"),
+    db: Session = Depends(get_db)
+):
+    fmt = fmt or permit_import_service.detect_format(request.headers.get("content-type"))
+    chunks = permit_import_service.stream_chunks(request.stream())
+    return await run_in_threadpool(permit_import_service.import_permits, db.get_bind(), fmt, chunks)
 
 @router.put("/request/{permit_id}/status")
 def update_permit_status(permit_id: str, data: PermitRequestStatusUpdate, db: Session = Depends(get_db)):
@@ -231,13 +287,27 @@ def create_permit(request: PermitRequestCreate, db: Session = Depends(get_db)):
     return permit
 
 @router.get("/", response_model=List[PermitRequestResponse])
-def list_permits(db: Session = Depends(get_db)):
-    return db.query(PermitRequest).all()
+def list_permits(
+    response: Response,
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = db.query(PermitRequest)
+    if status:
+        q = q.filter(PermitRequest.status == status)
+    if job_type:
+        q = q.filter(PermitRequest.job_type == job_type)
+    q = filter_date_range(q, PermitRequest.date, date_from, date_to)
+    return paginate(q, page, response, PermitRequest.date, PermitRequest.id, descending=True)
 
+# صف انتظار هر دپارتمان از ایندکس permit_approvals(department, state)
 @router.get("/pending/{department}", response_model=List[PermitRequestResponse])
 def list_pending_permits_for_department(department: str, db: Session = Depends(get_db)):
-    filter_field = f"{department}_approved"
-    return db.query(PermitRequest).filter(getattr(PermitRequest, filter_field) == "pending").all()
+    return approval_service.pending_query(db, department).all()
 
 @router.put("/{permit_id}/edit/{department}", response_model=PermitRequestResponse)
 def edit_permit_by_department(permit_id: str, department: str, update: PermitRequestEdit, db: Session = Depends(get_db)):
@@ -254,127 +324,163 @@ def edit_permit_by_department(permit_id: str, department: str, update: PermitReq
     db.refresh(permit)
     return permit
 
+# تایید با UPDATE شرطی (بدون قفل ردیف)؛ وضعیت کلی در همان دستور approved می‌شود
 @router.post("/{permit_id}/approve/{department}")
 def approve_permit(permit_id: str, department: str, db: Session = Depends(get_db)):
     # Simulate role check
     user_role = get_current_user_role()
     if not user_role.startswith(department):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for this department")
-    permit = db.query(PermitRequest).filter(PermitRequest.id == permit_id).first()
-    if not permit:
-        raise HTTPException(status_code=404, detail="Permit request not found")
-    now = datetime.utcnow()
-    if department == "facilities":
-        permit.facilities_approved = "approved"
-        permit.facilities_approved_date = now
-    elif department == "marketing":
-        permit.marketing_approved = "approved"
-        permit.marketing_approved_date = now
-    elif department == "operations":
-        permit.operations_approved = "approved"
-        permit.operations_approved_date = now
-    else:
-        raise HTTPException(status_code=400, detail="Invalid department")
-    # If all approved, set status to approved
-    if (permit.facilities_approved == "approved" and
-        permit.marketing_approved == "approved" and
-        permit.operations_approved == "approved"):
-        permit.status = "approved"
+    permit_status = approval_service.approve(db, permit_id, department)
     db.commit()
-    db.refresh(permit)
-    return {"detail": f"Permit approved by {department}"}
+    return {"detail": f"Permit approved by {department}", "status": permit_status}
+
+def upload_form(*fields):
+    # بدنه به‌صورت استریمی خوانده می‌شود؛ schema فقط برای مستندات OpenAPI
+    return {"requestBody": {"content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {f: {"type": "string", "format": "binary"} for f in fields}
+    }}}}}
+
+def uploaded_files(stored):
+    return {field: {"size": f.size, "sha256": f.sha256, "content_type": f.content_type} for field, f in stored.items()}
+
+# فایل‌ها در انبار blob (بر اساس sha256) ذخیره می‌شوند؛ فیلد فرم → پیشوند ستون‌های *_url و *_sha256
+WORKER_UPLOADS = {"id_card": upload_service.ID_CARD, "insurance": upload_service.INSURANCE}
+WORKER_FILE_COLUMNS = {"id_card": "id_card", "insurance": "insurance"}
+LICENSE_UPLOADS = {"license_file": upload_service.COMPANY_LICENSE}
+LICENSE_FILE_COLUMNS = {"license_file": "company_license"}
+
+def staging_destination(field: str, filename: str) -> str:
+    return blob_service.staging_path(uuid.uuid4().hex)
 
-@router.post("/worker/{worker_id}/upload")
-def upload_worker_files(worker_id: str, id_card: UploadFile = File(None), insurance: UploadFile = File(None), db: Session = Depends(get_db)):
+def set_blob(target, prefix: str, sha256: str):
+    setattr(target, f"{prefix}_sha256", sha256)
+    setattr(target, f"{prefix}_url", blob_service.blob_url(sha256))
+
+def store_uploads(db: Session, target, columns, stored):
+    try:
+        claimed = []
+        for field, upload in stored.items():
+            blob = blob_service.ingest(db, upload)
+            claimed.append(blob.sha256)
+            set_blob(target, columns[field], blob.sha256)
+        blob_service.release(db, claimed)
+        db.commit()
+    finally:
+        blob_service.discard_staged(stored)
+
+def attach_blobs(db: Session, target, columns, specs, refs):
+    # پیوست فایلی که قبلاً آپلود شده (HEAD /api/blobs/{sha} برای بررسی وجود)
+    claimed = []
+    for field, sha256 in refs.items():
+        blob = blob_service.attach(db, sha256)
+        claimed.append(blob.sha256)
+        spec = specs[field]
+        if blob.content_type not in spec.mime_types:
+            raise HTTPException(status_code=415, detail=f"{field}: unsupported content type {blob.content_type}")
+        if blob.size > spec.max_bytes:
+            raise HTTPException(status_code=413, detail=f"{field}: file exceeds {spec.max_bytes} bytes")
+        set_blob(target, columns[field], blob.sha256)
+    blob_service.release(db, claimed)
+    db.commit()
+
+def find_worker(db: Session, worker_id: str) -> WorkerPermit:
     worker = db.query(WorkerPermit).filter(WorkerPermit.id == worker_id).first()
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
-    upload_dir = "static/permits/"
-    os.makedirs(upload_dir, exist_ok=True)
-    if id_card:
-        id_card_path = os.path.join(upload_dir, f"idcard_{worker_id}_{id_card.filename}")
-        with open(id_card_path, "wb") as f:
-            shutil.copyfileobj(id_card.file, f)
-        worker.id_card_url = id_card_path
-    if insurance:
-        insurance_path = os.path.join(upload_dir, f"insurance_{worker_id}_{insurance.filename}")
-        with open(insurance_path, "wb") as f:
-            shutil.copyfileobj(insurance.file, f)
-        worker.insurance_url = insurance_path
-    db.commit()
+    return worker
+
+def worker_files(worker: WorkerPermit):
     return {"id": worker.id, "id_card_url": worker.id_card_url, "insurance_url": worker.insurance_url}
 
-@router.post("/request/{permit_id}/upload_license")
-def upload_company_license(permit_id: str, license_file: UploadFile = File(...), db: Session = Depends(get_db)):
+# فایل‌ها استریمی و با سقف حجم/نوع دریافت می‌شوند (upload_service)؛ بدنه در threadpool نگه داشته نمی‌شود
+@router.post("/worker/{worker_id}/upload", openapi_extra=upload_form("id_card", "insurance"))
+async def upload_worker_files(worker_id: str, request: Request, db: Session = Depends(get_db)):
+    worker = await run_in_threadpool(find_worker, db, worker_id)
+    stored = await upload_service.receive(request, WORKER_UPLOADS, staging_destination)
+    await run_in_threadpool(store_uploads, db, worker, WORKER_FILE_COLUMNS, stored)
+    result = worker_files(worker)
+    result["files"] = uploaded_files(stored)
+    return result
+
+class WorkerFilesAttach(BaseModel):
+    id_card: Optional[str] = None
+    insurance: Optional[str] = None
+
+@router.post("/worker/{worker_id}/attach")
+def attach_worker_files(worker_id: str, data: WorkerFilesAttach, db: Session = Depends(get_db)):
+    worker = find_worker(db, worker_id)
+    refs = {field: sha for field, sha in data.dict().items() if sha}
+    attach_blobs(db, worker, WORKER_FILE_COLUMNS, WORKER_UPLOADS, refs)
+    return worker_files(worker)
+
+def find_permit(db: Session, permit_id: str) -> PermitRequest:
     permit = db.query(PermitRequest).filter(PermitRequest.id == permit_id).first()
     if not permit:
         raise HTTPException(status_code=404, detail="PermitRequest not found")
-    upload_dir = "static/company_licenses/"
-    os.makedirs(upload_dir, exist_ok=True)
-    license_path = os.path.join(upload_dir, f"license_{permit_id}_{license_file.filename}")
-    with open(license_path, "wb") as f:
-        shutil.copyfileobj(license_file.file, f)
-    permit.company_license_url = license_path
-    db.commit()
+    return permit
+
+@router.post("/request/{permit_id}/upload_license", openapi_extra=upload_form("license_file"))
+async def upload_company_license(permit_id: str, request: Request, db: Session = Depends(get_db)):
+    permit = await run_in_threadpool(find_permit, db, permit_id)
+    stored = await upload_service.receive(request, LICENSE_UPLOADS, staging_destination)
+    if "license_file" not in stored:
+        raise HTTPException(status_code=400, detail="license_file is required")
+    await run_in_threadpool(store_uploads, db, permit, LICENSE_FILE_COLUMNS, stored)
+    return {"id": permit.id, "company_license_url": permit.company_license_url, "files": uploaded_files(stored)}
+
+class LicenseAttach(BaseModel):
+    license_file: str
+
+@router.post("/request/{permit_id}/attach_license")
+def attach_company_license(permit_id: str, data: LicenseAttach, db: Session = Depends(get_db)):
+    permit = find_permit(db, permit_id)
+    attach_blobs(db, permit, LICENSE_FILE_COLUMNS, LICENSE_UPLOADS, {"license_file": data.license_file})
     return {"id": permit.id, "company_license_url": permit.company_license_url}
 
+# تقویم کارها به تفکیک محل؛ از جدول permit_calendar_slots با ایندکس (location, day) / (day, location)
+@router.get("/calendar")
+def permit_calendar(
+    day: Optional[date] = Query(None, alias="date"),
+    view: Literal["day", "week"] = "day",
+    location: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return calendar_service.calendar(db, day or date.today(), view, location)
+
+@router.get("/calendar/conflicts")
+def check_permit_conflicts(
+    job_location: str,
+    job_date_from: datetime,
+    job_time_from: str,
+    job_time_to: str,
+    job_date_to: Optional[datetime] = None,
+    exclude: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    conflicts = calendar_service.find_conflicts(db, job_location, job_date_from, job_date_to, job_time_from, job_time_to, exclude)
+    return {"conflicts": conflicts}
+
+@router.get("/request/{permit_id}/conflicts")
+def get_permit_conflicts(permit_id: str, db: Session = Depends(get_db)):
+    permit = find_permit(db, permit_id)
+    return {"id": permit.id, "conflicts": calendar_service.permit_conflicts(db, permit)}
+
 @router.get("/request/{permit_id}")
 def get_permit_request(permit_id: str, db: Session = Depends(get_db)):
-    permit = db.query(PermitRequest).filter(PermitRequest.id == permit_id).first()
+    permit = PERMIT_WITH_WORKERS.apply(db.query(PermitRequest)).filter(PermitRequest.id == permit_id).first()
     if not permit:
         raise HTTPException(status_code=404, detail="PermitRequest not found")
-    workers = db.query(WorkerPermit).filter(WorkerPermit.permit_request_id == permit.id).all()
-    return {
-        "id": permit.id,
-        "company_name": permit.company_name,
-        "job_location": permit.job_location,
-        "onsite_in_charge": permit.onsite_in_charge,
-        "contact_no": permit.contact_no,
-        "tenant_or_contractor": permit.tenant_or_contractor,
-        "job_date_from": permit.job_date_from,
-        "job_date_to": permit.job_date_to,
-        "job_time_from": permit.job_time_from,
-        "job_time_to": permit.job_time_to,
-        "job_type": permit.job_type,
-        "job_description": permit.job_description,
-        "requested_by": permit.requested_by,
-        "status": permit.status,
-        "workers": [
-            {
-                "id": w.id,
-                "name": w.name,
-                "code": w.code,
-                "id_card_url": w.id_card_url,
-                "insurance_url": w.insurance_url
-            } for w in workers
-        ]
-    }
+    return permit_detail(permit, permit.workers)
 
 @router.get("/dashboard")
 def permit_dashboard(db: Session = Depends(get_db)):
-    total = db.query(PermitRequest).count()
-    approved = db.query(PermitRequest).filter(PermitRequest.status == "approved").count()
-    rejected = db.query(PermitRequest).filter(PermitRequest.status == "rejected").count()
-    incomplete = db.query(PermitRequest).filter(PermitRequest.status == "incomplete").count()
-    pending = db.query(PermitRequest).filter(PermitRequest.status == "pending").count()
+    stats = counter_service.read_counters(db, PERMIT_DASHBOARD_COUNTERS)
     recent = db.query(PermitRequest).order_by(PermitRequest.date.desc()).limit(10).all()
     incomplete_permits = db.query(PermitRequest).filter(PermitRequest.status == "incomplete").all()
-    def permit_brief(p):
-        return {
-            "id": p.id,
-            "company_name": p.company_name,
-            "job_location": p.job_location,
-            "job_date_from": p.job_date_from,
-            "status": p.status
-        }
     return {
-        "stats": {
-            "total": total,
-            "approved": approved,
-            "rejected": rejected,
-            "incomplete": incomplete,
-            "pending": pending
-        },
+        "stats": {name.split(".", 1)[1]: value for name, value in stats.items()},
         "recent": [permit_brief(p) for p in recent],
         "incomplete": [permit_brief(p) for p in incomplete_permits]
     } 
\ No newline at end of file
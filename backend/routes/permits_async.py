@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .permits import (
+    PermitRequestCreate, PermitRequestResponse,
+    new_permit_request, new_worker_permits, permit_brief, permit_detail, PERMIT_WITH_WORKERS, PERMIT_DASHBOARD_COUNTERS
+)
+from ..async_db import get_async_db
+from ..services import calendar_service
+from ..models import PermitRequest, Counter
+from ..pagination import PageParams, page_params, filter_date_range, paginate_async
+from typing import List, Optional
+from datetime import datetime
+
+# نسخه async مسیرهای پرترافیک permits (فقط با DB_MODE=async فعال می‌شود)
+router = APIRouter(prefix="/api/permits", tags=["permits"])
+
+@router.post("/request")
+async def create_permit_request(data: PermitRequestCreate, db: AsyncSession = Depends(get_async_db)):
+    permit = new_permit_request(data)
+    db.add(permit)
+    await db.flush()
+    db.add_all(new_worker_permits(permit.id, data.workers))
+    conflicts = await db.run_sync(calendar_service.permit_conflicts, permit)
+    await db.commit()
+    return {"id": permit.id, "status": permit.status, "conflicts": conflicts}
+
+@router.get("/", response_model=List[PermitRequestResponse])
+async def list_permits(
+    response: Response,
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(PermitRequest)
+    if status:
+        stmt = stmt.where(PermitRequest.status == status)
+    if job_type:
+        stmt = stmt.where(PermitRequest.job_type == job_type)
+    stmt = filter_date_range(stmt, PermitRequest.date, date_from, date_to)
+    return await paginate_async(db, stmt, page, response, PermitRequest.date, PermitRequest.id, descending=True)
+
+@router.get("/request/{permit_id}")
+async def get_permit_request(permit_id: str, db: AsyncSession = Depends(get_async_db)):
+    stmt = PERMIT_WITH_WORKERS.apply(select(PermitRequest)).where(PermitRequest.id == permit_id)
+    permit = (await db.execute(stmt)).unique().scalar_one_or_none()
+    if not permit:
+        raise HTTPException(status_code=404, detail="PermitRequest not found")
+    return permit_detail(permit, permit.workers)
+
+@router.get("/dashboard")
+async def permit_dashboard(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Counter.name, Counter.value).where(Counter.name.in_(PERMIT_DASHBOARD_COUNTERS)))
+    values = dict(result.all())
+    recent = (await db.execute(select(PermitRequest).order_by(PermitRequest.date.desc()).limit(10))).scalars().all()
+    incomplete_permits = (await db.execute(select(PermitRequest).where(PermitRequest.status == "incomplete"))).scalars().all()
+    return {
+        "stats": {name.split(".", 1)[1]: values.get(name, 0) for name in PERMIT_DASHBOARD_COUNTERS},
+        "recent": [permit_brief(p) for p in recent],
+        "incomplete": [permit_brief(p) for p in incomplete_permits]
+    }
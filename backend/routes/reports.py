@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..models import Survey, SurveyResponse
 from ..app import get_db
+from ..write_queue import run_write
+from ..services import export_service
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 import json
 
@@ -53,13 +56,38 @@ def submit_survey_response(data: SurveyResponseCreate, db: Session = Depends(get
     survey = db.query(Survey).filter(Survey.id == data.survey_id).first()
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
-    response = SurveyResponse(survey_id=data.survey_id, customer_name=data.customer_name, answers=json.dumps(data.answers))
-    db.add(response)
-    db.commit()
-    db.refresh(response)
+
+    def unit(session):
+        response = SurveyResponse(survey_id=data.survey_id, customer_name=data.customer_name, answers=json.dumps(data.answers))
+        session.add(response)
+        session.flush()
+        return response
+    response = run_write(db, unit)
     return SurveyResponseOut(id=response.id, survey_id=response.survey_id, customer_name=response.customer_name, answers=json.loads(response.answers), submitted_at=response.submitted_at)
 
 @router.get("/survey/{survey_id}/responses", response_model=List[SurveyResponseOut])
 def get_survey_responses(survey_id: str, db: Session = Depends(get_db)):
     responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey_id).all()
-    return [SurveyResponseOut(id=r.id, survey_id=r.survey_id, customer_name=r.customer_name, answers=json.loads(r.answers), submitted_at=r.submitted_at) for r in responses] 
\ No newline at end of file
+    return [SurveyResponseOut(id=r.id, survey_id=r.survey_id, customer_name=r.customer_name, answers=json.loads(r.answers), submitted_at=r.submitted_at) for r in responses]
+
+# خروجی دسته‌ای اسناد برای حسابرسی پایان ماه: ZIP از PDFهای جدا یا یک PDF ترکیبی (با سقف تعداد)
+@router.get("/export")
+def export_documents(
+    kind: Literal["contract", "maintenance"],
+    fmt: Literal["zip", "pdf"] = Query("zip", alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    period = f"{date_from:%Y%m%d}-" if date_from else ""
+    period += f"{date_to:%Y%m%d}" if date_to else ""
+    filename = f"{kind}_export{'_' + period if period else ''}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if fmt == "pdf":
+        total = export_service.count(db, kind, date_from, date_to)
+        if total > export_service.EXPORT_PDF_MAX_RECORDS:
+            raise HTTPException(status_code=400, detail=f"Combined PDF is limited to {export_service.EXPORT_PDF_MAX_RECORDS} records ({total} matched); use format=zip")
+        out = export_service.combined_pdf(db.get_bind(), kind, date_from, date_to)
+        return StreamingResponse(export_service.stream_file(out), media_type="application/pdf", headers=headers)
+    stream = export_service.stream_zip(db.get_bind(), kind, date_from, date_to)
+    return StreamingResponse(stream, media_type="application/zip", headers=headers)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..app import get_db
+from ..services import search_service
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+# جستجوی سراسری با پیشوند کلمات؛ kinds مثل permit,task برای محدود کردن نوع نتایج
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=1),
+    kinds: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=search_service.SEARCH_MAX_LIMIT),
+    db: Session = Depends(get_db)
+):
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    return search_service.search(db, q, kind_list, limit)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from ..models import Shop, Rental, Base, ShopUpdate
 from ..app import get_db
+from ..pagination import PageParams, page_params, paginate, filter_date_range
+from ..services import availability_service
 from pydantic import BaseModel
+from pydantic_core import to_json
 from typing import List, Optional
 from datetime import datetime
 
@@ -30,8 +33,47 @@ def create_shop(shop: ShopCreate, db: Session = Depends(get_db)):
     return new_shop
 
 @router.get("/", response_model=List[ShopResponse])
-def list_shops(db: Session = Depends(get_db)):
-    return db.query(Shop).all()
+def list_shops(
+    response: Response,
+    location: Optional[str] = None,
+    size: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = db.query(Shop)
+    if location:
+        q = q.filter(Shop.location == location)
+    if size:
+        q = q.filter(Shop.size == size)
+    return paginate(q, page, response, Shop.id, Shop.id)
+
+class FreeWindow(BaseModel):
+    start_date: datetime
+    end_date: datetime
+
+class ShopAvailability(BaseModel):
+    shop_id: str
+    name: str
+    location: Optional[str]
+    size: Optional[str]
+    fully_free: bool
+    windows: List[FreeWindow]
+
+# مغازه‌هایی که در بازه [start_date, end_date) حداقل یک پنجره خالی به طول min_days دارند
+@router.get("/availability", response_model=List[ShopAvailability])
+def shop_availability(
+    start_date: datetime,
+    end_date: datetime,
+    location: Optional[str] = None,
+    size: Optional[str] = None,
+    min_days: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    if end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    result = availability_service.shop_availability(db, start_date, end_date, location, size, min_days)
+    # ساختار پاسخ از قبل با ShopAvailability یکی است؛ سریال‌سازی مستقیم بدون اعتبارسنجی هزاران مدل
+    return Response(content=to_json(result), media_type="application/json")
 
 # Rental models and endpoints
 class RentalCreate(BaseModel):
@@ -60,8 +102,19 @@ def create_rental(rental: RentalCreate, db: Session = Depends(get_db)):
     return new_rental
 
 @router.get("/rental", response_model=List[RentalResponse])
-def list_rentals(db: Session = Depends(get_db)):
-    return db.query(Rental).all()
+def list_rentals(
+    response: Response,
+    shop_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = db.query(Rental)
+    if shop_id:
+        q = q.filter(Rental.shop_id == shop_id)
+    q = filter_date_range(q, Rental.start_date, date_from, date_to)
+    return paginate(q, page, response, Rental.start_date, Rental.id, descending=True)
 
 class ShopUpdateCreate(BaseModel):
     shop_id: str
@@ -93,6 +146,19 @@ def create_shop_update(data: ShopUpdateCreate, db: Session = Depends(get_db)):
     return update
 
 @router.get("/update", response_model=List[ShopUpdateOut])
-def list_shop_updates(db: Session = Depends(get_db)):
-    updates = db.query(ShopUpdate).all()
-    return updates 
\ No newline at end of file
+def list_shop_updates(
+    response: Response,
+    shop_id: Optional[str] = None,
+    update_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = db.query(ShopUpdate)
+    if shop_id:
+        q = q.filter(ShopUpdate.shop_id == shop_id)
+    if update_type:
+        q = q.filter(ShopUpdate.update_type == update_type)
+    q = filter_date_range(q, ShopUpdate.updated_at, date_from, date_to)
+    return paginate(q, page, response, ShopUpdate.updated_at, ShopUpdate.id, descending=True) 
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from .auth import require_roles, get_current_user, get_db
 from ..models import Task, WorkflowStep, TaskStatusEnum, User, Department
+from ..pagination import PageParams, page_params, paginate, filter_date_range
+from ..write_queue import run_write
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -56,6 +58,16 @@ class TaskDepartmentCreate(BaseModel):
     department_ids: List[str]
     due_date: Optional[datetime] = None
 
+# وضعیت تسک را بر اساس مرحله جدید گردش کار تعیین کن
+def status_for_step(step: str) -> TaskStatusEnum:
+    if step in ["completed", "green"]:
+        return TaskStatusEnum.green
+    if step in ["yellow_warning", "yellow"]:
+        return TaskStatusEnum.yellow
+    if step in ["returned", "rejected"]:
+        return TaskStatusEnum.returned
+    return TaskStatusEnum.red
+
 @router.post("/", response_model=TaskResponse)
 def create_task(task: TaskCreate, user=Depends(require_roles("superadmin", "manager", "operations_manager")), db: Session = Depends(get_db)):
     new_task = Task(
@@ -81,14 +93,30 @@ def create_task(task: TaskCreate, user=Depends(require_roles("superadmin", "mana
     db.commit()
     return new_task
 
+def filter_tasks(q, status: Optional[TaskStatusEnum], date_from: Optional[datetime], date_to: Optional[datetime]):
+    if status:
+        q = q.filter(Task.status == status)
+    return filter_date_range(q, Task.created_at, date_from, date_to)
+
 @router.get("/", response_model=List[TaskResponse])
-def list_tasks(user=Depends(get_current_user), db: Session = Depends(get_db)):
+def list_tasks(
+    response: Response,
+    status: Optional[TaskStatusEnum] = None,
+    department_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     # نمایش تسک‌های مرتبط با نقش و دپارتمان کاربر
-    if user.role and user.role.name in ["superadmin", "manager"]:
-        tasks = db.query(Task).all()
-    else:
-        tasks = db.query(Task).filter(Task.department_id == user.department_id).all()
-    return tasks
+    q = db.query(Task)
+    if not (user.role and user.role.name in ["superadmin", "manager"]):
+        q = q.filter(Task.department_id == user.department_id)
+    elif department_id:
+        q = q.filter(Task.department_id == department_id)
+    q = filter_tasks(q, status, date_from, date_to)
+    return paginate(q, page, response, Task.created_at, Task.id, descending=True)
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(task_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
@@ -139,9 +167,17 @@ def create_task_for_departments(data: TaskDepartmentCreate, user=Depends(require
     return tasks
 
 @router.get("/department/{department_id}", response_model=List[TaskResponse])
-def list_tasks_by_department(department_id: str, db: Session = Depends(get_db)):
-    tasks = db.query(Task).filter(Task.department_id == department_id).all()
-    return tasks
+def list_tasks_by_department(
+    department_id: str,
+    response: Response,
+    status: Optional[TaskStatusEnum] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    q = filter_tasks(db.query(Task).filter(Task.department_id == department_id), status, date_from, date_to)
+    return paginate(q, page, response, Task.created_at, Task.id, descending=True)
 
 @router.post("/{task_id}/workflow", response_model=WorkflowStepResponse)
 def add_workflow_step(task_id: str, step: WorkflowStepCreate, user=Depends(get_current_user), db: Session = Depends(get_db)):
@@ -151,25 +187,24 @@ def add_workflow_step(task_id: str, step: WorkflowStepCreate, user=Depends(get_c
     # فقط نقش مجاز یا دپارتمان مرتبط
     if user.role and user.role.name not in ["superadmin", "manager"] and task.department_id != user.department_id:
         raise HTTPException(status_code=403, detail="Access denied")
-    workflow_step = WorkflowStep(
-        task_id=task.id,
-        step=step.step,
-        user_id=user.id,
-        note=step.note
-    )
-    db.add(workflow_step)
-    # وضعیت تسک را بر اساس مرحله جدید به‌روزرسانی کن
-    if step.step in ["completed", "green"]:
-        task.status = TaskStatusEnum.green
-    elif step.step in ["yellow_warning", "yellow"]:
-        task.status = TaskStatusEnum.yellow
-    elif step.step in ["returned", "rejected"]:
-        task.status = TaskStatusEnum.returned
-    else:
-        task.status = TaskStatusEnum.red
-    db.commit()
-    db.refresh(workflow_step)
-    return workflow_step
+    user_id = user.id
+
+    def unit(session):
+        workflow_step = WorkflowStep(
+            task_id=task_id,
+            step=step.step,
+            user_id=user_id,
+            note=step.note
+        )
+        # تسک ممکن است بین بررسی درخواست و اجرای واحد در صف نوشتن حذف شده باشد
+        task = session.get(Task, task_id)
+        if task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        session.add(workflow_step)
+        task.status = status_for_step(step.step)
+        session.flush()
+        return workflow_step
+    return run_write(db, unit)
 
 @router.get("/{task_id}/workflow", response_model=List[WorkflowStepResponse])
 def get_workflow_steps(task_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
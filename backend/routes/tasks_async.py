@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .auth import require_roles_async, get_current_user_async
+from .tasks import TaskCreate, TaskResponse, WorkflowStepCreate, WorkflowStepResponse, status_for_step
+from ..async_db import get_async_db
+from ..models import Task, WorkflowStep, TaskStatusEnum
+from ..pagination import PageParams, page_params, filter_date_range, paginate_async
+from typing import List, Optional
+from datetime import datetime
+
+# نسخه async مسیرهای پرترافیک tasks (فقط با DB_MODE=async فعال می‌شود)
+router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+
+def can_see(user, task):
+    return not (user.role and user.role.name not in ["superadmin", "manager"] and task.department_id != user.department_id)
+
+@router.post("/", response_model=TaskResponse)
+async def create_task(task: TaskCreate, user=Depends(require_roles_async("superadmin", "manager", "operations_manager")), db: AsyncSession = Depends(get_async_db)):
+    new_task = Task(
+        title=task.title,
+        description=task.description,
+        status=TaskStatusEnum.red,
+        created_by=user.id,
+        assigned_to=task.assigned_to,
+        department_id=task.department_id,
+        due_date=task.due_date
+    )
+    db.add(new_task)
+    await db.flush()
+    # ثبت اولین مرحله گردش کار
+    db.add(WorkflowStep(task_id=new_task.id, step="created", user_id=user.id, note="ایجاد تسک"))
+    await db.commit()
+    await db.refresh(new_task)
+    return new_task
+
+@router.get("/", response_model=List[TaskResponse])
+async def list_tasks(
+    response: Response,
+    status: Optional[TaskStatusEnum] = None,
+    department_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(Task)
+    if not (user.role and user.role.name in ["superadmin", "manager"]):
+        stmt = stmt.where(Task.department_id == user.department_id)
+    elif department_id:
+        stmt = stmt.where(Task.department_id == department_id)
+    if status:
+        stmt = stmt.where(Task.status == status)
+    stmt = filter_date_range(stmt, Task.created_at, date_from, date_to)
+    return await paginate_async(db, stmt, page, response, Task.created_at, Task.id, descending=True)
+
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(task_id: str, user=Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not can_see(user, task):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return task
+
+@router.post("/{task_id}/workflow", response_model=WorkflowStepResponse)
+async def add_workflow_step(task_id: str, step: WorkflowStepCreate, user=Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not can_see(user, task):
+        raise HTTPException(status_code=403, detail="Access denied")
+    workflow_step = WorkflowStep(task_id=task.id, step=step.step, user_id=user.id, note=step.note)
+    db.add(workflow_step)
+    task.status = status_for_step(step.step)
+    await db.commit()
+    await db.refresh(workflow_step)
+    return workflow_step
+
+@router.get("/{task_id}/workflow", response_model=List[WorkflowStepResponse])
+async def get_workflow_steps(task_id: str, user=Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not can_see(user, task):
+        raise HTTPException(status_code=403, detail="Access denied")
+    result = await db.execute(select(WorkflowStep).where(WorkflowStep.task_id == task_id).order_by(WorkflowStep.timestamp))
+    return result.scalars().all()
@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from .auth import require_roles, get_current_user, get_db
-from ..models import User, Role, Department
+from fastapi.concurrency import run_in_threadpool
+from .auth import require_roles, get_current_user, get_db, check_new_user, save_user
+from ..models import User
+from ..projections import Shape, Pluck
+from ..services import principal_service
+from ..password_hashing import hash_password
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/users", tags=["users"])
@@ -18,49 +22,34 @@ class UserUpdate(BaseModel):
     department_id: str = None
     is_active: str = None
 
+USER_ROW = Shape(User, "id", "username", "is_active", role=Pluck("name"), department=Pluck("name"))
+
 @router.get("/")
 def list_users(user=Depends(require_roles("superadmin", "manager")), db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return [
-        {
-            "id": u.id,
-            "username": u.username,
-            "role": db.query(Role).filter(Role.id == u.role_id).first().name if u.role_id else None,
-            "department": db.query(Department).filter(Department.id == u.department_id).first().name if u.department_id else None,
-            "is_active": u.is_active
-        } for u in users
-    ]
+    rows = db.execute(USER_ROW.select()).mappings()
+    return [dict(r) for r in rows]
 
 @router.post("/")
-def create_user(new_user: UserCreate, user=Depends(require_roles("superadmin")), db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == new_user.username).first():
-        raise HTTPException(status_code=400, detail="Username already exists")
-    role = db.query(Role).filter(Role.id == new_user.role_id).first()
-    department = db.query(Department).filter(Department.id == new_user.department_id).first()
-    if not role or not department:
-        raise HTTPException(status_code=400, detail="Invalid role or department")
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def create_user(new_user: UserCreate, user=Depends(require_roles("superadmin")), db: Session = Depends(get_db)):
+    role, department = await run_in_threadpool(check_new_user, db, new_user.username, new_user.role_id, new_user.department_id)
     user_obj = User(
         username=new_user.username,
-        password_hash=pwd_context.hash(new_user.password),
+        password_hash=await hash_password(new_user.password),
         role_id=role.id,
         department_id=department.id
     )
-    db.add(user_obj)
-    db.commit()
-    db.refresh(user_obj)
+    user_obj = await run_in_threadpool(save_user, db, user_obj)
     return {"id": user_obj.id, "username": user_obj.username}
 
-@router.put("/{user_id}")
-def update_user(user_id: str, update_data: UserUpdate, user=Depends(require_roles("superadmin")), db: Session = Depends(get_db)):
+def find_user(db: Session, user_id: str) -> User:
     user_obj = db.query(User).filter(User.id == user_id).first()
     if not user_obj:
         raise HTTPException(status_code=404, detail="User not found")
-    if update_data.password:
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        user_obj.password_hash = pwd_context.hash(update_data.password)
+    return user_obj
+
+def apply_user_update(db: Session, user_obj: User, update_data: UserUpdate, password_hash: str = None):
+    if password_hash:
+        user_obj.password_hash = password_hash
     if update_data.role_id:
         user_obj.role_id = update_data.role_id
     if update_data.department_id:
@@ -68,7 +57,15 @@ def update_user(user_id: str, update_data: UserUpdate, user=Depends(require_role
     if update_data.is_active is not None:
         user_obj.is_active = update_data.is_active
     db.commit()
+    principal_service.invalidate(user_obj.id)
     db.refresh(user_obj)
+    return user_obj
+
+@router.put("/{user_id}")
+async def update_user(user_id: str, update_data: UserUpdate, user=Depends(require_roles("superadmin")), db: Session = Depends(get_db)):
+    user_obj = await run_in_threadpool(find_user, db, user_id)
+    password_hash = await hash_password(update_data.password) if update_data.password else None
+    user_obj = await run_in_threadpool(apply_user_update, db, user_obj, update_data, password_hash)
     return {"id": user_obj.id, "username": user_obj.username}
 
 @router.delete("/{user_id}")
@@ -78,4 +75,5 @@ def delete_user(user_id: str, user=Depends(require_roles("superadmin")), db: Ses
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user_obj)
     db.commit()
+    principal_service.invalidate(user_id)
     return {"detail": "User deleted"} 
\ No newline at end of file
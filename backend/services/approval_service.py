@@ -0,0 +1,122 @@
+# approval_service.py
+# وظیفه: تایید دپارتمانی مجوزهای کار (facilities, marketing, operations) روی جدول permit_approvals
+# صف انتظار هر دپارتمان با ایندکس (department, state) خوانده می‌شود.
+# تایید با یک UPDATE شرطی روی ردیف مجوز انجام می‌شود که ستون *_approved دپارتمان و وضعیت کلی را با هم
+# تغییر می‌دهد (وضعیت کلی از ستون‌های همان ردیف محاسبه می‌شود، پس تاییدهای هم‌زمان هم درست جمع می‌شوند).
+# قفل ردیف گرفته نمی‌شود: اگر وضعیت بین خواندن و UPDATE عوض شده باشد، دوباره تلاش می‌شود.
+# ردیف‌های permit_approvals با رویدادهای ORM مجوز (و مسیر insert دسته‌ای) هم‌تراز می‌مانند.
+
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, delete, event, insert, inspect, literal, or_, select, update
+from ..models import PermitApproval, PermitRequest
+from . import counter_service
+
+DEPARTMENTS = ("facilities", "marketing", "operations")
+APPROVE_RETRIES = 3
+
+def check_department(department: str):
+    if department not in DEPARTMENTS:
+        raise HTTPException(status_code=400, detail="Invalid department")
+
+def pending_query(db, department: str):
+    check_department(department)
+    return (
+        db.query(PermitRequest)
+        .join(PermitApproval, PermitApproval.permit_request_id == PermitRequest.id)
+        .filter(PermitApproval.department == department, PermitApproval.state == "pending")
+    )
+
+def approve(db, permit_id: str, department: str, approved_by=None) -> str:
+    # وضعیت کلی مجوز بعد از تایید؛ commit با فراخواننده است
+    check_department(department)
+    table = PermitRequest.__table__
+    column = table.c[f"{department}_approved"]
+    others = [table.c[f"{d}_approved"] for d in DEPARTMENTS if d != department]
+    for _ in range(APPROVE_RETRIES):
+        row = db.execute(select(table.c.status, column).where(table.c.id == permit_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Permit request not found")
+        previous, current = row
+        if current == "approved":
+            return previous
+        now = datetime.utcnow()
+        status = db.execute(
+            update(table)
+            .where(table.c.id == permit_id, table.c.status == previous, or_(column != "approved", column.is_(None)))
+            .values({
+                column.key: "approved",
+                f"{department}_approved_date": now,
+                f"{department}_approved_by": approved_by,
+                "status": case((and_(*[c == "approved" for c in others]), "approved"), else_=table.c.status),
+            })
+            .returning(table.c.status)
+        ).scalar()
+        if status is None:
+            # تغییر هم‌زمان بین خواندن و نوشتن
+            continue
+        connection = db.connection()
+        if status != previous:
+            # UPDATE مستقیم رویداد ORM ندارد؛ شمارنده‌های وضعیت دستی تنظیم می‌شوند
+            for name, delta in ((f"permits.{status}", 1), (f"permits.{previous}", -1)):
+                if counter_service.tracked(name):
+                    counter_service.increment(connection, name, delta)
+        approvals = PermitApproval.__table__
+        result = connection.execute(
+            update(approvals)
+            .where(approvals.c.permit_request_id == permit_id, approvals.c.department == department)
+            .values(state="approved", approved_by=approved_by, approved_at=now)
+        )
+        if result.rowcount == 0:
+            sync(connection, [permit_id])
+        return status
+    raise HTTPException(status_code=409, detail="Permit request was modified concurrently, try again")
+
+# --- هم‌ترازی با ستون‌های *_approved ---
+
+def insert_pending(connection, permit_ids):
+    # مجوزهای جدید مسیر insert دسته‌ای
+    rows = [{"permit_request_id": permit_id, "department": d, "state": "pending"} for permit_id in permit_ids for d in DEPARTMENTS]
+    if rows:
+        connection.execute(insert(PermitApproval.__table__), rows)
+
+def sync(connection, permit_ids):
+    # بازسازی ردیف‌های تایید از ستون‌های مجوز
+    approvals = PermitApproval.__table__
+    table = PermitRequest.__table__
+    connection.execute(delete(approvals).where(approvals.c.permit_request_id.in_(permit_ids)))
+    for department in DEPARTMENTS:
+        state = table.c[f"{department}_approved"]
+        connection.execute(insert(approvals).from_select(
+            ["permit_request_id", "department", "state", "approved_by", "approved_at"],
+            select(
+                table.c.id, literal(department), case((state.is_(None), "pending"), else_=state),
+                table.c[f"{department}_approved_by"], table.c[f"{department}_approved_date"]
+            ).where(table.c.id.in_(permit_ids))
+        ))
+
+APPROVAL_COLUMNS = [f"{d}_approved{suffix}" for d in DEPARTMENTS for suffix in ("", "_by", "_date")]
+
+def _after_insert(mapper, connection, target):
+    rows = [{
+        "permit_request_id": target.id,
+        "department": d,
+        "state": getattr(target, f"{d}_approved") or "pending",
+        "approved_by": getattr(target, f"{d}_approved_by"),
+        "approved_at": getattr(target, f"{d}_approved_date"),
+    } for d in DEPARTMENTS]
+    connection.execute(insert(PermitApproval.__table__), rows)
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in APPROVAL_COLUMNS):
+        sync(connection, [target.id])
+
+def _before_delete(mapper, connection, target):
+    approvals = PermitApproval.__table__
+    connection.execute(delete(approvals).where(approvals.c.permit_request_id == target.id))
+
+event.listen(PermitRequest, "after_insert", _after_insert)
+event.listen(PermitRequest, "after_update", _after_update)
+event.listen(PermitRequest, "before_delete", _before_delete)
@@ -0,0 +1,125 @@
+# availability_service.py
+# وظیفه: جست‌وجوی پنجره‌های خالی مغازه‌ها در یک بازه زمانی
+# یک خط زمانی اشغال (occupancy timeline) برای کل مجموعه در حافظه ساخته می‌شود: همه مغازه‌ها و
+# قراردادهای مسدودکننده با دو کوئری خوانده و برای هر مغازه در ShopLeaseIndex مرتب می‌شوند.
+# هر جست‌وجو بدون کوئری و با یک پیمایش (sweep) روی بازه‌های هر مغازه پاسخ داده می‌شود.
+# با تغییر Contract یا Shop (رویدادهای ORM و بعد از commit) باطل می‌شود و TTL هم دارد.
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from ..models import Shop, Contract
+from .lease_index_service import BLOCKING_STATUSES, ShopLeaseIndex
+
+AVAILABILITY_TTL_SECONDS = float(os.environ.get("AVAILABILITY_TTL_SECONDS", "300"))
+
+_EMPTY = ShopLeaseIndex([])
+
+def free_windows(intervals, start: datetime, end: datetime, min_length: timedelta = timedelta(0)):
+    # intervals: (start, end) مرتب بر اساس شروع؛ بازه‌ها نیمه‌باز [start, end) هستند
+    windows = []
+    cursor = start
+    for busy_start, busy_end in intervals:
+        if busy_start >= end:
+            break
+        if busy_start > cursor:
+            windows.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < end:
+        windows.append((cursor, end))
+    return [(s, e) for s, e in windows if e - s >= min_length]
+
+class OccupancyTimeline:
+    def __init__(self, shops, contracts):
+        # shops: (id, name, location, size) مرتب بر اساس id؛ contracts: (shop_id, start, end, id, status)
+        self.shops = shops
+        contracts = sorted(contracts, key=itemgetter(0))
+        self.leases = {
+            shop_id: ShopLeaseIndex([r[1:] for r in rows])
+            for shop_id, rows in groupby(contracts, key=itemgetter(0))
+        }
+
+    @classmethod
+    def load(cls, db):
+        shops = db.execute(select(Shop.id, Shop.name, Shop.location, Shop.size).order_by(Shop.id)).all()
+        contracts = db.execute(
+            select(Contract.shop_id, Contract.start_date, Contract.end_date, Contract.id, Contract.status)
+            .where(Contract.status.in_(BLOCKING_STATUSES))
+        ).all()
+        return cls([tuple(r) for r in shops], [tuple(r) for r in contracts])
+
+    def availability(self, start: datetime, end: datetime, location: Optional[str] = None, size: Optional[str] = None, min_days: int = 0):
+        min_length = timedelta(days=min_days)
+        whole = [(start, end)] if end - start >= min_length else []
+        result = []
+        for shop_id, name, shop_location, shop_size in self.shops:
+            if location and shop_location != location:
+                continue
+            if size and shop_size != size:
+                continue
+            busy = list(self.leases.get(shop_id, _EMPTY).intervals_between(start, end))
+            windows = free_windows(busy, start, end, min_length) if busy else whole
+            if windows:
+                result.append({
+                    "shop_id": shop_id,
+                    "name": name,
+                    "location": shop_location,
+                    "size": shop_size,
+                    "fully_free": not busy,
+                    "windows": [{"start_date": s, "end_date": e} for s, e in windows]
+                })
+        return result
+
+class TimelineCache:
+    def __init__(self, ttl: float = AVAILABILITY_TTL_SECONDS):
+        self.ttl = ttl
+        self._timeline = None
+        self._expires = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db) -> OccupancyTimeline:
+        with self._lock:
+            if self._timeline is not None and self._expires > time.monotonic():
+                return self._timeline
+            generation = self._generation
+        timeline = OccupancyTimeline.load(db)
+        with self._lock:
+            if generation == self._generation:
+                self._timeline = timeline
+                self._expires = time.monotonic() + self.ttl
+        return timeline
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._timeline = None
+
+cache = TimelineCache()
+
+def shop_availability(db, start: datetime, end: datetime, location: Optional[str] = None, size: Optional[str] = None, min_days: int = 0):
+    return cache.get(db).availability(start, end, location, size, min_days)
+
+# --- باطل‌سازی (همان الگوی lease_index_service) ---
+
+def _changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["availability_dirty"] = True
+    cache.invalidate()
+
+def _after_transaction(session):
+    if session.info.pop("availability_dirty", False):
+        cache.invalidate()
+
+for _model in (Contract, Shop):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _changed)
+event.listen(Session, "after_commit", _after_transaction)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_transaction(session))
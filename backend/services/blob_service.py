@@ -0,0 +1,221 @@
+# blob_service.py
+# وظیفه: انبار فایل‌های پیوست بر اساس محتوا (sha256) با شمارش ارجاع و جمع‌آوری فایل‌های بی‌استفاده
+# هر محتوا یک بار در BLOB_DIR/ab/cd/{sha256} ذخیره می‌شود؛ فایل موقت آپلود تکراری بعد از commit حذف می‌شود
+# و کلاینت می‌تواند با HEAD /api/blobs/{sha} وجود فایل را بررسی و بدون آپلود آن را پیوست کند.
+# ref_count با رویدادهای ORM روی ستون‌های *_sha256 مجوزها در همان تراکنش تغییر می‌کند (مثل counter_service).
+# جمع‌آوری: blobهایی که بیش از BLOB_GC_GRACE_SECONDS بی‌ارجاع مانده‌اند و واقعاً ارجاعی ندارند حذف می‌شوند.
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import case, delete, event, exists, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from ..models import Blob, PermitRequest, WorkerPermit
+from .http_cache_service import etag_for, etag_matches
+from . import http_cache_service
+
+BLOB_DIR = os.environ.get("BLOB_DIR", "static/blobs")
+BLOB_GC_GRACE_SECONDS = int(os.environ.get("BLOB_GC_GRACE_SECONDS", "86400"))
+BLOB_GC_INTERVAL_SECONDS = int(os.environ.get("BLOB_GC_INTERVAL_SECONDS", "3600"))
+BLOB_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+logger = logging.getLogger(__name__)
+
+# ستون‌هایی که به blobs ارجاع می‌دهند
+REFERENCES = {
+    WorkerPermit: ("id_card_sha256", "insurance_sha256"),
+    PermitRequest: ("company_license_sha256",),
+}
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+def blob_url(sha256: str) -> str:
+    return f"/api/blobs/{sha256}"
+
+def staging_path(name: str) -> str:
+    # فایل‌های در حال آپلود کنار انبار (همان file system) تا os.replace اتمیک باشد
+    return os.path.join(BLOB_DIR, "incoming", name)
+
+def claim(db, sha256: str) -> bool:
+    # ارجاع موقت در تراکنش درخواست؛ تا commit جمع‌آوری (شرط ref_count/orphaned_at) این blob را حذف نمی‌کند
+    table = Blob.__table__
+    result = db.execute(
+        update(table).where(table.c.sha256 == sha256).values(ref_count=table.c.ref_count + 1, orphaned_at=None)
+    )
+    return result.rowcount > 0
+
+def release(db, sha256s):
+    # پس از ثبت ارجاع واقعی (رویدادهای ORM) ارجاع موقت claim برداشته می‌شود
+    db.flush()
+    adjust(db.connection(), {sha256: -1 for sha256 in sha256s})
+
+def ingest(db, stored) -> Blob:
+    # stored: StoredUpload از upload_service؛ release، commit و discard_staged با فراخواننده است
+    if not claim(db, stored.sha256):
+        try:
+            with db.begin_nested():
+                db.add(Blob(sha256=stored.sha256, size=stored.size, content_type=stored.content_type, ref_count=1, orphaned_at=None))
+        except IntegrityError:
+            # آپلود هم‌زمان همان محتوا
+            claim(db, stored.sha256)
+    path = blob_path(stored.sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(stored.path, path)
+    return db.get(Blob, stored.sha256)
+
+def attach(db, sha256: str) -> Blob:
+    # پیوست blob موجود بدون آپلود؛ مثل ingest ابتدا claim می‌شود
+    sha256 = sha256.lower()
+    if not claim(db, sha256) or not os.path.exists(blob_path(sha256)):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return db.get(Blob, sha256)
+
+def discard_staged(stored):
+    # فایل موقتی که محتوایش از قبل در انبار بود؛ بعد از commit (یا شکست درخواست) حذف می‌شود
+    for upload in stored.values():
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            pass
+
+def find_blob(db, sha256: str) -> Blob:
+    blob = db.get(Blob, sha256.lower())
+    if blob is None or not os.path.exists(blob_path(blob.sha256)):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return blob
+
+# --- شمارش ارجاع ---
+
+def adjust(connection, deltas: dict):
+    now = datetime.utcnow()
+    table = Blob.__table__
+    for sha256, delta in deltas.items():
+        if not delta:
+            continue
+        count = table.c.ref_count + delta
+        connection.execute(
+            update(table).where(table.c.sha256 == sha256)
+            .values(ref_count=count, orphaned_at=case((count <= 0, now), else_=None))
+        )
+
+def _deltas(target, deleted: bool = False) -> dict:
+    deltas = {}
+    state = inspect(target)
+    for column in REFERENCES[type(target)]:
+        history = state.attrs[column].history
+        if deleted:
+            for value in list(history.unchanged) + list(history.deleted):
+                if value:
+                    deltas[value] = deltas.get(value, 0) - 1
+            continue
+        for value in history.added:
+            if value:
+                deltas[value] = deltas.get(value, 0) + 1
+        for value in history.deleted:
+            if value:
+                deltas[value] = deltas.get(value, 0) - 1
+    return deltas
+
+def _after_insert(mapper, connection, target):
+    adjust(connection, _deltas(target))
+
+def _after_update(mapper, connection, target):
+    adjust(connection, _deltas(target))
+
+def _after_delete(mapper, connection, target):
+    adjust(connection, _deltas(target, deleted=True))
+
+for _model in REFERENCES:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+
+# --- جمع‌آوری ---
+
+def _referenced(sha_column):
+    checks = []
+    for model, columns in REFERENCES.items():
+        for column in columns:
+            attr = getattr(model, column)
+            checks.append(exists().where(attr == sha_column))
+    return checks
+
+def collect_garbage(engine, grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    table = Blob.__table__
+    with engine.begin() as connection:
+        # ref_count فقط راهنماست؛ شرط NOT EXISTS ارجاع واقعی را در همان دستور بررسی می‌کند.
+        # claim در تراکنش درخواست orphaned_at را NULL می‌کند، پس blob در حال استفاده اینجا حذف نمی‌شود.
+        conditions = [table.c.ref_count <= 0, table.c.orphaned_at.isnot(None), table.c.orphaned_at < cutoff]
+        conditions += [~check for check in _referenced(table.c.sha256)]
+        removed = connection.execute(delete(table).where(*conditions).returning(table.c.sha256)).scalars().all()
+        # فایل‌ها پیش از commit حذف می‌شوند: claim هم‌زمان تا پایان این تراکنش منتظر می‌ماند و بعد
+        # ردیفی نمی‌بیند (ingest فایل را دوباره می‌گذارد، attach خطای 404 می‌دهد)
+        for sha256 in removed:
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+    return len(removed)
+
+def reconcile(engine):
+    # هم‌ترازی ref_count با شمارش واقعی (بعد از تغییرات Core/bulk که رویداد ORM ندارند)
+    table = Blob.__table__
+    total = None
+    for model, columns in REFERENCES.items():
+        for column in columns:
+            attr = getattr(model, column)
+            count = select(func.count()).where(attr == table.c.sha256).scalar_subquery()
+            total = count if total is None else total + count
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(update(table).where(table.c.ref_count != total).values(
+            ref_count=total, orphaned_at=case((total <= 0, now), else_=None)
+        ))
+
+class Collector:
+    def __init__(self, interval: int = BLOB_GC_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, engine):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(engine,), name="blob-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, engine):
+        while not self._stop.wait(self.interval):
+            try:
+                reconcile(engine)
+                removed = collect_garbage(engine)
+                if removed:
+                    logger.info("removed %d unreferenced blobs", removed)
+            except Exception:
+                logger.exception("blob garbage collection failed")
+
+collector = Collector()
+
+# --- پاسخ HTTP ---
+# محتوای هر sha256 تغییرناپذیر است؛ ETag همان hash و Range را FileResponse پشتیبانی می‌کند
+
+def not_modified(sha256: str) -> Response:
+    return http_cache_service.not_modified(sha256, BLOB_CACHE_CONTROL)
+
+def blob_headers(blob: Blob) -> dict:
+    return {"ETag": etag_for(blob.sha256), "Cache-Control": BLOB_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+
+def blob_response(blob: Blob) -> FileResponse:
+    return FileResponse(blob_path(blob.sha256), media_type=blob.content_type, headers=blob_headers(blob))
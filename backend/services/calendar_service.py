@@ -0,0 +1,204 @@
+# calendar_service.py
+# وظیفه: تقویم کارهای مجوزدار به تفکیک محل و روز (جدول permit_calendar_slots)
+# برای هر روز از job_date_from تا job_date_to یک ردیف با بازه job_time_from..job_time_to (به دقیقه) ثبت می‌شود.
+# اگر ساعت پایان قبل از ساعت شروع باشد کار شبانه است و باقی آن در روز بعد ثبت می‌شود.
+# ساعتی که قابل خواندن نباشد کل روز حساب می‌شود تا تداخلی از قلم نیفتد.
+# ردیف‌ها با رویدادهای ORM مجوز (و مسیر insert دسته‌ای) هم‌تراز می‌مانند؛ تداخل و نمای روز/هفته
+# فقط ردیف‌های همان محل/بازه را از ایندکس (location, day) می‌خوانند.
+
+import os
+import re
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select
+from ..models import PermitCalendarSlot, PermitRequest
+
+# سقف روزهای ثبت‌شده برای یک مجوز (مجوزهای طولانی‌تر فقط تا این تعداد روز در تقویم می‌آیند)
+PERMIT_CALENDAR_MAX_DAYS = int(os.environ.get("PERMIT_CALENDAR_MAX_DAYS", "366"))
+# وضعیت‌هایی که در تداخل و تقویم نمی‌آیند
+IGNORED_STATUSES = ("rejected",)
+VIEW_DAYS = {"day": 1, "week": 7}
+DAY_MINUTES = 24 * 60
+
+CALENDAR_COLUMNS = ["job_location", "job_date_from", "job_date_to", "job_time_from", "job_time_to"]
+
+_TIME = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?(?::\d{2})?\s*(am|pm|a\.m\.|p\.m\.)?$")
+_COMPACT_TIME = re.compile(r"^(\d{2})(\d{2})$")
+
+def normalize_location(value) -> Optional[str]:
+    if not value:
+        return None
+    return " ".join(value.split()).casefold() or None
+
+def parse_minutes(value) -> Optional[int]:
+    # "08:00", "8:30 pm", "0830", "18.00" (ارقام فارسی هم خوانده می‌شوند)
+    if not value:
+        return None
+    text = value.strip().lower()
+    match = _TIME.match(text) or _COMPACT_TIME.match(text)
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    suffix = match.group(3) if match.re is _TIME else None
+    if suffix:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if suffix.startswith("p") else 0)
+    if minute >= 60 or hour > 24 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+def day_windows(time_from, time_to):
+    # [(روز نسبت به روز کار, شروع, پایان)]
+    start, end = parse_minutes(time_from), parse_minutes(time_to)
+    if start is None or end is None:
+        return [(0, 0, DAY_MINUTES)]
+    if start < end:
+        return [(0, start, end)]
+    windows = [(0, start, DAY_MINUTES)] if start < DAY_MINUTES else []
+    if end > 0:
+        windows.append((1, 0, end))
+    return windows
+
+def _day(value) -> Optional[date]:
+    return value.date() if hasattr(value, "date") else value
+
+def slot_rows(permit_id, job_location, job_date_from, job_date_to, job_time_from, job_time_to):
+    location = normalize_location(job_location)
+    first = _day(job_date_from)
+    if location is None or first is None:
+        return []
+    last = _day(job_date_to) or first
+    days = min(max((last - first).days, 0) + 1, PERMIT_CALENDAR_MAX_DAYS)
+    windows = day_windows(job_time_from, job_time_to)
+    return [
+        {"permit_request_id": permit_id, "location": location, "day": first + timedelta(days=i + offset), "start_minute": start, "end_minute": end}
+        for i in range(days) for offset, start, end in windows
+    ]
+
+def _permit_slots(values):
+    return slot_rows(values["id"], *(values.get(c) for c in CALENDAR_COLUMNS))
+
+def insert_slots(connection, permits):
+    # مجوزهای جدید مسیر insert دسته‌ای (dict ستون‌ها)
+    rows = [row for permit in permits for row in _permit_slots(permit)]
+    if rows:
+        connection.execute(insert(PermitCalendarSlot.__table__), rows)
+
+def add_slots(connection, permit):
+    rows = slot_rows(permit.id, *(getattr(permit, c) for c in CALENDAR_COLUMNS))
+    if rows:
+        connection.execute(insert(PermitCalendarSlot.__table__), rows)
+
+def sync(connection, permit):
+    slots = PermitCalendarSlot.__table__
+    connection.execute(delete(slots).where(slots.c.permit_request_id == permit.id))
+    add_slots(connection, permit)
+
+# --- کوئری‌ها ---
+
+def _slot_columns():
+    return (
+        PermitRequest.id, PermitRequest.company_name, PermitRequest.job_location, PermitRequest.job_type,
+        PermitRequest.status, PermitCalendarSlot.day, PermitCalendarSlot.start_minute, PermitCalendarSlot.end_minute,
+    )
+
+def conflict_query(location: str, first: date, last: date, windows, exclude=None):
+    q = (
+        select(*_slot_columns())
+        .join(PermitRequest, PermitRequest.id == PermitCalendarSlot.permit_request_id)
+        .where(
+            PermitCalendarSlot.location == location,
+            PermitCalendarSlot.day.between(first, last),
+            or_(*[and_(PermitCalendarSlot.start_minute < end, PermitCalendarSlot.end_minute > start) for start, end in windows]),
+            PermitRequest.status.notin_(IGNORED_STATUSES),
+        )
+    )
+    if exclude:
+        q = q.where(PermitCalendarSlot.permit_request_id != exclude)
+    return q
+
+def calendar_query(first: date, last: date, location: Optional[str] = None):
+    q = (
+        select(*_slot_columns())
+        .join(PermitRequest, PermitRequest.id == PermitCalendarSlot.permit_request_id)
+        .where(PermitCalendarSlot.day.between(first, last), PermitRequest.status.notin_(IGNORED_STATUSES))
+    )
+    if location is not None:
+        q = q.where(PermitCalendarSlot.location == location)
+    return q.order_by(PermitCalendarSlot.day, PermitCalendarSlot.location, PermitCalendarSlot.start_minute)
+
+def clock(minutes: int) -> str:
+    return "%02d:%02d" % divmod(minutes, 60)
+
+def find_conflicts(db, job_location, job_date_from, job_date_to, job_time_from, job_time_to, exclude=None):
+    # مجوزهای فعال همان محل که در دست‌کم یک روز با این بازه هم‌پوشانی دارند
+    candidate = slot_rows(exclude, job_location, job_date_from, job_date_to, job_time_from, job_time_to)
+    if not candidate:
+        return []
+    by_day = {}
+    for slot in candidate:
+        by_day.setdefault(slot["day"], []).append((slot["start_minute"], slot["end_minute"]))
+    windows = {(s["start_minute"], s["end_minute"]) for s in candidate}
+    q = conflict_query(candidate[0]["location"], min(by_day), max(by_day), sorted(windows), exclude)
+    conflicts = {}
+    for row in db.execute(q):
+        if not any(start < row.end_minute and row.start_minute < end for start, end in by_day.get(row.day, [])):
+            continue
+        conflict = conflicts.get(row.id)
+        if conflict is None:
+            conflict = conflicts[row.id] = {
+                "id": row.id,
+                "company_name": row.company_name,
+                "job_location": row.job_location,
+                "job_type": row.job_type,
+                "status": row.status,
+                "days": set(),
+            }
+        conflict["days"].add(row.day)
+    for conflict in conflicts.values():
+        days = conflict.pop("days")
+        conflict["first_day"], conflict["days"] = min(days), len(days)
+    return sorted(conflicts.values(), key=lambda c: (c["first_day"], c["id"]))
+
+def permit_conflicts(db, permit):
+    # تداخل‌های یک مجوز ثبت‌شده با بقیه مجوزها
+    return find_conflicts(db, *(getattr(permit, c) for c in CALENDAR_COLUMNS), exclude=permit.id)
+
+def calendar(db, start: date, view: str = "day", location=None) -> dict:
+    if view not in VIEW_DAYS:
+        raise HTTPException(status_code=400, detail="Invalid view")
+    last = start + timedelta(days=VIEW_DAYS[view] - 1)
+    location = normalize_location(location) if location is not None else None
+    days = {start + timedelta(days=i): [] for i in range(VIEW_DAYS[view])}
+    for row in db.execute(calendar_query(start, last, location)):
+        days[row.day].append({
+            "permit_id": row.id,
+            "company_name": row.company_name,
+            "job_location": row.job_location,
+            "job_type": row.job_type,
+            "status": row.status,
+            "start": clock(row.start_minute),
+            "end": clock(row.end_minute),
+        })
+    return {"start": start, "end": last, "days": [{"day": day, "slots": slots} for day, slots in days.items()]}
+
+# --- هم‌ترازی با ستون‌های مجوز ---
+
+def _after_insert(mapper, connection, target):
+    add_slots(connection, target)
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in CALENDAR_COLUMNS):
+        sync(connection, target)
+
+def _before_delete(mapper, connection, target):
+    slots = PermitCalendarSlot.__table__
+    connection.execute(delete(slots).where(slots.c.permit_request_id == target.id))
+
+event.listen(PermitRequest, "after_insert", _after_insert)
+event.listen(PermitRequest, "after_update", _after_update)
+event.listen(PermitRequest, "before_delete", _before_delete)
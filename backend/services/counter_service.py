@@ -0,0 +1,149 @@
+# counter_service.py
+# وظیفه: شمارنده‌های داشبورد در جدول counters
+# شمارنده‌ها با رویدادهای ORM (insert/update/delete) در همان تراکنش تغییر می‌کنند
+# و reconcile به‌صورت دوره‌ای آن‌ها را با شمارش دقیق هم‌تراز می‌کند.
+
+import logging
+import os
+import threading
+from sqlalchemy import event, func, inspect, select, update, insert, literal
+from ..models import Counter, User, Contract, Task, PermitRequest, TaskStatusEnum, ContractStatusEnum
+
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("COUNTER_RECONCILE_SECONDS", "600"))
+
+logger = logging.getLogger(__name__)
+
+def _plain(value):
+    return getattr(value, "value", value)
+
+class CounterDef:
+    # column=None یعنی همه سطرها شمرده می‌شوند
+    # model=None: شمارنده را سرویس دیگری دستی تغییر می‌دهد و count(connection) شمارش دقیق را می‌سازد
+    def __init__(self, name, model, column=None, matches=None, where=None, count=None):
+        self.name = name
+        self.model = model
+        self.column = column
+        self.matches = matches
+        self.where = where
+        self.count = count
+
+    def test(self, value) -> bool:
+        return self.column is None or self.matches(_plain(value))
+
+    def count_query(self, connection):
+        if self.count is not None:
+            return self.count(connection)
+        q = select(func.count()).select_from(self.model.__table__)
+        if self.where is not None:
+            q = q.where(self.where)
+        return q.scalar_subquery()
+
+COUNTERS = [
+    CounterDef("users.active", User, "is_active", lambda v: v == "1", User.is_active == "1"),
+    CounterDef("contracts.active", Contract, "status", lambda v: v == ContractStatusEnum.active.value, Contract.status == ContractStatusEnum.active),
+    CounterDef("tasks.open", Task, "status", lambda v: v is not None and v != TaskStatusEnum.green.value, Task.status != TaskStatusEnum.green),
+    CounterDef("permits.total", PermitRequest),
+] + [
+    CounterDef(f"permits.{s}", PermitRequest, "status", (lambda s: lambda v: v == s)(s), PermitRequest.status == s)
+    for s in ("approved", "rejected", "incomplete", "pending")
+]
+
+def register(counter: CounterDef):
+    COUNTERS.append(counter)
+    _by_name[counter.name] = counter
+
+def tracked(name: str) -> bool:
+    return name in _by_name
+
+def increment(connection, name: str, delta: int):
+    if not delta:
+        return
+    table = Counter.__table__
+    result = connection.execute(update(table).where(table.c.name == name).values(value=table.c.value + delta))
+    if result.rowcount == 0:
+        # اولین بار: مقدار دقیق از شمارش برداشته می‌شود (سطر جاری در همین تراکنش دیده می‌شود)
+        recount(connection, _by_name[name])
+
+def recount(connection, counter: CounterDef):
+    table = Counter.__table__
+    result = connection.execute(update(table).where(table.c.name == counter.name).values(value=counter.count_query(connection)))
+    if result.rowcount == 0:
+        connection.execute(insert(table).from_select(["name", "value"], select(literal(counter.name), counter.count_query(connection))))
+
+def reconcile(connection):
+    for counter in COUNTERS:
+        recount(connection, counter)
+
+def reconcile_all(engine):
+    with engine.begin() as connection:
+        reconcile(connection)
+
+def read_counters(db, names) -> dict:
+    rows = db.execute(select(Counter.name, Counter.value).where(Counter.name.in_(names))).all()
+    values = dict(rows)
+    return {name: values.get(name, 0) for name in names}
+
+_by_name = {c.name: c for c in COUNTERS}
+_by_model = {}
+for _c in COUNTERS:
+    _by_model.setdefault(_c.model, []).append(_c)
+
+def _current(target, counter):
+    return inspect(target).dict.get(counter.column)
+
+def _after_insert(mapper, connection, target):
+    for counter in _by_model[type(target)]:
+        if counter.test(_current(target, counter) if counter.column else None):
+            increment(connection, counter.name, 1)
+
+def _after_delete(mapper, connection, target):
+    for counter in _by_model[type(target)]:
+        if counter.column and counter.column not in inspect(target).dict:
+            recount(connection, counter)
+        elif counter.test(_current(target, counter) if counter.column else None):
+            increment(connection, counter.name, -1)
+
+def _after_update(mapper, connection, target):
+    for counter in _by_model[type(target)]:
+        if counter.column is None:
+            continue
+        history = inspect(target).attrs[counter.column].history
+        if not history.has_changes():
+            continue
+        if not history.deleted:
+            # مقدار قبلی بارگذاری نشده بود؛ شمارش دقیق همین شمارنده
+            recount(connection, counter)
+            continue
+        delta = int(counter.test(history.added[0] if history.added else None)) - int(counter.test(history.deleted[0]))
+        increment(connection, counter.name, delta)
+
+for _model in _by_model:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+
+class Reconciler:
+    def __init__(self, interval: int = RECONCILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, engine):
+        reconcile_all(engine)
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(engine,), name="counter-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, engine):
+        while not self._stop.wait(self.interval):
+            try:
+                reconcile_all(engine)
+            except Exception:
+                logger.exception("counter reconcile failed")
+
+reconciler = Reconciler()
@@ -0,0 +1,337 @@
+# delivery_transport_service.py
+# وظیفه: لایه انتقال ایمیل و پیامک پشت notification_service
+# SMTP: اتصال‌های پایدار در یک pool؛ هر اتصال برای چند پیام (تا SMTP_MESSAGES_PER_CONNECTION) استفاده می‌شود
+# و اتصال بیکار بیش از SMTP_IDLE_SECONDS بسته می‌شود. قطع اتصال در حین ارسال یک بار با اتصال تازه تکرار می‌شود.
+# پیامک: رابط SmsGateway با پیاده‌سازی console و http (POST JSON با اتصال‌های keep-alive).
+# هر provider یک token bucket دارد؛ اگر در RATE_LIMIT_WAIT_SECONDS توکن نرسد RateLimited برمی‌گردد
+# (و اگر تا timeout اتصال آزادی در pool نباشد PoolExhausted که زیرکلاس آن است)
+# و outbox پیام را با backoff دوباره تلاش می‌کند.
+# انتخاب transport با EMAIL_TRANSPORT و SMS_GATEWAY؛ پیش‌فرض console (همان چاپ قبلی).
+
+import http.client
+import json
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+EMAIL_TRANSPORT = os.environ.get("EMAIL_TRANSPORT", "console")  # console, smtp
+SMTP_HOST = os.environ.get("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "25"))
+SMTP_USER = os.environ.get("SMTP_USER")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "0") == "1"
+SMTP_FROM = os.environ.get("SMTP_FROM", "no-reply@mall.local")
+SMTP_TIMEOUT_SECONDS = float(os.environ.get("SMTP_TIMEOUT_SECONDS", "10"))
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "4"))
+SMTP_MESSAGES_PER_CONNECTION = int(os.environ.get("SMTP_MESSAGES_PER_CONNECTION", "100"))
+SMTP_IDLE_SECONDS = float(os.environ.get("SMTP_IDLE_SECONDS", "30"))
+SMTP_RATE_PER_SECOND = float(os.environ.get("SMTP_RATE_PER_SECOND", "0"))  # 0 یعنی بدون محدودیت
+SMTP_BURST = int(os.environ.get("SMTP_BURST", "20"))
+
+SMS_GATEWAY = os.environ.get("SMS_GATEWAY", "console")  # console, http
+SMS_GATEWAY_URL = os.environ.get("SMS_GATEWAY_URL", "http://localhost:8026/sms")
+SMS_GATEWAY_TOKEN = os.environ.get("SMS_GATEWAY_TOKEN")
+SMS_SENDER = os.environ.get("SMS_SENDER", "MALL")
+SMS_POOL_SIZE = int(os.environ.get("SMS_POOL_SIZE", "4"))
+SMS_TIMEOUT_SECONDS = float(os.environ.get("SMS_TIMEOUT_SECONDS", "10"))
+SMS_RATE_PER_SECOND = float(os.environ.get("SMS_RATE_PER_SECOND", "0"))
+SMS_BURST = int(os.environ.get("SMS_BURST", "10"))
+
+RATE_LIMIT_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_WAIT_SECONDS", "5"))
+
+class RateLimited(Exception):
+    pass
+
+class PoolExhausted(RateLimited):
+    # همه اتصال‌های pool در حال استفاده‌اند؛ outbox مثل RateLimited با backoff دوباره تلاش می‌کند
+    pass
+
+def take_slot(slots: queue.Queue, timeout: float, provider: str):
+    try:
+        return slots.get(timeout=timeout)
+    except queue.Empty:
+        raise PoolExhausted(f"{provider}: no free connection within {timeout:g}s") from None
+
+class TokenBucket:
+    # rate توکن در ثانیه با ظرفیت burst؛ rate <= 0 یعنی بدون محدودیت
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # صفر یعنی توکن برداشته شد؛ در غیر این صورت زمان انتظار تا توکن بعدی
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = RATE_LIMIT_WAIT_SECONDS):
+        if self.rate <= 0:
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimited("rate limit exceeded")
+            time.sleep(wait)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def bucket_for(provider: str, rate: float, burst: int) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(provider)
+        if bucket is None:
+            bucket = _buckets[provider] = TokenBucket(rate, burst)
+        return bucket
+
+# --- ایمیل ---
+
+class ConsoleEmailTransport:
+    def send(self, to, subject, body):
+        print(f"[EMAIL] To: {to} | Subject: {subject} | Body: {body}")
+
+    def close(self):
+        pass
+
+class _SmtpSession:
+    def __init__(self, client):
+        self.client = client
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+class SmtpTransport:
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: str = SMTP_USER, password: str = SMTP_PASSWORD,
+                 starttls: bool = SMTP_STARTTLS, sender: str = SMTP_FROM, pool_size: int = SMTP_POOL_SIZE,
+                 messages_per_connection: int = SMTP_MESSAGES_PER_CONNECTION, idle_seconds: float = SMTP_IDLE_SECONDS,
+                 rate: float = SMTP_RATE_PER_SECOND, burst: int = SMTP_BURST, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender
+        self.messages_per_connection = messages_per_connection
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.bucket = bucket_for(f"smtp:{host}:{port}", rate, burst)
+        # هر slot یا None (هنوز وصل نشده) یا یک اتصال آماده است
+        self._slots = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._slots.put(None)
+
+    def _connect(self) -> _SmtpSession:
+        client = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        client.ehlo()
+        if self.starttls:
+            client.starttls(context=ssl.create_default_context())
+            client.ehlo()
+        if self.username:
+            client.login(self.username, self.password)
+        return _SmtpSession(client)
+
+    def _discard(self, session):
+        if session is None:
+            return
+        try:
+            session.client.quit()
+        except (smtplib.SMTPException, OSError):
+            session.client.close()
+
+    def _checkout(self) -> _SmtpSession:
+        session = take_slot(self._slots, self.timeout, f"smtp:{self.host}:{self.port}")
+        try:
+            if session is not None and (session.sent >= self.messages_per_connection or time.monotonic() - session.last_used > self.idle_seconds):
+                self._discard(session)
+                session = None
+            return session or self._connect()
+        except Exception:
+            self._slots.put(None)
+            raise
+
+    def _checkin(self, session):
+        if session is not None:
+            session.last_used = time.monotonic()
+        self._slots.put(session)
+
+    def message(self, to, subject, body) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg["Subject"] = subject or ""
+        msg.set_content(body)
+        return msg
+
+    def send_many(self, messages):
+        # messages: (to, subject, body)؛ همه در یک session SMTP ارسال می‌شوند
+        session = self._checkout()
+        try:
+            for to, subject, body in messages:
+                self.bucket.acquire()
+                msg = self.message(to, subject, body)
+                try:
+                    session.client.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # اتصال بیکار از سمت سرور بسته شده؛ یک بار با اتصال تازه
+                    self._discard(session)
+                    session = None
+                    session = self._connect()
+                    session.client.send_message(msg)
+                session.sent += 1
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException, RateLimited):
+            # خطای سطح پیام؛ اتصال همچنان قابل استفاده است
+            self._checkin(session)
+            raise
+        except BaseException:
+            self._discard(session)
+            self._slots.put(None)
+            raise
+        self._checkin(session)
+
+    def send(self, to, subject, body):
+        self.send_many([(to, subject, body)])
+
+    def close(self):
+        while True:
+            try:
+                session = self._slots.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(session)
+
+# --- پیامک ---
+
+class SmsGateway(ABC):
+    # رابط درگاه پیامک؛ provider جدید فقط send را پیاده می‌کند
+    @abstractmethod
+    def send(self, to, message):
+        ...
+
+    def close(self):
+        pass
+
+class ConsoleSmsGateway(SmsGateway):
+    def send(self, to, message):
+        print(f"[SMS] To: {to} | Message: {message}")
+
+class HttpSmsGateway(SmsGateway):
+    # POST {"to", "from", "message"} به SMS_GATEWAY_URL؛ هر پاسخ غیر 2xx خطا است
+    def __init__(self, url: str = SMS_GATEWAY_URL, token: str = SMS_GATEWAY_TOKEN, sender: str = SMS_SENDER,
+                 pool_size: int = SMS_POOL_SIZE, rate: float = SMS_RATE_PER_SECOND, burst: int = SMS_BURST, timeout: float = SMS_TIMEOUT_SECONDS):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.path = parts.path or "/"
+        self.token = token
+        self.sender = sender
+        self.timeout = timeout
+        self.bucket = bucket_for(f"sms:{self.host}:{self.port}", rate, burst)
+        self._slots = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._slots.put(None)
+
+    def _connect(self):
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, conn, payload: bytes):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        conn.request("POST", self.path, body=payload, headers=headers)
+        response = conn.getresponse()
+        detail = response.read()
+        if response.status >= 300:
+            raise RuntimeError(f"SMS gateway returned {response.status}: {detail[:200]!r}")
+
+    def send(self, to, message):
+        self.bucket.acquire()
+        payload = json.dumps({"to": to, "from": self.sender, "message": message}, ensure_ascii=False).encode("utf-8")
+        conn = take_slot(self._slots, self.timeout, f"sms:{self.host}:{self.port}") or self._connect()
+        try:
+            try:
+                self._post(conn, payload)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                conn = self._connect()
+                self._post(conn, payload)
+        except Exception:
+            conn.close()
+            self._slots.put(None)
+            raise
+        self._slots.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._slots.get_nowait()
+            except queue.Empty:
+                return
+            if conn is not None:
+                conn.close()
+
+SMS_GATEWAYS = {
+    "console": ConsoleSmsGateway,
+    "http": HttpSmsGateway,
+}
+
+EMAIL_TRANSPORTS = {
+    "console": ConsoleEmailTransport,
+    "smtp": SmtpTransport,
+}
+
+_email = None
+_sms = None
+_lock = threading.Lock()
+
+def email_transport():
+    global _email
+    with _lock:
+        if _email is None:
+            _email = EMAIL_TRANSPORTS[EMAIL_TRANSPORT]()
+        return _email
+
+def sms_gateway():
+    global _sms
+    with _lock:
+        if _sms is None:
+            _sms = SMS_GATEWAYS[SMS_GATEWAY]()
+        return _sms
+
+def configure(email=None, sms=None):
+    # جایگزینی transportها (مثلاً در بنچمارک)؛ نمونه‌های قبلی بسته می‌شوند
+    global _email, _sms
+    with _lock:
+        if email is not None:
+            if _email is not None:
+                _email.close()
+            _email = email
+        if sms is not None:
+            if _sms is not None:
+                _sms.close()
+            _sms = sms
+
+def close():
+    global _email, _sms
+    with _lock:
+        for transport in (_email, _sms):
+            if transport is not None:
+                transport.close()
+        _email = _sms = None
@@ -0,0 +1,216 @@
+# export_service.py
+# وظیفه: خروجی دسته‌ای اسناد (قراردادهای فعال و درخواست‌های تعمیرات تایید شده) به‌صورت ZIP یا یک PDF ترکیبی
+# سطرها با yield_per صفحه‌به‌صفحه خوانده می‌شوند و گردش کار هر صفحه با یک کوئری IN بارگذاری می‌شود.
+# رندر در process pool مشترک pdf_render_service انجام می‌شود (همان کلید کش endpointهای تکی)؛
+# حداکثر EXPORT_RENDER_WINDOW سند هم‌زمان در جریان است و ترتیب خروجی حفظ می‌شود.
+# ZIP بدون seek و تکه‌به‌تکه نوشته می‌شود، پس حافظه مستقل از تعداد سطرهاست.
+# PDF ترکیبی در فایل موقت ادغام می‌شود و سقف EXPORT_PDF_MAX_RECORDS دارد.
+# رندر ناموفق (خطا یا گذشتن از EXPORT_RENDER_TIMEOUT_SECONDS) در ZIP به‌صورت فایل {kind}_{id}.error.txt می‌آید؛
+# PDF ترکیبی قبل از شروع پاسخ کامل ساخته می‌شود و در این حالت 503 برمی‌گردد.
+
+import json
+import os
+import tempfile
+import zipfile
+from collections import deque
+from datetime import datetime
+from concurrent.futures import Future
+from typing import Optional
+
+from fastapi import HTTPException
+from pypdf import PdfWriter
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..models import Contract, ContractStatusEnum, ContractWorkflowStep, MaintenanceRequest, MaintenanceWorkflowStep
+from ..pagination import filter_date_range
+from . import pdf_render_service
+
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "200"))
+EXPORT_RENDER_WINDOW = int(os.environ.get("EXPORT_RENDER_WINDOW", str(pdf_render_service.PDF_RENDER_WORKERS * 4)))
+EXPORT_PDF_MAX_RECORDS = int(os.environ.get("EXPORT_PDF_MAX_RECORDS", "500"))
+EXPORT_RENDER_TIMEOUT_SECONDS = float(os.environ.get("EXPORT_RENDER_TIMEOUT_SECONDS", "120"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# --- ساخت سند (همان dict که endpointهای تکی رندر می‌کنند) ---
+
+def workflow(steps):
+    return [{"timestamp": str(s.timestamp), "step": s.step, "note": s.note} for s in steps]
+
+def contract_doc(contract, steps) -> dict:
+    return {
+        "id": contract.id,
+        "tenant_id": contract.tenant_id,
+        "shop_id": contract.shop_id,
+        "start_date": str(contract.start_date),
+        "end_date": str(contract.end_date),
+        "amount": contract.amount,
+        "status": contract.status.value,
+        "workflow": workflow(steps)
+    }
+
+def maintenance_doc(req, steps) -> dict:
+    # QR Code با اطلاعات کامل؛ تاریخچه گردش کار در چاپ نمی‌آید ولی در کلید کش هست
+    workers_list = json.loads(req.workers) if req.workers else []
+    qr_data = json.dumps({
+        "id": req.id,
+        "tenant_id": req.tenant_id,
+        "category": req.category,
+        "suggested_time": req.suggested_time.isoformat() if req.suggested_time else None,
+        "workers": workers_list
+    }, ensure_ascii=False)
+    return {
+        "id": req.id,
+        "tenant_id": req.tenant_id,
+        "category": req.category,
+        "suggested_time": str(req.suggested_time),
+        "description": req.description,
+        "status": req.status,
+        "workers": workers_list,
+        "qr_data": qr_data,
+        "workflow": workflow(steps)
+    }
+
+class ExportKind:
+    def __init__(self, step_model, step_fk, build, query):
+        self.step_model = step_model
+        self.step_fk = step_fk
+        self.build = build
+        self.query = query
+
+def _active_contracts(date_from, date_to):
+    # قراردادهای فعالی که با بازه [date_from, date_to) هم‌پوشانی دارند
+    stmt = select(Contract).where(Contract.status == ContractStatusEnum.active)
+    if date_to is not None:
+        stmt = stmt.where(Contract.start_date < date_to)
+    if date_from is not None:
+        stmt = stmt.where(Contract.end_date > date_from)
+    return stmt.order_by(Contract.start_date, Contract.id)
+
+def _approved_maintenance(date_from, date_to):
+    stmt = select(MaintenanceRequest).where(MaintenanceRequest.status == "approved")
+    stmt = filter_date_range(stmt, MaintenanceRequest.created_at, date_from, date_to)
+    return stmt.order_by(MaintenanceRequest.created_at, MaintenanceRequest.id)
+
+KINDS = {
+    "contract": ExportKind(ContractWorkflowStep, ContractWorkflowStep.contract_id, contract_doc, _active_contracts),
+    "maintenance": ExportKind(MaintenanceWorkflowStep, MaintenanceWorkflowStep.maintenance_request_id, maintenance_doc, _approved_maintenance),
+}
+
+def count(db, kind: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> int:
+    stmt = KINDS[kind].query(date_from, date_to).order_by(None).subquery()
+    return db.execute(select(func.count()).select_from(stmt)).scalar()
+
+def documents(db, kind: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # (record_id, doc) به ترتیب؛ هر صفحه بعد از استفاده از session جدا می‌شود تا identity map بزرگ نشود
+    spec = KINDS[kind]
+    result = db.execute(spec.query(date_from, date_to).execution_options(yield_per=EXPORT_PAGE_SIZE)).scalars()
+    for batch in result.partitions():
+        ids = [r.id for r in batch]
+        steps = {}
+        rows = db.execute(
+            select(spec.step_model).where(spec.step_fk.in_(ids)).order_by(spec.step_fk, spec.step_model.timestamp)
+        ).scalars()
+        for step in rows:
+            steps.setdefault(getattr(step, spec.step_fk.key), []).append(step)
+        for record in batch:
+            record_steps = steps.get(record.id, [])
+            doc = spec.build(record, record_steps)
+            db.expunge(record)
+            for step in record_steps:
+                db.expunge(step)
+            yield record.id, doc
+
+def _submit(pool, kind: str, doc: dict) -> Future:
+    try:
+        return pool.future(kind, doc, wait=EXPORT_RENDER_TIMEOUT_SECONDS)
+    except Exception as exc:
+        failed = Future()
+        failed.set_exception(exc)
+        return failed
+
+def _outcome(record_id, future: Future):
+    try:
+        return record_id, future.result(timeout=EXPORT_RENDER_TIMEOUT_SECONDS), None
+    except Exception as exc:
+        return record_id, None, getattr(exc, "detail", None) or str(exc) or type(exc).__name__
+
+def rendered(db, kind: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # (record_id, path, error) به ترتیب؛ رندرها در process pool موازی اجرا می‌شوند
+    pool = pdf_render_service.pool
+    window_size = max(1, min(EXPORT_RENDER_WINDOW, pool.max_pending))
+    window = deque()
+    for record_id, doc in documents(db, kind, date_from, date_to):
+        window.append((record_id, _submit(pool, kind, doc)))
+        if len(window) >= window_size:
+            yield _outcome(*window.popleft())
+    while window:
+        yield _outcome(*window.popleft())
+
+class _ZipSink:
+    # مقصد غیرقابل seek برای zipfile؛ بایت‌های نوشته‌شده تکه‌به‌تکه برداشته می‌شوند
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+def stream_zip(engine, kind: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # session مستقل: بعد از پایان endpoint هم استریم ادامه دارد
+    sink = _ZipSink()
+    with Session(bind=engine, autoflush=False) as db:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for record_id, path, error in rendered(db, kind, date_from, date_to):
+                try:
+                    src = open(path, "rb") if error is None else None
+                except OSError as exc:
+                    # فایل کش بین رندر و خواندن حذف شده (LRU دیسک)
+                    src, error = None, str(exc)
+                if src is None:
+                    archive.writestr(f"{kind}_{record_id}.error.txt", f"Rendering failed: {error}\n")
+                    yield sink.take()
+                    continue
+                with src, archive.open(f"{kind}_{record_id}.pdf", "w", force_zip64=True) as dest:
+                    while True:
+                        chunk = src.read(EXPORT_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        if sink.size >= EXPORT_CHUNK_BYTES:
+                            yield sink.take()
+                if sink.size:
+                    yield sink.take()
+        yield sink.take()
+
+def combined_pdf(engine, kind: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # قبل از StreamingResponse صدا زده می‌شود تا رندر ناموفق status خطا بدهد نه فایل ناقص
+    writer = PdfWriter()
+    with Session(bind=engine, autoflush=False) as db:
+        for record_id, path, error in rendered(db, kind, date_from, date_to):
+            if error is not None:
+                raise HTTPException(status_code=503, detail=f"Rendering {kind} {record_id} failed: {error}", headers={"Retry-After": "5"})
+            writer.append(path)
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    writer.write(out)
+    writer.close()
+    out.seek(0)
+    return out
+
+def stream_file(out):
+    with out:
+        while True:
+            chunk = out.read(EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
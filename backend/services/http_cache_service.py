@@ -0,0 +1,77 @@
+# http_cache_service.py
+# وظیفه: ابزار مشترک کش‌های محتوامحور (QR، PDF، blob)
+# ETag قوی همان کلید محتواست؛ If-None-Match با مقایسه ضعیف (W/) بررسی می‌شود.
+# DiskBudget حجم یک پوشه کش را محدود نگه می‌دارد: با عبور از سقف، قدیمی‌ترین فایل‌ها
+# (بر اساس mtime که با هر خواندن تازه می‌شود) تا ۹۰٪ سقف حذف می‌شوند.
+# به models وابسته نیست تا در processهای رندر PDF هم قابل استفاده باشد.
+
+import os
+import threading
+
+from fastapi import Response
+
+def etag_for(key: str) -> str:
+    return f'"{key}"'
+
+def etag_matches(if_none_match, key: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag_for(key) in tags or f"W/{etag_for(key)}" in tags
+
+def not_modified(key: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag_for(key), "Cache-Control": cache_control})
+
+class DiskBudget:
+    def __init__(self, directory: str, suffix: str, max_bytes: int):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = None
+
+    def touch(self, path: str):
+        try:
+            # زمان دسترسی برای ترتیب LRU دیسک
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)]
+        except FileNotFoundError:
+            return []
+
+    def added(self, size: int):
+        # بعد از نوشتن فایل جدید در پوشه کش
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._bytes += size
+            over = self._bytes > self.max_bytes
+        if over:
+            self.prune()
+
+    def prune(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._bytes = total
@@ -0,0 +1,122 @@
+# lease_index_service.py
+# وظیفه: ایندکس بازه‌ای قراردادهای هر مغازه در حافظه برای پاسخ سریع به پرسش تداخل
+# قراردادهای مسدودکننده هر مغازه بر اساس شروع مرتب می‌شوند و بیشینه پایان (prefix max) نگه داشته می‌شود؛
+# پرسش تداخل با bisect در O(log n) (به‌علاوه تعداد نتایج) پاسخ داده می‌شود.
+# با رویدادهای ORM روی Contract و بعد از commit باطل می‌شود و TTL هم دارد.
+# مسیر نوشتن (create/update) همچنان به بررسی SQL در check_overlap تکیه می‌کند.
+
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from ..models import Contract, ContractStatusEnum
+
+LEASE_INDEX_TTL_SECONDS = float(os.environ.get("LEASE_INDEX_TTL_SECONDS", "300"))
+
+BLOCKING_STATUSES = [
+    ContractStatusEnum.active,
+    ContractStatusEnum.signed,
+    ContractStatusEnum.approved,
+    ContractStatusEnum.pending_approval
+]
+
+class ShopLeaseIndex:
+    # rows: (start_date, end_date, contract_id, status) مرتب بر اساس شروع
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda r: (r[0], r[2]))
+        self.starts = [r[0] for r in self.rows]
+        self.max_end = []
+        current = None
+        for r in self.rows:
+            current = r[1] if current is None or r[1] > current else current
+            self.max_end.append(current)
+
+    def overlapping(self, start_date, end_date, exclude_contract_id=None):
+        # بازه‌ها نیمه‌باز [start, end) هستند: تداخل یعنی start < end_date و end > start_date
+        found = []
+        i = bisect_left(self.starts, end_date) - 1
+        while i >= 0 and self.max_end[i] > start_date:
+            row = self.rows[i]
+            if row[1] > start_date and row[2] != exclude_contract_id:
+                found.append(row)
+            i -= 1
+        found.reverse()
+        return found
+
+    def intervals_between(self, start_date, end_date):
+        # بازه‌های مسدود در [start_date, end_date) به ترتیب شروع؛ اولین کاندید با bisect روی prefix max
+        i = bisect_right(self.max_end, start_date)
+        while i < len(self.rows) and self.starts[i] < end_date:
+            row = self.rows[i]
+            if row[1] > start_date:
+                yield row[0], row[1]
+            i += 1
+
+class LeaseIndexCache:
+    def __init__(self, ttl: float = LEASE_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._shops = {}
+        self._lock = threading.Lock()
+        self._generation = {}
+
+    def _load(self, db, shop_id: str) -> ShopLeaseIndex:
+        rows = db.execute(
+            select(Contract.id, Contract.start_date, Contract.end_date, Contract.status)
+            .where(Contract.shop_id == shop_id, Contract.status.in_(BLOCKING_STATUSES))
+        ).all()
+        return ShopLeaseIndex([(r.start_date, r.end_date, r.id, r.status) for r in rows])
+
+    def get(self, db, shop_id: str) -> ShopLeaseIndex:
+        with self._lock:
+            entry = self._shops.get(shop_id)
+            generation = self._generation.get(shop_id, 0)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        index = self._load(db, shop_id)
+        with self._lock:
+            # اگر در حین بارگذاری قراردادی تغییر کرده باشد، نتیجه کش نمی‌شود
+            if self._generation.get(shop_id, 0) == generation:
+                self._shops[shop_id] = (index, time.monotonic() + self.ttl)
+        return index
+
+    def invalidate(self, shop_id: str):
+        with self._lock:
+            self._generation[shop_id] = self._generation.get(shop_id, 0) + 1
+            self._shops.pop(shop_id, None)
+
+cache = LeaseIndexCache()
+
+def overlapping_contracts(db, shop_id: str, start_date, end_date, exclude_contract_id=None):
+    return cache.get(db, shop_id).overlapping(start_date, end_date, exclude_contract_id)
+
+# --- باطل‌سازی ---
+# در flush باطل می‌شود و شناسه مغازه در session نگه داشته می‌شود تا بعد از commit/rollback دوباره باطل شود
+# (خواننده‌ای که بین flush و commit بارگذاری کرده، داده قدیمی را کش نکند).
+
+def _touched_shops(target):
+    shops = set()
+    state = inspect(target)
+    history = state.attrs.shop_id.history
+    for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+        if value is not None:
+            shops.add(value)
+    return shops
+
+def _contract_changed(mapper, connection, target):
+    shops = _touched_shops(target)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("lease_index_shops", set()).update(shops)
+    for shop_id in shops:
+        cache.invalidate(shop_id)
+
+def _after_transaction(session):
+    for shop_id in session.info.pop("lease_index_shops", ()):
+        cache.invalidate(shop_id)
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Contract, _event, _contract_changed)
+event.listen(Session, "after_commit", _after_transaction)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_transaction(session))
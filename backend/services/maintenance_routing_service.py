@@ -0,0 +1,136 @@
+# maintenance_routing_service.py
+# وظیفه: جدول مسیریابی اعلان درخواست‌های تعمیرات (نوع خرابی → دپارتمان‌ها و کاربران)
+# قواعد هر category الگوهایی روی نام دپارتمان هستند (بدون حساسیت به حروف، مثل ilike '%...%').
+# category بدون قاعده از قاعده "*" (پیش‌فرض: عملیات و FM) استفاده می‌کند.
+# قواعد از MAINTENANCE_ROUTING_RULES (JSON) خوانده می‌شوند، مثلاً: {"برق": ["fm", "برق"], "*": ["عملیات", "fm"]}
+# جدول با دو کوئری ساخته و در حافظه نگه داشته می‌شود؛ با تغییر Department یا دپارتمان/نام کاربری User باطل می‌شود.
+
+import json
+import os
+import threading
+import time
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from ..models import Department, User
+
+MAINTENANCE_ROUTING_TTL_SECONDS = float(os.environ.get("MAINTENANCE_ROUTING_TTL_SECONDS", "600"))
+
+DEFAULT_RULES = {"*": ["عملیات", "fm"]}
+
+def load_rules() -> dict:
+    rules = dict(DEFAULT_RULES)
+    raw = os.environ.get("MAINTENANCE_ROUTING_RULES")
+    if raw:
+        rules.update(json.loads(raw))
+    return rules
+
+RULES = load_rules()
+
+def set_rule(category: str, patterns):
+    # افزودن/تغییر قاعده در زمان اجرا
+    RULES[category] = list(patterns)
+    cache.invalidate()
+
+def matching_departments(departments, patterns):
+    patterns = [p.lower() for p in patterns]
+    return [dept_id for dept_id, name in departments if any(p in name.lower() for p in patterns)]
+
+class RoutingTable:
+    def __init__(self, departments, users, rules):
+        # departments: (id, name)؛ users: (id, username, department_id)
+        self.rules = rules
+        self.departments = departments
+        self.users_by_department = {}
+        for user in users:
+            self.users_by_department.setdefault(user[2], []).append((user[0], user[1]))
+        self._routes = {}
+
+    @classmethod
+    def load(cls, db, rules):
+        departments = [tuple(r) for r in db.execute(select(Department.id, Department.name).order_by(Department.name)).all()]
+        wanted = matching_departments(departments, [p for patterns in rules.values() for p in patterns])
+        users = []
+        if wanted:
+            users = db.execute(
+                select(User.id, User.username, User.department_id)
+                .where(User.department_id.in_(wanted))
+                .order_by(User.username)
+            ).all()
+        return cls(departments, [tuple(u) for u in users], rules)
+
+    def route(self, category):
+        # (department_ids, [(user_id, username)]) بدون تکرار کاربر
+        key = category if category in self.rules else "*"
+        route = self._routes.get(key)
+        if route is None:
+            department_ids = matching_departments(self.departments, self.rules.get(key, []))
+            seen = set()
+            users = []
+            for dept_id in department_ids:
+                for user in self.users_by_department.get(dept_id, []):
+                    if user[0] not in seen:
+                        seen.add(user[0])
+                        users.append(user)
+            route = self._routes[key] = (department_ids, users)
+        return route
+
+class RoutingCache:
+    def __init__(self, ttl: float = MAINTENANCE_ROUTING_TTL_SECONDS):
+        self.ttl = ttl
+        self._table = None
+        self._expires = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db) -> RoutingTable:
+        with self._lock:
+            if self._table is not None and self._expires > time.monotonic():
+                return self._table
+            generation = self._generation
+        table = RoutingTable.load(db, dict(RULES))
+        with self._lock:
+            if generation == self._generation:
+                self._table = table
+                self._expires = time.monotonic() + self.ttl
+        return table
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._table = None
+
+cache = RoutingCache()
+
+def recipients(db, category):
+    return cache.get(db).route(category)[1]
+
+# --- باطل‌سازی (همان الگوی lease_index_service) ---
+# ورود کاربر (به‌روزرسانی هش رمز) جدول را باطل نمی‌کند؛ فقط ستون‌های مؤثر در مسیریابی.
+
+ROUTED_USER_COLUMNS = ("department_id", "username")
+
+def _mark(target):
+    session = object_session(target)
+    if session is not None:
+        session.info["maintenance_routing_dirty"] = True
+    cache.invalidate()
+
+def _changed(mapper, connection, target):
+    _mark(target)
+
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in ROUTED_USER_COLUMNS):
+        _mark(target)
+
+def _after_transaction(session):
+    if session.info.pop("maintenance_routing_dirty", False):
+        cache.invalidate()
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Department, _event, _changed)
+event.listen(User, "after_insert", _changed)
+event.listen(User, "after_delete", _changed)
+event.listen(User, "after_update", _user_updated)
+event.listen(Session, "after_commit", _after_transaction)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_transaction(session))
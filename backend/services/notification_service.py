@@ -1,8 +1,11 @@
 # notification_service.py
 # وظیفه: ارسال پیامک، ایمیل، پوش
+# ارسال واقعی با transportهای delivery_transport_service (pool اتصال و محدودیت نرخ) انجام می‌شود.
+
+from . import delivery_transport_service
 
 def send_sms(to, message):
-    print(f"[SMS] To: {to} | Message: {message}")
+    delivery_transport_service.sms_gateway().send(to, message)
 
 def send_email(to, subject, body):
-    print(f"[EMAIL] To: {to} | Subject: {subject} | Body: {body}") 
\ No newline at end of file
+    delivery_transport_service.email_transport().send(to, subject, body)
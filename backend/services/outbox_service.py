@@ -0,0 +1,211 @@
+# outbox_service.py
+# وظیفه: صف خروجی (transactional outbox) برای ایمیل و پیامک
+# روترها پیام را در همان تراکنش رکورد اصلی در outbox_messages ثبت می‌کنند (enqueue) و بلافاصله پاسخ می‌دهند.
+# dispatcher در یک thread پس‌زمینه پیام‌های سررسیده را دسته‌ای claim و با یک thread pool ارسال می‌کند.
+# ارسال ناموفق با backoff نمایی (با jitter) دوباره تلاش می‌شود و بعد از OUTBOX_MAX_ATTEMPTS به failed می‌رود.
+# پیام‌هایی که در حالت sending مانده‌اند (کرش process) بعد از OUTBOX_CLAIM_TIMEOUT_SECONDS دوباره pending می‌شوند.
+# وضعیت email_sent اعلان‌ها از وضعیت پیام‌های هر گیرنده محاسبه می‌شود.
+
+import logging
+import os
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from prometheus_client import Counter
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from ..models import OutboxMessage, Notification
+from . import notification_service
+
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", "10"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_MAX_SECONDS", "1800"))
+OUTBOX_CLAIM_TIMEOUT_SECONDS = float(os.environ.get("OUTBOX_CLAIM_TIMEOUT_SECONDS", "300"))
+
+DELIVERED = Counter("outbox_messages_total", "Outbox delivery attempts", ["channel", "result"])
+logger = logging.getLogger(__name__)
+
+SENDERS = {
+    "email": lambda m: notification_service.send_email(m.recipient, m.subject, m.body),
+    "sms": lambda m: notification_service.send_sms(m.recipient, m.body),
+}
+
+def enqueue(db, channel: str, recipient: str, body: str, subject: str = None, source_type: str = None, source_id: str = None) -> OutboxMessage:
+    # commit با فراخواننده است؛ بعد از commit dispatcher بیدار می‌شود
+    if channel not in SENDERS:
+        raise ValueError(f"unknown outbox channel: {channel}")
+    message = OutboxMessage(
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        source_type=source_type,
+        source_id=source_id
+    )
+    db.add(message)
+    db.info["outbox_pending"] = True
+    return message
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+def notification_status(counts: dict) -> str:
+    if counts.get("pending") or counts.get("sending"):
+        return "pending"
+    return "failed" if counts.get("failed") else "sent"
+
+class Dispatcher:
+    def __init__(self, poll: float = OUTBOX_POLL_SECONDS, batch_size: int = OUTBOX_BATCH_SIZE, workers: int = OUTBOX_WORKERS):
+        self.poll = poll
+        self.batch_size = batch_size
+        self.workers = workers
+        self._session_factory = None
+        self._executor = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, session_factory):
+        if self._thread is not None:
+            return
+        self._session_factory = session_factory
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox")
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=10)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.dispatch_once()
+            except Exception:
+                logger.exception("outbox dispatch failed")
+                handled = 0
+            # دسته کامل یعنی احتمالاً پیام‌های بیشتری منتظرند
+            if handled < self.batch_size:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+
+    def claim(self, db, now: datetime):
+        token = str(uuid.uuid4())
+        db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.status == "sending", OutboxMessage.claimed_at < now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT_SECONDS))
+            .values(status="pending", claim_token=None)
+        )
+        due = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now)
+            .order_by(OutboxMessage.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        # شرط status دوباره چک می‌شود تا دو dispatcher هم‌زمان یک پیام را برندارند
+        db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()), OutboxMessage.status == "pending")
+            .values(status="sending", claim_token=token, claimed_at=now, attempts=OutboxMessage.attempts + 1),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        return db.execute(
+            select(
+                OutboxMessage.id, OutboxMessage.channel, OutboxMessage.recipient, OutboxMessage.subject,
+                OutboxMessage.body, OutboxMessage.attempts, OutboxMessage.source_type, OutboxMessage.source_id
+            ).where(OutboxMessage.claim_token == token)
+        ).all()
+
+    def _deliver(self, message):
+        try:
+            SENDERS[message.channel](message)
+            return None
+        except Exception as exc:
+            return str(exc) or type(exc).__name__
+
+    def dispatch_once(self) -> int:
+        db = self._session_factory()
+        try:
+            messages = self.claim(db, datetime.utcnow())
+            if not messages:
+                return 0
+            errors = list(self._executor.map(self._deliver, messages))
+            self.record(db, messages, errors)
+            return len(messages)
+        finally:
+            db.close()
+
+    def record(self, db, messages, errors):
+        now = datetime.utcnow()
+        sent = [m.id for m, error in zip(messages, errors) if error is None]
+        if sent:
+            db.execute(
+                update(OutboxMessage).where(OutboxMessage.id.in_(sent))
+                .values(status="sent", sent_at=now, claim_token=None, last_error=None),
+                execution_options={"synchronize_session": False}
+            )
+        for message, error in zip(messages, errors):
+            DELIVERED.labels(message.channel, "sent" if error is None else "error").inc()
+            if error is None:
+                continue
+            values = {"claim_token": None, "last_error": error}
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                values["status"] = "failed"
+            else:
+                values["status"] = "pending"
+                values["next_attempt_at"] = now + backoff(message.attempts)
+            db.execute(
+                update(OutboxMessage).where(OutboxMessage.id == message.id).values(**values),
+                execution_options={"synchronize_session": False}
+            )
+        notification_ids = {m.source_id for m in messages if m.source_type == "notification" and m.channel == "email"}
+        if notification_ids:
+            refresh_notifications(db, notification_ids)
+        db.commit()
+
+def refresh_notifications(db, notification_ids):
+    rows = db.execute(
+        select(OutboxMessage.source_id, OutboxMessage.status, func.count())
+        .where(OutboxMessage.source_type == "notification", OutboxMessage.channel == "email", OutboxMessage.source_id.in_(notification_ids))
+        .group_by(OutboxMessage.source_id, OutboxMessage.status)
+    ).all()
+    counts = {}
+    for source_id, status, count in rows:
+        counts.setdefault(source_id, {})[status] = count
+    for notification_id, by_status in counts.items():
+        db.execute(
+            update(Notification).where(Notification.id == notification_id).values(email_sent=notification_status(by_status)),
+            execution_options={"synchronize_session": False}
+        )
+
+def deliveries(db, source_type: str, source_id: str):
+    return db.query(OutboxMessage).filter(
+        OutboxMessage.source_type == source_type, OutboxMessage.source_id == source_id
+    ).order_by(OutboxMessage.created_at).all()
+
+dispatcher = Dispatcher()
+
+def _after_commit(session):
+    if session.info.pop("outbox_pending", False):
+        dispatcher.wake()
+
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: session.info.pop("outbox_pending", None))
@@ -0,0 +1,213 @@
+# pdf_render_service.py
+# وظیفه: تولید PDF قرارداد و درخواست تعمیرات در process pool با کش دیسکی
+# کلید کش hash محتوای سند (فیلدها + تاریخچه گردش کار + نسخه قالب) است؛ سند تغییرنکرده دوباره رندر نمی‌شود.
+# فایل‌ها در PDF_CACHE_DIR/{sha}.pdf ذخیره می‌شوند و همان sha به‌عنوان ETag برمی‌گردد.
+# حجم پوشه کش به PDF_CACHE_MAX_BYTES محدود است (LRU بر اساس زمان آخرین دسترسی، مثل کش QR).
+# تعداد کارهای در انتظار محدود است؛ بیش از آن 503 برمی‌گردد.
+# این ماژول به models وابسته نیست تا processهای spawn سبک بمانند؛ روترها سند را به‌صورت dict می‌سازند.
+
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from . import http_cache_service, qr_cache_service
+from .http_cache_service import DiskBudget, etag_for, etag_matches
+
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "static/pdf_cache")
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_MAX_PENDING = int(os.environ.get("PDF_RENDER_MAX_PENDING", "32"))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# با هر تغییر در قالب‌ها زیاد شود تا کش قبلی استفاده نشود
+RENDER_VERSION = 1
+
+# --- قالب‌ها (در process کارگر اجرا می‌شوند) ---
+
+def _draw_contract(p, doc):
+    p.setFont("Helvetica", 14)
+    p.drawString(100, 800, f"قرارداد شماره: {doc['id']}")
+    p.drawString(100, 780, f"مستاجر: {doc['tenant_id']}")
+    p.drawString(100, 760, f"مغازه: {doc['shop_id']}")
+    p.drawString(100, 740, f"تاریخ شروع: {doc['start_date']}")
+    p.drawString(100, 720, f"تاریخ پایان: {doc['end_date']}")
+    p.drawString(100, 700, f"مبلغ: {doc['amount']}")
+    p.drawString(100, 680, f"وضعیت: {doc['status']}")
+    # تاریخچه گردش کار
+    y = 650
+    p.setFont("Helvetica", 10)
+    for s in doc["workflow"]:
+        p.drawString(100, y, f"{s['timestamp']}: {s['step']} - {s['note'] or ''}")
+        y -= 20
+        if y < 100:
+            p.showPage()
+            y = 800
+
+def _draw_maintenance(p, doc):
+    qr_buffer = io.BytesIO(qr_cache_service.cache.png(doc["qr_data"]))
+    p.setFont("Helvetica", 14)
+    p.drawString(100, 800, f"درخواست تعمیرات شماره: {doc['id']}")
+    p.drawString(100, 780, f"مستاجر: {doc['tenant_id']}")
+    p.drawString(100, 760, f"نوع خرابی: {doc['category']}")
+    p.drawString(100, 740, f"زمان پیشنهادی: {doc['suggested_time']}")
+    p.drawString(100, 720, f"توضیحات: {doc['description']}")
+    p.drawString(100, 700, f"وضعیت: {doc['status']}")
+    p.drawString(100, 680, f"کارگران:")
+    y = 660
+    for w in doc["workers"]:
+        p.drawString(120, y, f"- {w}")
+        y -= 20
+        if y < 100:
+            p.showPage()
+            y = 800
+    # درج QR Code
+    p.drawImage(ImageReader(qr_buffer), 400, 650, width=100, height=100)
+
+TEMPLATES = {
+    "contract": _draw_contract,
+    "maintenance": _draw_maintenance,
+}
+
+def render_pdf(kind: str, doc: dict) -> bytes:
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    TEMPLATES[kind](p, doc)
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+def _render_to_file(kind: str, doc: dict, path: str) -> str:
+    data = render_pdf(kind, doc)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+# --- کش و pool (در process اصلی) ---
+
+def document_key(kind: str, doc: dict) -> str:
+    raw = json.dumps([RENDER_VERSION, kind, doc], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class RenderPool:
+    def __init__(
+        self, workers: int = PDF_RENDER_WORKERS, max_pending: int = PDF_RENDER_MAX_PENDING,
+        cache_dir: str = PDF_CACHE_DIR, cache_max_bytes: int = PDF_CACHE_MAX_BYTES
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache_dir = cache_dir
+        self.disk = DiskBudget(cache_dir, ".pdf", cache_max_bytes)
+        self._executor = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # با پایان هر رندر notify می‌شود؛ future() به‌جای polling روی آن منتظر جای خالی می‌ماند
+        self._freed = threading.Condition(self._lock)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: fork کردن process چندنخی سرور امن نیست
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def cached(self, key: str):
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        self.disk.touch(path)
+        return path
+
+    def _busy(self):
+        return HTTPException(status_code=503, detail="PDF rendering is busy, try again shortly", headers={"Retry-After": "2"})
+
+    def _start(self, kind: str, doc: dict, key: str):
+        # با قفل گرفته‌شده صدا زده می‌شود؛ (future, تازه‌ساخته‌شده)
+        future = self._inflight.get(key)
+        if future is not None:
+            return future, False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        future = self._get_executor().submit(_render_to_file, kind, doc, self.path_for(key))
+        self._inflight[key] = future
+        return future, True
+
+    def _track(self, key: str, future, started: bool):
+        # خارج از قفل: اگر future تمام شده باشد callback همین‌جا اجرا می‌شود
+        if started:
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def submit(self, kind: str, doc: dict, key: str):
+        # درخواست‌های هم‌زمان برای یک سند منتظر همان رندر می‌مانند
+        with self._lock:
+            if key not in self._inflight and len(self._inflight) >= self.max_pending:
+                raise self._busy()
+            future, started = self._start(kind, doc, key)
+        return self._track(key, future, started)
+
+    def _forget(self, key: str, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            # اگر یک process کارگر از بین رفته باشد، pool بعدی از نو ساخته می‌شود
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._executor = None
+            self._freed.notify_all()
+        if not future.cancelled() and future.exception() is None:
+            try:
+                self.disk.added(os.path.getsize(future.result()))
+            except OSError:
+                pass
+
+    def future(self, kind: str, doc: dict, key: str = None, wait: float = 60) -> Future:
+        # برای خروجی‌های دسته‌ای: سند کش‌شده فوراً آماده است و اگر صف پر باشد به‌جای 503 منتظر می‌ماند
+        key = key or document_key(kind, doc)
+        path = self.cached(key)
+        if path:
+            done = Future()
+            done.set_result(path)
+            return done
+        with self._lock:
+            ready = self._freed.wait_for(lambda: key in self._inflight or len(self._inflight) < self.max_pending, timeout=wait)
+            if not ready:
+                raise self._busy()
+            future, started = self._start(kind, doc, key)
+        return self._track(key, future, started)
+
+    async def render(self, kind: str, doc: dict, key: str = None) -> str:
+        key = key or document_key(kind, doc)
+        path = self.cached(key)
+        if path:
+            return path
+        return await asyncio.wrap_future(self.submit(kind, doc, key))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+pool = RenderPool()
+
+# --- پاسخ HTTP ---
+# private, no-cache: مرورگر نگه می‌دارد ولی هر بار با If-None-Match اعتبارسنجی می‌کند
+
+PDF_CACHE_CONTROL = "private, no-cache"
+
+def not_modified(key: str) -> Response:
+    return http_cache_service.not_modified(key, PDF_CACHE_CONTROL)
+
+def pdf_response(path: str, key: str, filename: str) -> FileResponse:
+    return FileResponse(path, media_type="application/pdf", filename=filename, headers={"ETag": etag_for(key), "Cache-Control": PDF_CACHE_CONTROL})
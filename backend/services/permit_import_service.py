@@ -0,0 +1,233 @@
+# permit_import_service.py
+# وظیفه: ورود دسته‌ای مجوزهای کار و کارگران از CSV یا NDJSON
+# بدنه درخواست تکه‌به‌تکه خوانده و سطر به سطر اعتبارسنجی می‌شود؛ سطرهای معتبر در تکه‌های
+# PERMIT_IMPORT_CHUNK_ROWS تایی با insert دسته‌ای (executemany) و هر تکه در یک تراکنش ثبت می‌شوند.
+# خطای هر سطر (شماره خط + پیام) در پاسخ برمی‌گردد و بقیه سطرها ثبت می‌شوند.
+#
+# CSV: هر سطر یک کارگر (worker_name, worker_code) به‌همراه فیلدهای مجوز؛ سطرهای با ref یکسان
+# یک مجوز هستند و فیلدهای مجوز از اولین سطر آن ref برداشته می‌شود. سطر بدون ref یک مجوز جداست.
+# NDJSON: هر خط یک مجوز با لیست workers (مثل POST /request)؛ خط با ref تکراری فقط کارگر اضافه می‌کند.
+#
+# insert دسته‌ای رویدادهای ORM را اجرا نمی‌کند؛ شمارنده‌های داشبورد، ردیف‌های permit_approvals و permit_calendar_slots
+# در همان تراکنش دستی ثبت می‌شوند.
+
+import codecs
+import csv
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from anyio import from_thread
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import PermitRequest, WorkerPermit
+from . import approval_service, calendar_service, counter_service
+
+PERMIT_IMPORT_CHUNK_ROWS = int(os.environ.get("PERMIT_IMPORT_CHUNK_ROWS", "1000"))
+PERMIT_IMPORT_MAX_ROWS = int(os.environ.get("PERMIT_IMPORT_MAX_ROWS", "100000"))
+PERMIT_IMPORT_MAX_ERRORS = int(os.environ.get("PERMIT_IMPORT_MAX_ERRORS", "1000"))
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+class WorkerImport(BaseModel):
+    name: str
+    code: Optional[str] = None
+
+class PermitImport(BaseModel):
+    ref: Optional[str] = None
+    company_name: str
+    job_location: str
+    onsite_in_charge: str
+    contact_no: str
+    tenant_or_contractor: str
+    job_date_from: datetime
+    job_date_to: datetime
+    job_time_from: str
+    job_time_to: str
+    job_type: str
+    job_description: str
+    requested_by: str
+    workers: List[WorkerImport] = []
+
+PERMIT_FIELDS = [f for f in PermitImport.model_fields if f != "workers"]
+WORKERS = TypeAdapter(List[WorkerImport])
+
+def detect_format(content_type: Optional[str]) -> str:
+    fmt = FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Expected text/csv or application/x-ndjson (or ?format=csv|ndjson)")
+    return fmt
+
+# --- خواندن بدنه ---
+
+def stream_chunks(stream):
+    # تکه‌های بدنه async در thread فراخوان (run_in_threadpool) خوانده می‌شوند
+    while True:
+        try:
+            yield from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+def text_lines(chunks):
+    # خط‌ها با "\n" انتهایی تا فیلدهای چندخطی CSV سالم بمانند؛ BOM اکسل حذف می‌شود
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+def csv_records(lines):
+    # (شماره خط، dict به شکل NDJSON)
+    reader = csv.DictReader(lines)
+    missing = [c for c in PERMIT_FIELDS if c != "ref" and c not in (reader.fieldnames or [])]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV header is missing columns: {', '.join(missing)}")
+    for row in reader:
+        record = {k: v.strip() for k, v in row.items() if k in PERMIT_FIELDS and v and v.strip()}
+        worker_name = (row.get("worker_name") or "").strip()
+        record["workers"] = [{"name": worker_name, "code": (row.get("worker_code") or "").strip() or None}] if worker_name else []
+        yield reader.line_num, record
+
+def ndjson_records(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None
+            continue
+        yield number, record if isinstance(record, dict) else None
+
+# --- ثبت ---
+
+def _validation_messages(exc: ValidationError):
+    return [f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors()]
+
+def write_chunk(connection, permits, workers):
+    if permits:
+        connection.execute(insert(PermitRequest.__table__), permits)
+        # مجوزهای جدید همه pending هستند
+        counter_service.increment(connection, "permits.total", len(permits))
+        counter_service.increment(connection, "permits.pending", len(permits))
+        approval_service.insert_pending(connection, [p["id"] for p in permits])
+        calendar_service.insert_slots(connection, permits)
+    if workers:
+        connection.execute(insert(WorkerPermit.__table__), workers)
+
+class Importer:
+    def __init__(self, engine):
+        self.engine = engine
+        self.refs = {}  # ref → permit_id (None اگر ثبت آن مجوز شکست خورد)
+        self.permits = []
+        self.workers = []
+        self.lines = []
+        self.new_refs = []
+        self.rows = 0
+        self.permits_created = 0
+        self.workers_created = 0
+        self.chunks = 0
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line, messages, ref=None):
+        self.error_count += 1
+        if len(self.errors) < PERMIT_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "ref": ref, "errors": messages})
+
+    def add(self, line, record):
+        self.rows += 1
+        if record is None:
+            self.error(line, ["invalid JSON object"])
+            return
+        ref = record.get("ref") or None
+        if ref is not None and ref in self.refs:
+            permit_id = self.refs[ref]
+            if permit_id is None:
+                self.error(line, [f"permit for ref {ref} was not imported"], ref)
+                return
+            try:
+                workers = WORKERS.validate_python(record.get("workers") or [])
+            except ValidationError as exc:
+                self.error(line, _validation_messages(exc), ref)
+                return
+            if not workers:
+                self.error(line, [f"duplicate ref {ref} without workers"], ref)
+                return
+        else:
+            try:
+                data = PermitImport.model_validate(record)
+            except ValidationError as exc:
+                if ref is not None:
+                    self.refs[ref] = None
+                self.error(line, _validation_messages(exc), ref)
+                return
+            permit_id = str(uuid.uuid4())
+            permit = data.model_dump(include=set(PERMIT_FIELDS))
+            permit["id"] = permit_id
+            self.permits.append(permit)
+            workers = data.workers
+            if ref is not None:
+                self.refs[ref] = permit_id
+                self.new_refs.append(ref)
+        self.workers.extend({"id": str(uuid.uuid4()), "permit_request_id": permit_id, "name": w.name, "code": w.code} for w in workers)
+        self.lines.append((line, ref))
+        if len(self.permits) + len(self.workers) >= PERMIT_IMPORT_CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        try:
+            with self.engine.begin() as connection:
+                write_chunk(connection, self.permits, self.workers)
+            self.permits_created += len(self.permits)
+            self.workers_created += len(self.workers)
+            self.chunks += 1
+        except SQLAlchemyError as exc:
+            for ref in self.new_refs:
+                self.refs[ref] = None
+            message = f"chunk rolled back: {exc.__class__.__name__}"
+            for line, ref in self.lines:
+                self.error(line, [message], ref)
+        self.permits, self.workers, self.lines, self.new_refs = [], [], [], []
+
+    def result(self, fmt: str) -> dict:
+        return {
+            "format": fmt,
+            "rows": self.rows,
+            "permits_created": self.permits_created,
+            "workers_created": self.workers_created,
+            "chunks": self.chunks,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+def import_permits(engine, fmt: str, chunks) -> dict:
+    # chunks: iterator همگام از bytes؛ در threadpool اجرا می‌شود
+    lines = text_lines(chunks)
+    records = csv_records(lines) if fmt == "csv" else ndjson_records(lines)
+    importer = Importer(engine)
+    for line, record in records:
+        if importer.rows >= PERMIT_IMPORT_MAX_ROWS:
+            importer.error(line, [f"row limit {PERMIT_IMPORT_MAX_ROWS} reached; remaining rows were not read"])
+            break
+        importer.add(line, record)
+    importer.flush()
+    return importer.result(fmt)
@@ -0,0 +1,124 @@
+# principal_service.py
+# وظیفه: کش کاربر احراز هویت‌شده (principal) برای get_current_user و require_roles
+# کلید کش شناسه کاربر است؛ هر ورودی TTL دارد و اندازه کش با LRU محدود می‌شود.
+# update_user/delete_user بعد از commit ورودی را باطل می‌کنند تا لغو دسترسی فوری باشد.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from ..models import User
+from ..projections import Shape, Pluck
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+
+@dataclass(frozen=True)
+class NamedRef:
+    id: str
+    name: str
+
+# فقط‌خواندنی و جدا از session؛ همان ویژگی‌هایی که روترها از User استفاده می‌کنند
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    username: str
+    role_id: Optional[str]
+    department_id: Optional[str]
+    is_active: str
+    role: Optional[NamedRef]
+    department: Optional[NamedRef]
+
+PRINCIPAL_ROW = Shape(
+    User, "id", "username", "role_id", "department_id", "is_active",
+    role=Pluck("name"), department=Pluck("name")
+)
+
+def principal_query(user_id: str):
+    return PRINCIPAL_ROW.select().where(User.id == user_id)
+
+def principal_from_row(row) -> Optional[Principal]:
+    if row is None:
+        return None
+    return Principal(
+        id=row["id"],
+        username=row["username"],
+        role_id=row["role_id"],
+        department_id=row["department_id"],
+        is_active=row["is_active"],
+        role=NamedRef(row["role_id"], row["role"]) if row["role_id"] and row["role"] is not None else None,
+        department=NamedRef(row["department_id"], row["department"]) if row["department_id"] and row["department"] is not None else None,
+    )
+
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # با هر باطل‌سازی زیاد می‌شود؛ نتیجه خواندنی که قبل از باطل‌سازی شروع شده ذخیره نمی‌شود
+        self._generation = 0
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            principal, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, principal: Principal, generation: int):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+cache = PrincipalCache()
+
+def load_principal(db, user_id: str) -> Optional[Principal]:
+    principal = cache.get(user_id)
+    if principal is not None:
+        return principal
+    generation = cache.generation()
+    principal = principal_from_row(db.execute(principal_query(user_id)).mappings().first())
+    if principal is not None:
+        cache.put(principal, generation)
+    return principal
+
+async def load_principal_async(db, user_id: str) -> Optional[Principal]:
+    principal = cache.get(user_id)
+    if principal is not None:
+        return principal
+    generation = cache.generation()
+    principal = principal_from_row((await db.execute(principal_query(user_id))).mappings().first())
+    if principal is not None:
+        cache.put(principal, generation)
+    return principal
+
+def invalidate(user_id: str):
+    cache.invalidate(user_id)
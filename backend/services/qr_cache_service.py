@@ -0,0 +1,97 @@
+# qr_cache_service.py
+# وظیفه: کش تصاویر QR بر اساس محتوا (sha256 بایت‌های payload)
+# دو لایه: LRU در حافظه (تعداد محدود) و LRU روی دیسک (حجم محدود، بر اساس زمان آخرین دسترسی).
+# تصویر یک payload هیچ‌وقت تغییر نمی‌کند، پس ETag قوی و Cache-Control طولانی امن است.
+# در processهای رندر PDF هم استفاده می‌شود؛ به models وابسته نیست.
+
+import hashlib
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import qrcode
+from fastapi import Response
+from .http_cache_service import DiskBudget, etag_for, etag_matches
+from . import http_cache_service
+
+QR_CACHE_DIR = os.environ.get("QR_CACHE_DIR", "static/qr_cache")
+QR_MEMORY_ITEMS = int(os.environ.get("QR_MEMORY_ITEMS", "512"))
+QR_DISK_MAX_BYTES = int(os.environ.get("QR_DISK_MAX_BYTES", str(64 * 1024 * 1024)))
+QR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def payload_key(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def make_png(payload: str) -> bytes:
+    img = qrcode.make(payload)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+class QrCache:
+    def __init__(self, cache_dir: str = QR_CACHE_DIR, memory_items: int = QR_MEMORY_ITEMS, disk_max_bytes: int = QR_DISK_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk = DiskBudget(cache_dir, ".png", disk_max_bytes)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _remember(self, key: str, png: bytes):
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str):
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+        except FileNotFoundError:
+            return None
+        self.disk.touch(path)
+        return png
+
+    def _write_disk(self, key: str, png: bytes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+        self.disk.added(len(png))
+
+    def get(self, payload: str):
+        # (key, png, created): created یعنی تصویر همین حالا ساخته شد
+        key = payload_key(payload)
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return key, png, False
+        png = self._read_disk(key)
+        created = png is None
+        if created:
+            png = make_png(payload)
+            self._write_disk(key, png)
+        self._remember(key, png)
+        return key, png, created
+
+    def png(self, payload: str) -> bytes:
+        return self.get(payload)[1]
+
+cache = QrCache()
+
+# --- پاسخ HTTP ---
+
+def not_modified(key: str) -> Response:
+    return http_cache_service.not_modified(key, QR_CACHE_CONTROL)
+
+def png_response(key: str, png: bytes) -> Response:
+    return Response(content=png, media_type="image/png", headers={"ETag": etag_for(key), "Cache-Control": QR_CACHE_CONTROL})
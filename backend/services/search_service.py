@@ -0,0 +1,246 @@
+# search_service.py
+# وظیفه: جستجوی سراسری متنی روی مجوزها، کارها، قراردادها، مستاجرها و شکایت‌ها
+# موتور پیش‌فرض روی SQLite جدول مجازی FTS5 (search_index) است که با triggerهای دیتابیس هم‌زمان می‌ماند،
+# پس insert دسته‌ای و تغییرات Core هم بدون رویداد ORM ایندکس می‌شوند. rowid هر سند شناسه search_documents است
+# (kind, ref_id) تا به‌روزرسانی و حذف با rowid انجام شود، نه با اسکن.
+# پرس‌وجو: همه کلمات با AND و کلمه آخر پیشوندی ("کلمه"*)؛ رتبه‌بندی شبیه bm25 با وزن بیشتر عنوان.
+# روی دیتابیس‌های دیگر (یا SEARCH_ENGINE=like) موتور LIKE مستقیم روی جدول‌های منبع استفاده می‌شود؛
+# موتورهای دیگر با register_engine اضافه می‌شوند.
+
+import os
+import re
+import unicodedata
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, inspect, or_, select, text
+from ..models import Complaint, Contract, PermitRequest, Shop, Task, Tenant
+
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "auto")
+SEARCH_MAX_TERMS = 8
+SEARCH_MAX_LIMIT = 100
+SEARCH_RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", "500"))
+TITLE_WEIGHT = 10.0
+AVERAGE_FIELD_TOKENS = 12.0
+SNIPPET_TOKENS = 12
+
+class Source:
+    # title/body: عبارت‌های SQL با {row} (new/old یا نام مستعار جدول)
+    # dependents: (جدول، ستون‌ها، کلید خارجی) که تغییرشان متن این منبع را عوض می‌کند
+    def __init__(self, kind, table, title, body, dependents=()):
+        self.kind = kind
+        self.table = table
+        self.title = title
+        self.body = body
+        self.dependents = dependents
+
+    @property
+    def columns(self):
+        found = []
+        for expr in self.title + self.body:
+            for column in re.findall(r"\{row\}\.(\w+)", expr):
+                if column not in found:
+                    found.append(column)
+        return found
+
+SOURCES = {
+    "permit": Source("permit", "permit_requests", ["{row}.company_name"],
+                     ["{row}.job_description", "{row}.contact_no", "{row}.job_location", "{row}.onsite_in_charge", "{row}.requested_by", "{row}.ref"]),
+    "task": Source("task", "tasks", ["{row}.title"], ["{row}.description"]),
+    "contract": Source("contract", "contracts", ["(SELECT shop_name FROM tenants WHERE id = {row}.tenant_id)"],
+                       ["(SELECT name FROM shops WHERE id = {row}.shop_id)", "(SELECT location FROM shops WHERE id = {row}.shop_id)"],
+                       dependents=[("tenants", ["shop_name"], "tenant_id"), ("shops", ["name", "location"], "shop_id")]),
+    "tenant": Source("tenant", "tenants", ["{row}.shop_name"], ["{row}.contract_info"]),
+    "complaint": Source("complaint", "complaints", ["{row}.description"], []),
+}
+
+# --- FTS5 ---
+
+def _text(exprs, row):
+    if not exprs:
+        return "''"
+    return " || ' ' || ".join(f"COALESCE({e.format(row=row)}, '')" for e in exprs)
+
+def _doc_id(source, row):
+    return f"(SELECT id FROM search_documents WHERE kind = '{source.kind}' AND ref_id = {row}.id)"
+
+def schema_statements() -> List[str]:
+    # همان دستورهای مهاجرت 0008 (برای rebuild روی دیتابیس‌هایی که با create_all ساخته شده‌اند)
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "kind, title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6')"
+    ]
+    for s in SOURCES.values():
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS search_{s.table}_ai AFTER INSERT ON {s.table} BEGIN "
+            f"INSERT INTO search_documents (kind, ref_id) VALUES ('{s.kind}', new.id); "
+            f"INSERT INTO search_index (rowid, kind, title, body) VALUES ({_doc_id(s, 'new')}, '{s.kind}', {_text(s.title, 'new')}, {_text(s.body, 'new')}); "
+            f"END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{s.table}_au AFTER UPDATE OF {', '.join(s.columns)} ON {s.table} BEGIN "
+            f"UPDATE search_index SET title = {_text(s.title, 'new')}, body = {_text(s.body, 'new')} WHERE rowid = {_doc_id(s, 'new')}; "
+            f"END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{s.table}_ad AFTER DELETE ON {s.table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = {_doc_id(s, 'old')}; "
+            f"DELETE FROM search_documents WHERE kind = '{s.kind}' AND ref_id = old.id; "
+            f"END",
+        ]
+        for table, columns, fk in s.dependents:
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS search_{table}_{s.table}_au AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN "
+                f"UPDATE search_index SET title = {_text(s.title, 'src')}, body = {_text(s.body, 'src')} "
+                f"FROM (SELECT d.id AS doc_id, c.* FROM {s.table} c JOIN search_documents d ON d.kind = '{s.kind}' AND d.ref_id = c.id WHERE c.{fk} = new.id) AS src "
+                f"WHERE search_index.rowid = src.doc_id; "
+                f"END"
+            )
+    return statements
+
+def backfill_statements() -> List[str]:
+    statements = []
+    for s in SOURCES.values():
+        statements += [
+            # ترتیب درج (rowid جدول) تا rowid ایندکس مثل ردیف‌های جدید با زمان ثبت بالا برود
+            f"INSERT INTO search_documents (kind, ref_id) SELECT '{s.kind}', id FROM {s.table} WHERE true ORDER BY rowid "
+            f"ON CONFLICT (kind, ref_id) DO NOTHING",
+            f"INSERT INTO search_index (rowid, kind, title, body) "
+            f"SELECT d.id, '{s.kind}', {_text(s.title, 'c')}, {_text(s.body, 'c')} "
+            f"FROM {s.table} c JOIN search_documents d ON d.kind = '{s.kind}' AND d.ref_id = c.id ORDER BY d.id",
+        ]
+    return statements + ["INSERT INTO search_index (search_index) VALUES ('optimize')"]
+
+def trigger_names() -> List[str]:
+    return [statement.split()[5] for statement in schema_statements()[1:]]
+
+def rebuild(engine):
+    # ساخت/بازسازی کامل ایندکس و triggerها (بعد از بازگردانی نسخه پشتیبان یا تغییر SOURCES)
+    with engine.begin() as connection:
+        for trigger in trigger_names():
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+        connection.exec_driver_sql("DELETE FROM search_documents")
+        for statement in schema_statements() + backfill_statements():
+            connection.exec_driver_sql(statement)
+    _fts_available.clear()
+
+def terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q or "")[:SEARCH_MAX_TERMS]
+
+def match_expression(words, kinds, prefix: bool = True) -> str:
+    # کلمات فقط در عنوان و متن؛ کلمه آخر پیشوندی (در حال تایپ)، بقیه کامل. kind به‌عنوان فیلتر ستون
+    quoted = ['"' + w.replace('"', '""') + '"' for w in words]
+    if prefix:
+        quoted[-1] += "*"
+    expression = "{title body} : (" + " ".join(quoted) + ")"
+    if kinds:
+        expression = "kind : (" + " OR ".join(f'"{k}"' for k in kinds) + ") AND " + expression
+    return expression
+
+def fold(value: str) -> str:
+    # هم‌ارز tokenizer (unicode61 remove_diacritics): حروف کوچک و بدون اعراب
+    decomposed = unicodedata.normalize("NFKD", (value or "").lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def score(words, title: str, body: str) -> float:
+    # BM25 ساده روی نامزدها: همه نامزدها همه کلمات را دارند، پس فقط تکرار (اشباع‌شده) و وزن عنوان مهم است
+    title_tokens = re.findall(r"\w+", fold(title))
+    body_tokens = re.findall(r"\w+", fold(body))
+    total = 0.0
+    for i, word in enumerate(fold(w) for w in words):
+        last = i == len(words) - 1
+        for weight, tokens in ((TITLE_WEIGHT, title_tokens), (1.0, body_tokens)):
+            tf = sum(1 for t in tokens if (t.startswith(word) if last else t == word))
+            total += weight * tf / (tf + 1.2 * (0.25 + 0.75 * len(tokens) / AVERAGE_FIELD_TOKENS))
+    return round(total, 4)
+
+def _matches(words, token: str) -> bool:
+    folded = fold(token)
+    return any(folded == fold(w) for w in words[:-1]) or folded.startswith(fold(words[-1]))
+
+def snippet_hits(words, value: str):
+    return [i for i, t in enumerate((value or "").split()) if any(_matches(words, part) for part in re.findall(r"\w+", t))]
+
+def snippet(words, value: str, size: int = SNIPPET_TOKENS) -> str:
+    # پنجره‌ای از متن حول اولین کلمه منطبق، با [ ] دور کلمات منطبق
+    tokens = (value or "").split()
+    hits = snippet_hits(words, value)
+    start = max(0, min(hits[0] - size // 3, len(tokens) - size)) if hits else 0
+    window = [f"[{t}]" if i in hits else t for i, t in enumerate(tokens) if start <= i < start + size]
+    return ("…" if start > 0 else "") + " ".join(window) + ("…" if start + size < len(tokens) else "")
+
+class Fts5Engine:
+    name = "fts5"
+
+    def search(self, db, words, kinds, limit):
+        # FTS5 جدیدترین SEARCH_RANK_WINDOW تطابق را به ترتیب rowid برمی‌گرداند (پیمایش زود متوقف می‌شود)
+        # و رتبه‌بندی در پایتون روی همین نامزدهاست؛ bm25() داخلی برای IDF همه تطابق‌ها را می‌شمارد.
+        # complete=False یعنی تطابق‌ها بیشتر از پنجره بود و فقط جدیدترین‌ها رتبه‌بندی شدند.
+        # ایندکس پیشوند تا ۶ حرف را پوشش می‌دهد؛ پیشوند بلندتر و رایج کل doclist را می‌خواند،
+        # پس اول کلمه آخر کامل جستجو می‌شود و اگر پنجره پر نشد پیشوندی.
+        statement = text(
+            "SELECT search_index.rowid AS doc_id, d.kind, d.ref_id, search_index.title, search_index.body "
+            "FROM search_index JOIN search_documents d ON d.id = search_index.rowid "
+            "WHERE search_index MATCH :match ORDER BY search_index.rowid DESC LIMIT :window"
+        )
+        rows = db.execute(statement, {"match": match_expression(words, kinds, prefix=False), "window": SEARCH_RANK_WINDOW}).all()
+        if len(rows) < SEARCH_RANK_WINDOW:
+            rows = db.execute(statement, {"match": match_expression(words, kinds), "window": SEARCH_RANK_WINDOW}).all()
+        scored = sorted(((score(words, r.title, r.body), r) for r in rows), key=lambda x: (-x[0], -x[1].doc_id))[:limit]
+        return {
+            "complete": len(rows) < SEARCH_RANK_WINDOW,
+            "results": [
+                {"kind": r.kind, "id": r.ref_id, "title": r.title, "snippet": snippet(words, r.body if snippet_hits(words, r.body) else r.title), "score": value}
+                for value, r in scored
+            ],
+        }
+
+# --- LIKE (دیتابیس‌های بدون FTS5) ---
+
+def _like_sources():
+    return {
+        "permit": (select(PermitRequest.id, PermitRequest.company_name),
+                   [PermitRequest.company_name, PermitRequest.job_description, PermitRequest.contact_no, PermitRequest.job_location]),
+        "task": (select(Task.id, Task.title), [Task.title, Task.description]),
+        "contract": (select(Contract.id, Tenant.shop_name).join(Tenant, Tenant.id == Contract.tenant_id).join(Shop, Shop.id == Contract.shop_id),
+                     [Tenant.shop_name, Shop.name, Shop.location]),
+        "tenant": (select(Tenant.id, Tenant.shop_name), [Tenant.shop_name, Tenant.contract_info]),
+        "complaint": (select(Complaint.id, Complaint.description), [Complaint.description]),
+    }
+
+class LikeEngine:
+    name = "like"
+
+    def search(self, db, words, kinds, limit):
+        results = []
+        for kind, (stmt, columns) in _like_sources().items():
+            if kinds and kind not in kinds:
+                continue
+            conditions = [or_(*[c.ilike(f"%{w}%") for c in columns]) for w in words]
+            for ref_id, title in db.execute(stmt.where(and_(*conditions)).limit(limit)).all():
+                results.append({"kind": kind, "id": ref_id, "title": title, "snippet": None, "score": None})
+        return {"complete": len(results) <= limit, "results": results[:limit]}
+
+ENGINES = {"fts5": Fts5Engine(), "like": LikeEngine()}
+
+def register_engine(name: str, engine):
+    ENGINES[name] = engine
+
+_fts_available = {}
+
+def engine_for(db):
+    if SEARCH_ENGINE != "auto":
+        return ENGINES[SEARCH_ENGINE]
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fts_available:
+        _fts_available[key] = bind.dialect.name == "sqlite" and inspect(bind).has_table("search_index")
+    return ENGINES["fts5" if _fts_available[key] else "like"]
+
+def search(db, q: str, kinds: Optional[List[str]] = None, limit: int = 20) -> dict:
+    unknown = [k for k in kinds or [] if k not in SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search kind: {', '.join(unknown)}")
+    words = terms(q)
+    engine = engine_for(db)
+    if not words:
+        return {"engine": engine.name, "complete": True, "results": []}
+    found = engine.search(db, words, kinds, min(limit, SEARCH_MAX_LIMIT))
+    return {"engine": engine.name, **found}
@@ -0,0 +1,348 @@
+# security_log_service.py
+# وظیفه: ذخیره لاگ‌های امنیتی (باز/بسته کردن واحدها توسط نگهبان) در پارتیشن‌های ماهانه
+# هر ماه یک جدول security_logs_YYYYMM با ایندکس‌های (check_time, id)، (store_id, ...) و (guard_id, ...) دارد
+# و در جدول security_log_partitions ثبت می‌شود. نوشتن بر اساس ماه check_time به پارتیشن همان ماه می‌رود
+# (پارتیشن در اولین نوشتن ساخته می‌شود؛ Maintainer ماه جاری و بعدی را از قبل می‌سازد).
+# خواندن فقط پارتیشن‌های هم‌پوشان با بازه زمانی را از جدید به قدیم می‌خواند تا صفحه پر شود.
+# نگهداری: پارتیشن‌های قدیمی‌تر از SECURITY_LOG_RETENTION_MONTHS ماه به NDJSON.gz در SECURITY_LOG_ARCHIVE_DIR
+# خروجی گرفته و حذف می‌شوند؛ لاگ با check_time قبل از این مرز پذیرفته نمی‌شود.
+# ورود دسته‌ای: NDJSON یک دور گشت در یک درخواست و یک تراکنش؛ id سمت دستگاه ارسال مجدد را بی‌اثر می‌کند.
+
+import gzip
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, func, insert, literal, select, update
+from sqlalchemy.schema import CreateIndex, CreateTable, DropTable
+from ..models import SecurityLogPartition
+from ..pagination import PageParams, apply_keyset, filter_date_range
+from . import counter_service
+from .permit_import_service import ndjson_records, text_lines
+
+SECURITY_LOG_RETENTION_MONTHS = int(os.environ.get("SECURITY_LOG_RETENTION_MONTHS", "24"))
+# خالی: پارتیشن منقضی بدون خروجی حذف می‌شود
+SECURITY_LOG_ARCHIVE_DIR = os.environ.get("SECURITY_LOG_ARCHIVE_DIR", "../database/security_log_archive")
+SECURITY_LOG_MAINTENANCE_SECONDS = int(os.environ.get("SECURITY_LOG_MAINTENANCE_SECONDS", "86400"))
+SECURITY_LOG_BATCH_MAX_LINES = int(os.environ.get("SECURITY_LOG_BATCH_MAX_LINES", "5000"))
+SECURITY_LOG_BATCH_MAX_ERRORS = 100
+# ساعت دستگاه‌ها ممکن است کمی جلو باشد
+SECURITY_LOG_MAX_FUTURE_SECONDS = int(os.environ.get("SECURITY_LOG_MAX_FUTURE_SECONDS", "86400"))
+ARCHIVE_BATCH_ROWS = 5000
+# سقف پارامترهای یک IN در SQLite
+ID_LOOKUP_CHUNK = 500
+
+logger = logging.getLogger(__name__)
+
+class LogRecord(BaseModel):
+    id: Optional[str] = None  # شناسه سمت دستگاه برای ارسال مجدد بدون تکرار
+    store_id: str
+    status: str  # open, close
+    guard_id: str
+    check_time: Optional[datetime] = None
+
+# --- پارتیشن‌ها ---
+
+# جدول‌های پارتیشن خارج از Base.metadata هستند (Alembic آن‌ها را نادیده می‌گیرد)
+partitions = MetaData()
+_lock = threading.Lock()
+_ready = set()  # ماه‌هایی که جدولشان در این پروسه قطعاً وجود دارد
+
+def month_key(moment: datetime) -> str:
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def month_bounds(key: str):
+    start = datetime.strptime(key, "%Y-%m")
+    return start, add_months(start, 1)
+
+def table_name(key: str) -> str:
+    return "security_logs_" + key.replace("-", "")
+
+def partition_table(key: str) -> Table:
+    name = table_name(key)
+    with _lock:
+        table = partitions.tables.get(name)
+        if table is None:
+            # guard_id بدون FK تا حذف یا آرشیو پارتیشن به جدول users وابسته نباشد
+            table = Table(
+                name, partitions,
+                Column("id", String, primary_key=True),
+                Column("store_id", String, nullable=False),
+                Column("check_time", DateTime, nullable=False),
+                Column("status", String, nullable=False),
+                Column("guard_id", String),
+                Index(f"ix_{name}_check_time_id", "check_time", "id"),
+                Index(f"ix_{name}_store_check_time", "store_id", "check_time", "id"),
+                Index(f"ix_{name}_guard_check_time", "guard_id", "check_time", "id"),
+            )
+    return table
+
+def ensure_partition(connection, key: str) -> Table:
+    table = partition_table(key)
+    if key in _ready:
+        return table
+    registry = SecurityLogPartition.__table__
+    state = connection.execute(select(registry.c.state).where(registry.c.month == key)).scalar()
+    if state == "archived":
+        raise HTTPException(status_code=409, detail=f"Security log partition {key} is archived")
+    if state is not None:
+        _ready.add(key)
+        return table
+    # IF NOT EXISTS: پروسه دیگری ممکن است هم‌زمان همین ماه را ساخته باشد
+    connection.execute(CreateTable(table, if_not_exists=True))
+    for index in table.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+    if connection.execute(select(registry.c.month).where(registry.c.month == key)).first() is None:
+        start, end = month_bounds(key)
+        connection.execute(insert(registry).values(month=key, table_name=table.name, starts_at=start, ends_at=end, state="active", created_at=datetime.utcnow()))
+    return table
+
+def retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    # ابتدای قدیمی‌ترین ماه نگهداری‌شده (ماه جاری + SECURITY_LOG_RETENTION_MONTHS ماه قبل)
+    if SECURITY_LOG_RETENTION_MONTHS <= 0:
+        return None
+    return add_months(now or datetime.utcnow(), -SECURITY_LOG_RETENTION_MONTHS)
+
+def partitions_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    q = select(SecurityLogPartition.month).where(SecurityLogPartition.state == "active")
+    if date_from is not None:
+        q = q.where(SecurityLogPartition.ends_at > date_from)
+    if date_to is not None:
+        q = q.where(SecurityLogPartition.starts_at < date_to)
+    return q.order_by(SecurityLogPartition.starts_at.desc())
+
+def count_logs(connection):
+    # شمارش دقیق برای reconcile شمارنده security_logs.total
+    months = connection.execute(partitions_query()).scalars().all()
+    counts = [select(func.count()).select_from(partition_table(m)).scalar_subquery() for m in months]
+    if not counts:
+        return literal(0)
+    return sum(counts[1:], counts[0])
+
+counter_service.register(counter_service.CounterDef("security_logs.total", None, count=count_logs))
+
+# --- نوشتن ---
+
+def _utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def prepare(data, now: Optional[datetime] = None) -> dict:
+    # ValueError برای check_time خارج از بازه قابل ثبت
+    now = now or datetime.utcnow()
+    check_time = _utc(data.check_time) if data.check_time else now
+    cutoff = retention_cutoff(now)
+    if cutoff is not None and check_time < cutoff:
+        raise ValueError(f"check_time is before the retention window ({cutoff.date()})")
+    if check_time > now + timedelta(seconds=SECURITY_LOG_MAX_FUTURE_SECONDS):
+        raise ValueError("check_time is in the future")
+    return {
+        "id": getattr(data, "id", None) or str(uuid.uuid4()),
+        "store_id": data.store_id,
+        "status": data.status,
+        "guard_id": data.guard_id,
+        "check_time": check_time,
+    }
+
+def write_logs(connection, rows):
+    # سطرهای آماده (prepare) به تفکیک ماه؛ شناسه‌های تکراری نادیده گرفته می‌شوند
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(month_key(row["check_time"]), {}).setdefault(row["id"], row)
+    inserted = 0
+    for key, month_rows in by_month.items():
+        table = ensure_partition(connection, key)
+        ids = list(month_rows)
+        for i in range(0, len(ids), ID_LOOKUP_CHUNK):
+            existing = connection.execute(select(table.c.id).where(table.c.id.in_(ids[i:i + ID_LOOKUP_CHUNK]))).scalars()
+            for log_id in existing:
+                del month_rows[log_id]
+        if month_rows:
+            connection.execute(insert(table), list(month_rows.values()))
+            inserted += len(month_rows)
+    counter_service.increment(connection, "security_logs.total", inserted)
+    return inserted
+
+def create_log(connection, data) -> dict:
+    try:
+        row = prepare(data)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    write_logs(connection, [row])
+    return row
+
+class Batch:
+    def __init__(self):
+        self.rows = []
+        self.received = 0
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < SECURITY_LOG_BATCH_MAX_ERRORS:
+            self.errors.append({"line": line, "errors": messages})
+
+    def result(self, inserted: int) -> dict:
+        return {
+            "received": self.received,
+            "inserted": inserted,
+            "duplicates": len(self.rows) - inserted,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+def read_batch(chunks) -> Batch:
+    # chunks: iterator همگام از bytes؛ در threadpool اجرا می‌شود
+    batch = Batch()
+    now = datetime.utcnow()
+    for line, record in ndjson_records(text_lines(chunks)):
+        if batch.received >= SECURITY_LOG_BATCH_MAX_LINES:
+            raise HTTPException(status_code=413, detail=f"Batch is limited to {SECURITY_LOG_BATCH_MAX_LINES} lines")
+        batch.received += 1
+        if record is None:
+            batch.error(line, ["invalid JSON object"])
+            continue
+        try:
+            batch.rows.append(prepare(LogRecord.model_validate(record), now))
+        except ValidationError as exc:
+            batch.error(line, [f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors()])
+        except ValueError as exc:
+            batch.error(line, [str(exc)])
+    return batch
+
+def write_batch(connection, batch: Batch) -> dict:
+    return batch.result(write_logs(connection, batch.rows))
+
+# --- خواندن ---
+
+def log_query(table, store_id=None, status=None, guard_id=None, date_from=None, date_to=None):
+    q = select(table)
+    if store_id:
+        q = q.where(table.c.store_id == store_id)
+    if status:
+        q = q.where(table.c.status == status)
+    if guard_id:
+        q = q.where(table.c.guard_id == guard_id)
+    return filter_date_range(q, table.c.check_time, date_from, date_to)
+
+def list_logs(db, page: PageParams, store_id=None, status=None, guard_id=None, date_from=None, date_to=None):
+    # حداکثر page.limit + 1 سطر (برای finish_page) به ترتیب check_time نزولی از پارتیشن‌های بازه
+    rows = []
+    for key in db.execute(partitions_query(date_from, date_to)).scalars().all():
+        table = partition_table(key)
+        params = PageParams(cursor=page.cursor, limit=page.limit - len(rows))
+        stmt = apply_keyset(log_query(table, store_id, status, guard_id, date_from, date_to), params, table.c.check_time, table.c.id, descending=True)
+        rows.extend(db.execute(stmt).all())
+        if len(rows) > page.limit:
+            break
+    return rows
+
+# --- نگهداری ---
+
+def prepare_partitions(engine, now: Optional[datetime] = None):
+    # ماه جاری و بعدی تا اولین نوشتن هر ماه DDL نداشته باشد
+    now = now or datetime.utcnow()
+    with engine.begin() as connection:
+        for months in (0, 1):
+            ensure_partition(connection, month_key(add_months(now, months)))
+
+def _archive_row(row) -> str:
+    return json.dumps({
+        "id": row.id,
+        "store_id": row.store_id,
+        "status": row.status,
+        "guard_id": row.guard_id,
+        "check_time": row.check_time.isoformat() if row.check_time else None,
+    }, ensure_ascii=False)
+
+def export_partition(connection, table) -> str:
+    os.makedirs(SECURITY_LOG_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(SECURITY_LOG_ARCHIVE_DIR, f"{table.name}.ndjson.gz")
+    partial = path + ".part"
+    stmt = select(table).order_by(table.c.check_time, table.c.id)
+    with gzip.open(partial, "wt", encoding="utf-8") as out:
+        for row in connection.execution_options(yield_per=ARCHIVE_BATCH_ROWS).execute(stmt):
+            out.write(_archive_row(row) + "\n")
+    os.replace(partial, path)
+    return path
+
+def archive_partition(engine, key: str) -> int:
+    # خروجی (اختیاری) و حذف جدول پارتیشن؛ نوشتن در این ماه قبلاً با retention_cutoff بسته شده است
+    table = partition_table(key)
+    path = None
+    if SECURITY_LOG_ARCHIVE_DIR:
+        with engine.connect() as connection:
+            path = export_partition(connection, table)
+    with engine.begin() as connection:
+        rows = connection.execute(select(func.count()).select_from(table)).scalar()
+        connection.execute(DropTable(table, if_exists=True))
+        registry = SecurityLogPartition.__table__
+        connection.execute(
+            update(registry).where(registry.c.month == key)
+            .values(state="archived", row_count=rows, archive_path=path, archived_at=datetime.utcnow())
+        )
+        counter_service.increment(connection, "security_logs.total", -rows)
+    _ready.discard(key)
+    return rows
+
+def apply_retention(engine, now: Optional[datetime] = None):
+    cutoff = retention_cutoff(now)
+    if cutoff is None:
+        return []
+    with engine.connect() as connection:
+        expired = connection.execute(
+            select(SecurityLogPartition.month)
+            .where(SecurityLogPartition.state == "active", SecurityLogPartition.starts_at < cutoff)
+            .order_by(SecurityLogPartition.starts_at)
+        ).scalars().all()
+    for key in expired:
+        archive_partition(engine, key)
+    return expired
+
+def list_partitions(db):
+    return db.query(SecurityLogPartition).order_by(SecurityLogPartition.starts_at.desc()).all()
+
+class Maintainer:
+    def __init__(self, interval: int = SECURITY_LOG_MAINTENANCE_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, engine):
+        prepare_partitions(engine)
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(engine,), name="security-log-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, engine):
+        # اولین دور بلافاصله؛ با فاصله روزانه، ری‌استارت‌های مکرر نباید نگهداری را عقب بیندازند
+        while True:
+            try:
+                prepare_partitions(engine)
+                archived = apply_retention(engine)
+                if archived:
+                    logger.info("archived security log partitions: %s", ", ".join(archived))
+            except Exception:
+                logger.exception("security log maintenance failed")
+            if self._stop.wait(self.interval):
+                return
+
+maintainer = Maintainer()
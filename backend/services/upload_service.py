@@ -0,0 +1,253 @@
+# upload_service.py
+# وظیفه: دریافت استریمی فایل‌های آپلود (multipart) با سقف حجم و نوع فایل
+# بدنه درخواست تکه‌به‌تکه از request.stream() خوانده و با parser استریمی python-multipart تجزیه می‌شود؛
+# هر بخش فایل در یک فایل موقت کنار مقصد نوشته (نوشتن در thread جدا) و هم‌زمان sha256 آن محاسبه می‌شود.
+# بررسی‌ها قبل از خواندن کل بدنه انجام می‌شوند: Content-Length کل، Content-Type هر بخش، امضای ابتدای فایل
+# (magic bytes) و حجم هر بخش در حین دریافت؛ با اولین تخلف خواندن متوقف و فایل‌های موقت حذف می‌شوند.
+# فایل کامل با os.replace به‌صورت اتمیک در مسیر نهایی قرار می‌گیرد.
+
+import hashlib
+import os
+import re
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from anyio import to_thread
+from fastapi import HTTPException, Request
+from prometheus_client import Counter, Histogram
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import FormParserError
+
+MB = 1024 * 1024
+UPLOAD_WRITE_BUFFER = int(os.environ.get("UPLOAD_WRITE_BUFFER", str(MB)))
+# سربار multipart (boundary و هدرها) برای هر درخواست
+MULTIPART_OVERHEAD = 64 * 1024
+
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes stored by the upload pipeline", ["kind"])
+UPLOAD_REJECTED = Counter("upload_rejected_total", "Uploads rejected by the upload pipeline", ["kind", "reason"])
+UPLOAD_SIZE = Histogram("upload_size_bytes", "Size of stored uploads", ["kind"], buckets=(64 * 1024, 256 * 1024, MB, 4 * MB, 16 * MB, 64 * MB))
+UPLOAD_DURATION = Histogram("upload_duration_seconds", "Time to receive and store an upload", ["kind"])
+UPLOAD_THROUGHPUT = Histogram(
+    "upload_throughput_bytes_per_second", "Receive throughput of stored uploads", ["kind"],
+    buckets=(256 * 1024, MB, 4 * MB, 16 * MB, 64 * MB, 256 * MB)
+)
+
+# امضای ابتدای فایل برای هر نوع MIME
+MAGIC = {
+    "application/pdf": (b"%PDF-",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/jpeg": (b"\xff\xd8\xff",),
+}
+SNIFF_BYTES = 8
+
+class UploadSpec:
+    def __init__(self, kind: str, max_bytes: int, mime_types):
+        self.kind = kind
+        self.max_bytes = max_bytes
+        self.mime_types = tuple(mime_types)
+
+def _env_mb(name: str, default: int) -> int:
+    return int(float(os.environ.get(name, str(default))) * MB)
+
+DOCUMENT_TYPES = ("application/pdf", "image/png", "image/jpeg")
+ID_CARD = UploadSpec("id_card", _env_mb("UPLOAD_MAX_ID_CARD_MB", 5), DOCUMENT_TYPES)
+INSURANCE = UploadSpec("insurance", _env_mb("UPLOAD_MAX_INSURANCE_MB", 20), DOCUMENT_TYPES)
+COMPANY_LICENSE = UploadSpec("company_license", _env_mb("UPLOAD_MAX_LICENSE_MB", 20), DOCUMENT_TYPES)
+
+class StoredUpload:
+    def __init__(self, field: str, filename: str, content_type: str, path: str, size: int, sha256: str):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+def safe_filename(filename: Optional[str]) -> str:
+    # فقط نام فایل (بدون مسیر) با کاراکترهای امن
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = re.sub(r"[^\w.\-]+", "_", name).strip("._")
+    return name[:120] or "upload"
+
+def _reject(spec: Optional[UploadSpec], status: int, reason: str, detail: str):
+    UPLOAD_REJECTED.labels(spec.kind if spec else "unknown", reason).inc()
+    raise HTTPException(status_code=status, detail=detail)
+
+class _Part:
+    def __init__(self, field: str, filename: Optional[str], content_type: str, spec: UploadSpec, path: str):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.spec = spec
+        self.path = path
+        self.tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        self.file = None
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.head = b""
+        self.pending = []
+        self.pending_size = 0
+        self.started = time.perf_counter()
+
+class _Receiver:
+    # callbackهای parser فقط رویداد ثبت می‌کنند؛ نوشتن فایل در حلقه async انجام می‌شود
+    def __init__(self, specs: Dict[str, UploadSpec], destination: Callable[[str, str], str]):
+        self.specs = specs
+        self.destination = destination
+        self.events = []
+        self.header_field = b""
+        self.header_value = b""
+        self.headers = {}
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": lambda: self.events.append(("end", None)),
+            "on_header_field": lambda data, start, end: self._append_field(data[start:end]),
+            "on_header_value": lambda data, start, end: self._append_value(data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", dict(self.headers))),
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def _append_field(self, data):
+        self.header_field += data
+
+    def _append_value(self, data):
+        self.header_value += data
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_part_data(self, data, start, end):
+        self.events.append(("data", bytes(data[start:end])))
+
+async def _flush(part: _Part):
+    if part.pending:
+        data = b"".join(part.pending)
+        part.pending = []
+        part.pending_size = 0
+        await to_thread.run_sync(part.file.write, data)
+
+def _cleanup(parts):
+    for part in parts:
+        if part.file is not None:
+            part.file.close()
+        try:
+            os.remove(part.tmp_path)
+        except FileNotFoundError:
+            pass
+
+async def _open_part(receiver: _Receiver, headers: dict) -> Optional[_Part]:
+    _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+    field = disposition.get(b"name", b"").decode("utf-8", "replace")
+    if b"filename" not in disposition:
+        # فیلد متنی فرم؛ محتوایش نادیده گرفته می‌شود
+        return None
+    filename = disposition.get(b"filename", b"").decode("utf-8", "replace")
+    if not filename:
+        # input فایل خالی که مرورگر بدون انتخاب فایل می‌فرستد
+        return None
+    spec = receiver.specs.get(field)
+    if spec is None:
+        _reject(None, 400, "unexpected_field", f"Unexpected file field: {field}")
+    content_type = headers.get(b"content-type", b"application/octet-stream").decode("latin-1").split(";")[0].strip().lower()
+    if content_type not in spec.mime_types:
+        _reject(spec, 415, "mime", f"{field}: unsupported content type {content_type}")
+    path = receiver.destination(field, safe_filename(filename))
+    part = _Part(field, filename, content_type, spec, path)
+    await to_thread.run_sync(os.makedirs, os.path.dirname(path) or ".", 0o755, True)
+    part.file = await to_thread.run_sync(open, part.tmp_path, "wb")
+    return part
+
+def _check_magic(part: _Part):
+    if not any(part.head.startswith(sig) for sig in MAGIC.get(part.content_type, (b"",))):
+        _reject(part.spec, 415, "magic", f"{part.field}: file content does not match {part.content_type}")
+
+async def receive(request: Request, specs: Dict[str, UploadSpec], destination: Callable[[str, str], str]) -> Dict[str, StoredUpload]:
+    # specs: نام فیلد فرم → UploadSpec؛ destination(field, safe_filename) مسیر نهایی فایل را می‌دهد
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        _reject(None, 400, "not_multipart", "Expected multipart/form-data")
+    limit = sum(spec.max_bytes for spec in specs.values()) + MULTIPART_OVERHEAD
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        _reject(None, 413, "content_length", f"Request body too large (limit {limit} bytes)")
+
+    receiver = _Receiver(specs, destination)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    parts = []
+    current = None
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                _reject(current.spec if current else None, 413, "body_size", f"Request body too large (limit {limit} bytes)")
+            try:
+                parser.write(chunk)
+            except FormParserError:
+                _reject(None, 400, "malformed", "Invalid multipart data")
+            for kind, value in receiver.events:
+                if kind == "headers":
+                    current = await _open_part(receiver, value)
+                    if current is not None:
+                        parts.append(current)
+                        if sum(p.field == current.field for p in parts) > 1:
+                            _reject(current.spec, 400, "duplicate_field", f"Duplicate file field: {current.field}")
+                elif kind == "data" and current is not None:
+                    current.size += len(value)
+                    if current.size > current.spec.max_bytes:
+                        _reject(current.spec, 413, "size", f"{current.field}: file exceeds {current.spec.max_bytes} bytes")
+                    if len(current.head) < SNIFF_BYTES:
+                        current.head += value[:SNIFF_BYTES - len(current.head)]
+                        if len(current.head) >= SNIFF_BYTES:
+                            _check_magic(current)
+                    current.sha256.update(value)
+                    current.pending.append(value)
+                    current.pending_size += len(value)
+                    if current.pending_size >= UPLOAD_WRITE_BUFFER:
+                        await _flush(current)
+                elif kind == "end" and current is not None:
+                    if len(current.head) < SNIFF_BYTES:
+                        _check_magic(current)
+                    await _flush(current)
+                    await to_thread.run_sync(current.file.close)
+                    current.file = None
+                    current = None
+            receiver.events.clear()
+        parser.finalize()
+        if current is not None:
+            _reject(current.spec, 400, "truncated", "Incomplete multipart body")
+        # همه بخش‌ها معتبرند؛ حالا جابه‌جایی به مسیر نهایی. اگر یکی شکست بخورد، قبلی‌ها به مسیر موقت
+        # برمی‌گردند تا _cleanup همه را حذف کند
+        moved = []
+        try:
+            for part in parts:
+                await to_thread.run_sync(os.replace, part.tmp_path, part.path)
+                moved.append(part)
+        except BaseException:
+            for part in moved:
+                try:
+                    os.replace(part.path, part.tmp_path)
+                except OSError:
+                    pass
+            raise
+        stored = {}
+        for part in parts:
+            elapsed = max(time.perf_counter() - part.started, 1e-6)
+            UPLOAD_BYTES.labels(part.spec.kind).inc(part.size)
+            UPLOAD_SIZE.labels(part.spec.kind).observe(part.size)
+            UPLOAD_DURATION.labels(part.spec.kind).observe(elapsed)
+            UPLOAD_THROUGHPUT.labels(part.spec.kind).observe(part.size / elapsed)
+            stored[part.field] = StoredUpload(part.field, part.filename, part.content_type, part.path, part.size, part.sha256.hexdigest())
+        return stored
+    except BaseException:
+        _cleanup(parts)
+        raise
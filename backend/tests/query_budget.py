@@ -0,0 +1,17 @@
+# query_budget.py
+# کمکی تست: سقف تعداد کوئری SQL برای هر درخواست (جلوگیری از N+1)
+# استفاده:
+#   with assert_max_queries(2):
+#       client.get("/api/contracts")
+
+from contextlib import contextmanager
+from db_metrics import capture_requests
+
+@contextmanager
+def assert_max_queries(limit: int):
+    with capture_requests() as captured:
+        yield captured
+    assert captured, "no request was made inside assert_max_queries"
+    for handler, stats in captured:
+        statements = "\n".join(f"  {s}" for s in stats.statements or [])
+        assert stats.count <= limit, f"{handler} executed {stats.count} SQL statements (budget {limit}):\n{statements}"
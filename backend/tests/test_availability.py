@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+def test_shop_availability():
+    response = client.get("/api/shops/availability", params={"start_date": "2030-01-01T00:00:00", "end_date": "2032-01-01T00:00:00"})
+    assert response.status_code == 200
+    for shop in response.json():
+        assert shop["windows"]
+        for window in shop["windows"]:
+            assert "2030-01-01T00:00:00" <= window["start_date"] < window["end_date"] <= "2032-01-01T00:00:00"
+
+def test_shop_availability_min_days():
+    response = client.get("/api/shops/availability", params={"start_date": "2030-01-01T00:00:00", "end_date": "2030-03-01T00:00:00", "min_days": 90})
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_shop_availability_invalid_range():
+    response = client.get("/api/shops/availability", params={"start_date": "2030-01-01T00:00:00", "end_date": "2029-01-01T00:00:00"})
+    assert response.status_code == 400
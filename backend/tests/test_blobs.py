@@ -0,0 +1,55 @@
+import uuid
+from fastapi.testclient import TestClient
+from app import app, SessionLocal, engine
+from models import Blob
+from services import blob_service
+
+client = TestClient(app)
+
+PERMIT = {
+    "company_name": "Acme", "job_location": "Unit 7", "onsite_in_charge": "Ali", "contact_no": "0912",
+    "tenant_or_contractor": "contractor", "job_date_from": "2031-06-01T00:00:00", "job_date_to": "2031-06-01T00:00:00",
+    "job_time_from": "08:00", "job_time_to": "10:00", "job_type": "Maintenance", "job_description": "desc", "requested_by": "Sara"
+}
+
+def create_permit():
+    return client.post("/api/permits/request", json=PERMIT).json()["id"]
+
+def upload_license(permit_id, content):
+    response = client.post(f"/api/permits/request/{permit_id}/upload_license", files={"license_file": ("license.pdf", content, "application/pdf")})
+    assert response.status_code == 200
+    return response.json()["files"]["license_file"]["sha256"]
+
+def ref_count(sha256):
+    db = SessionLocal()
+    try:
+        return db.get(Blob, sha256).ref_count
+    finally:
+        db.close()
+
+def test_blob_range_and_not_modified():
+    content = b"%PDF-1.4 " + uuid.uuid4().hex.encode()
+    sha256 = upload_license(create_permit(), content)
+    response = client.get(f"/api/blobs/{sha256}", headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.content == b"%PDF"
+    etag = client.get(f"/api/blobs/{sha256}").headers["ETag"]
+    response = client.get(f"/api/blobs/{sha256}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_blob_ref_count_and_garbage_collection():
+    first, second = create_permit(), create_permit()
+    old = upload_license(first, b"%PDF-1.4 " + uuid.uuid4().hex.encode())
+    assert client.post(f"/api/permits/request/{second}/attach_license", json={"license_file": old}).status_code == 200
+    assert ref_count(old) == 2
+    new = upload_license(first, b"%PDF-1.4 " + uuid.uuid4().hex.encode())
+    assert ref_count(old) == 1
+    assert ref_count(new) == 1
+    assert client.post(f"/api/permits/request/{second}/attach_license", json={"license_file": new}).status_code == 200
+    assert ref_count(old) == 0
+    blob_service.collect_garbage(engine, grace_seconds=-1)
+    assert client.get(f"/api/blobs/{old}").status_code == 404
+    assert client.post(f"/api/permits/request/{second}/attach_license", json={"license_file": old}).status_code == 404
+    assert client.get(f"/api/blobs/{new}").status_code == 200
+    assert ref_count(new) == 2
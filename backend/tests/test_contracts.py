@@ -1,6 +1,9 @@
+import uuid
+import pytest
 from fastapi.testclient import TestClient
-from app import app
+from app import app, SessionLocal
 from datetime import datetime, timedelta
+from models import Shop, Contract, ContractStatusEnum, Tenant, User
 
 client = TestClient(app)
 
@@ -25,4 +28,78 @@ def test_create_contract():
 def test_list_contracts():
     response = client.get("/api/contracts/")
     assert response.status_code == 200
-    assert isinstance(response.json(), list) 
\ No newline at end of file
+    assert isinstance(response.json(), list) 
+
+
+@pytest.fixture
+def overlap_shop():
+    # مغازه و قراردادها با مستأجر واقعی ثبت و بعد از تست حذف می‌شوند
+    db = SessionLocal()
+    user = User(username=f"overlap-tenant-{uuid.uuid4().hex[:8]}", password_hash="x")
+    db.add(user)
+    db.flush()
+    tenant = Tenant(shop_name="Overlap test shop", user_id=user.id)
+    shop = Shop(name="Overlap test shop")
+    db.add_all([tenant, shop])
+    db.flush()
+    blocking = Contract(tenant_id=tenant.id, shop_id=shop.id, start_date=datetime(2030, 1, 1), end_date=datetime(2030, 3, 1), amount=1000.0, status=ContractStatusEnum.active)
+    draft = Contract(tenant_id=tenant.id, shop_id=shop.id, start_date=datetime(2030, 2, 1), end_date=datetime(2030, 4, 1), amount=1000.0, status=ContractStatusEnum.draft)
+    later = Contract(tenant_id=tenant.id, shop_id=shop.id, start_date=datetime(2030, 6, 1), end_date=datetime(2030, 9, 1), amount=1000.0, status=ContractStatusEnum.signed)
+    db.add_all([blocking, draft, later])
+    db.commit()
+    seeded = {"shop": shop.id, "tenant": tenant.id, "user": user.id, "blocking": blocking.id, "later": later.id}
+    db.close()
+    yield seeded
+    db = SessionLocal()
+    for contract in db.query(Contract).filter(Contract.shop_id == seeded["shop"]).all():
+        db.delete(contract)
+    db.flush()
+    for model, key in ((Shop, "shop"), (Tenant, "tenant"), (User, "user")):
+        db.delete(db.get(model, seeded[key]))
+        db.flush()
+    db.commit()
+    db.close()
+
+def test_contract_overlaps(overlap_shop):
+    shop_id = overlap_shop["shop"]
+    ids = overlap_shop
+
+    def overlaps(start, end, **params):
+        response = client.get("/api/contracts/overlaps", params={"shop_id": shop_id, "start_date": start.isoformat(), "end_date": end.isoformat(), **params})
+        assert response.status_code == 200
+        return [item["id"] for item in response.json()]
+
+    assert overlaps(datetime(2030, 2, 15), datetime(2030, 7, 1)) == [ids["blocking"], ids["later"]]
+    # بازه‌ها نیمه‌باز هستند؛ شروع در روز پایان قرارداد قبلی تداخل نیست
+    assert overlaps(datetime(2030, 3, 1), datetime(2030, 6, 1)) == []
+    assert overlaps(datetime(2029, 1, 1), datetime(2031, 1, 1), exclude_contract_id=ids["later"]) == [ids["blocking"]]
+    response = client.get("/api/contracts/overlaps", params={"shop_id": shop_id, "start_date": datetime(2030, 6, 1).isoformat(), "end_date": datetime(2030, 1, 1).isoformat()})
+    assert response.status_code == 400
+
+def test_qrcode_notifies_security_on_every_fetch(overlap_shop):
+    from models import Role, OutboxMessage
+    contract_id = overlap_shop["blocking"]
+    db = SessionLocal()
+    role = db.query(Role).filter(Role.name == "security").first()
+    created_role = role is None
+    if created_role:
+        role = Role(name="security")
+        db.add(role)
+        db.flush()
+    guard = User(username=f"qr-guard-{uuid.uuid4().hex[:8]}", password_hash="x", role_id=role.id)
+    db.add(guard)
+    db.commit()
+    try:
+        first = client.get(f"/api/contracts/{contract_id}/qrcode")
+        second = client.get(f"/api/contracts/{contract_id}/qrcode")
+        assert first.status_code == second.status_code == 200
+        # تصویر دوم از کش می‌آید ولی اطلاع‌رسانی مثل قبل انجام می‌شود
+        sent = db.query(OutboxMessage).filter(OutboxMessage.source_id == contract_id, OutboxMessage.recipient == guard.username).count()
+        assert sent == 2
+    finally:
+        db.query(OutboxMessage).filter(OutboxMessage.source_id == contract_id).delete()
+        db.delete(guard)
+        if created_role:
+            db.delete(role)
+        db.commit()
+        db.close()
@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+def test_dashboard_summary():
+    response = client.get("/api/dashboard/summary")
+    assert response.status_code == 200
+    data = response.json()
+    for key in ("active_users", "active_contracts", "open_tasks", "security_events"):
+        assert isinstance(data[key], int)
+
+def test_security_log_updates_counter():
+    before = client.get("/api/dashboard/summary").json()["security_events"]
+    response = client.post("/api/operations/securitylog", json={"store_id": "store-1", "status": "open", "guard_id": "guard-1"})
+    assert response.status_code == 200
+    after = client.get("/api/dashboard/summary").json()["security_events"]
+    assert after == before + 1
+
+def test_permit_dashboard_stats():
+    response = client.get("/api/permits/dashboard")
+    assert response.status_code == 200
+    stats = response.json()["stats"]
+    assert stats["total"] >= stats["approved"] + stats["rejected"] + stats["incomplete"] + stats["pending"]
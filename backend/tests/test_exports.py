@@ -0,0 +1,69 @@
+import io
+import uuid
+import zipfile
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app, SessionLocal
+from models import Contract, ContractStatusEnum, Shop, Tenant, User
+from services import pdf_render_service
+
+client = TestClient(app)
+
+PERIOD = {"date_from": "2040-01-01T00:00:00", "date_to": "2041-01-01T00:00:00"}
+
+@pytest.fixture
+def contract_ids():
+    # قراردادها با مستأجر واقعی ثبت و بعد از تست حذف می‌شوند تا لیست قراردادهای تست‌های دیگر را خراب نکنند
+    db = SessionLocal()
+    user = User(username=f"export-tenant-{uuid.uuid4().hex[:8]}", password_hash="x")
+    db.add(user)
+    db.flush()
+    tenant = Tenant(shop_name="Export test shop", user_id=user.id)
+    shop = Shop(name="Export test shop")
+    db.add_all([tenant, shop])
+    db.flush()
+    contracts = [
+        Contract(tenant_id=tenant.id, shop_id=shop.id, start_date=datetime(2040, month, 1), end_date=datetime(2040, month + 1, 1), amount=500.0, status=ContractStatusEnum.active)
+        for month in (2, 3)
+    ]
+    db.add_all(contracts)
+    db.commit()
+    seeded = {"ids": [c.id for c in contracts], "shop": shop.id, "tenant": tenant.id, "user": user.id}
+    db.close()
+    yield seeded["ids"]
+    db = SessionLocal()
+    for contract in db.query(Contract).filter(Contract.id.in_(seeded["ids"])).all():
+        db.delete(contract)
+    db.flush()
+    for model, key in ((Shop, "shop"), (Tenant, "tenant"), (User, "user")):
+        db.delete(db.get(model, seeded[key]))
+        db.flush()
+    db.commit()
+    db.close()
+
+def export_zip():
+    response = client.get("/api/reports/export", params={"kind": "contract", "format": "zip", **PERIOD})
+    assert response.status_code == 200
+    return zipfile.ZipFile(io.BytesIO(response.content))
+
+def test_export_zip_roundtrip(contract_ids):
+    ids = contract_ids
+    archive = export_zip()
+    assert archive.testzip() is None
+    names = archive.namelist()
+    for contract_id in ids:
+        assert f"contract_{contract_id}.pdf" in names
+        assert archive.read(f"contract_{contract_id}.pdf").startswith(b"%PDF")
+
+def test_export_render_failure(monkeypatch, contract_ids):
+    ids = contract_ids
+    def busy(kind, doc, key=None, wait=60):
+        raise HTTPException(status_code=503, detail="PDF rendering is busy, try again shortly")
+    monkeypatch.setattr(pdf_render_service.pool, "future", busy)
+    archive = export_zip()
+    for contract_id in ids:
+        assert b"busy" in archive.read(f"contract_{contract_id}.error.txt")
+    response = client.get("/api/reports/export", params={"kind": "contract", "format": "pdf", **PERIOD})
+    assert response.status_code == 503
@@ -0,0 +1,76 @@
+import uuid
+from fastapi.testclient import TestClient
+from app import app, SessionLocal
+from models import Department, OutboxMessage, User
+from services import maintenance_routing_service
+from services.maintenance_routing_service import RoutingCache, RoutingTable, matching_departments
+
+client = TestClient(app)
+
+def test_matching_departments_is_case_insensitive_substring():
+    departments = [("d1", "FM Electrical"), ("d2", "Operations"), ("d3", "fm-hvac")]
+    assert matching_departments(departments, ["fm"]) == ["d1", "d3"]
+    assert matching_departments(departments, ["ELECTRICAL", "oper"]) == ["d1", "d2"]
+
+def test_route_uses_all_matching_departments_without_duplicate_users():
+    departments = [("d1", "FM Electrical"), ("d2", "Operations"), ("d3", "Security")]
+    users = [("u1", "ali", "d1"), ("u2", "sara", "d2"), ("u3", "reza", "d3")]
+    table = RoutingTable(departments, users, {"electric": ["electrical", "fm"], "*": ["operations"]})
+    assert table.route("electric") == (["d1"], [("u1", "ali")])
+    assert table.route("plumbing") == (["d2"], [("u2", "sara")])
+    table = RoutingTable(departments, users, {"*": ["fm", "operations", "electrical"]})
+    department_ids, recipients = table.route("anything")
+    assert department_ids == ["d1", "d2"]
+    assert recipients == [("u1", "ali"), ("u2", "sara")]
+
+def test_routing_cache_reuses_table_until_invalidated():
+    db = SessionLocal()
+    try:
+        cache = RoutingCache(ttl=600)
+        table = cache.get(db)
+        assert cache.get(db) is table
+        cache.invalidate()
+        assert cache.get(db) is not table
+    finally:
+        db.close()
+
+def create_request(category):
+    response = client.post("/api/maintenance/request", json={
+        "tenant_id": "tenant-1", "description": "leak", "category": category, "suggested_time": None
+    })
+    assert response.status_code == 200
+    db = SessionLocal()
+    try:
+        rows = db.query(OutboxMessage.recipient).filter(OutboxMessage.source_id == response.json()["id"]).all()
+        return sorted(r.recipient for r in rows)
+    finally:
+        db.close()
+
+def test_recipients_follow_department_and_user_changes(monkeypatch):
+    token = uuid.uuid4().hex[:8]
+    category = f"category-{token}"
+    monkeypatch.setattr(maintenance_routing_service, "RULES", dict(maintenance_routing_service.RULES))
+    maintenance_routing_service.set_rule(category, [f"plumbing-{token}", f"hvac-{token}"])
+    db = SessionLocal()
+    plumbing = Department(name=f"Plumbing-{token}")
+    hvac = Department(name=f"HVAC-{token}")
+    other = Department(name=f"Cleaning-{token}")
+    db.add_all([plumbing, hvac, other])
+    db.flush()
+    db.add_all([
+        User(username=f"plumber-{token}", password_hash="x", department_id=plumbing.id),
+        User(username=f"hvac-{token}", password_hash="x", department_id=hvac.id),
+        User(username=f"cleaner-{token}", password_hash="x", department_id=other.id),
+    ])
+    db.commit()
+    other_id = other.id
+    db.close()
+    # همه دپارتمان‌های منطبق، نه فقط اولی
+    assert create_request(category) == [f"hvac-{token}", f"plumber-{token}"]
+
+    db = SessionLocal()
+    db.get(Department, other_id).name = f"HVAC-{token} night shift"
+    db.add(User(username=f"newcomer-{token}", password_hash="x", department_id=other_id))
+    db.commit()
+    db.close()
+    assert create_request(category) == [f"cleaner-{token}", f"hvac-{token}", f"newcomer-{token}", f"plumber-{token}"]
@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+from app import app
+from datetime import datetime
+from pagination import encode_cursor, decode_cursor
+from models import Task
+
+client = TestClient(app)
+
+def test_cursor_roundtrip():
+    created = datetime(2024, 3, 1, 12, 30)
+    cursor = encode_cursor(created, "task-id")
+    assert decode_cursor(cursor, Task.created_at) == (created, "task-id")
+
+def test_invalid_cursor():
+    response = client.get("/api/contracts/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_list_contracts_limit():
+    response = client.get("/api/contracts/", params={"limit": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) <= 1
+    if "X-Next-Cursor" in response.headers:
+        next_page = client.get("/api/contracts/", params={"limit": 1, "cursor": response.headers["X-Next-Cursor"]})
+        assert next_page.status_code == 200
+        assert next_page.json()[0]["id"] != data[0]["id"]
+
+def test_paginate_null_sort_values():
+    from fastapi import Response
+    from app import SessionLocal
+    from pagination import PageParams, paginate
+    import uuid
+    marker = "null-page-" + uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        created = [datetime(2024, 1, 2), None, datetime(2024, 1, 1), None, None]
+        db.add_all([Task(title=marker, created_at=value) for value in created])
+        db.commit()
+        query = db.query(Task).filter(Task.title == marker)
+        for descending in (True, False):
+            seen, cursor = [], None
+            while True:
+                response = Response()
+                rows = paginate(query, PageParams(cursor=cursor, limit=1), response, Task.created_at, Task.id, descending=descending)
+                seen.extend(rows)
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            assert len({t.id for t in seen}) == len(created)
+            dated = [t.created_at for t in seen if t.created_at is not None]
+            assert dated == sorted(dated, reverse=descending)
+    finally:
+        db.query(Task).filter(Task.title == marker).delete()
+        db.commit()
+        db.close()
+
+def test_date_range_skips_null_tail():
+    from app import SessionLocal
+    from pagination import PageParams, keyset_statements, filter_date_range
+    db = SessionLocal()
+    try:
+        params = PageParams(cursor=encode_cursor(datetime(2024, 1, 1), "x"), limit=1)
+        query = db.query(Task)
+        assert len(keyset_statements(query, params, Task.created_at, Task.id, True)) == 2
+        ranged = filter_date_range(query, Task.created_at, datetime(2023, 1, 1), None)
+        assert len(keyset_statements(ranged, params, Task.created_at, Task.id, True)) == 1
+    finally:
+        db.close()
@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+PERMIT = {
+    "company_name": "Acme", "job_location": "L1", "onsite_in_charge": "Ali", "contact_no": "0912",
+    "tenant_or_contractor": "contractor", "job_date_from": "2024-05-01T08:00:00", "job_date_to": "2024-05-03T18:00:00",
+    "job_time_from": "08:00", "job_time_to": "18:00", "job_type": "Maintenance", "job_description": "desc", "requested_by": "Sara"
+}
+
+def test_approval_leaves_department_queue():
+    permit_id = client.post("/api/permits/request", json=PERMIT).json()["id"]
+    pending = [p["id"] for p in client.get("/api/permits/pending/facilities").json()]
+    assert permit_id in pending
+    response = client.post(f"/api/permits/{permit_id}/approve/facilities")
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    pending = [p["id"] for p in client.get("/api/permits/pending/facilities").json()]
+    assert permit_id not in pending
+
+def test_pending_invalid_department():
+    response = client.get("/api/permits/pending/finance")
+    assert response.status_code == 400
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+PERMIT = {
+    "company_name": "Acme", "job_location": "Unit 12", "onsite_in_charge": "Ali", "contact_no": "0912",
+    "tenant_or_contractor": "contractor", "job_date_from": "2031-05-01T00:00:00", "job_date_to": "2031-05-03T00:00:00",
+    "job_time_from": "08:00", "job_time_to": "18:00", "job_type": "Maintenance", "job_description": "desc", "requested_by": "Sara"
+}
+
+def test_overlapping_permit_reports_conflict():
+    first = client.post("/api/permits/request", json=PERMIT).json()["id"]
+    second = client.post("/api/permits/request", json={**PERMIT, "job_location": "unit  12", "job_date_from": "2031-05-03T00:00:00", "job_time_from": "5 pm", "job_time_to": "20:00"}).json()
+    assert first in [c["id"] for c in second["conflicts"]]
+    response = client.get("/api/permits/calendar/conflicts", params={
+        "job_location": "Unit 12", "job_date_from": "2031-05-02T00:00:00", "job_time_from": "18:00", "job_time_to": "19:00"
+    })
+    assert first not in [c["id"] for c in response.json()["conflicts"]]
+
+def test_week_calendar_by_location():
+    permit_id = client.post("/api/permits/request", json={**PERMIT, "job_location": "Zone C"}).json()["id"]
+    response = client.get("/api/permits/calendar", params={"date": "2031-04-30", "view": "week", "location": "zone c"})
+    assert response.status_code == 200
+    days = response.json()["days"]
+    assert len(days) == 7
+    assert [s["permit_id"] for s in days[1]["slots"]] == [permit_id]
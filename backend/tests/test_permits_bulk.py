@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+HEADER = "ref,company_name,job_location,onsite_in_charge,contact_no,tenant_or_contractor,job_date_from,job_date_to,job_time_from,job_time_to,job_type,job_description,requested_by,worker_name,worker_code\n"
+
+def test_bulk_import_csv_groups_workers_by_ref():
+    rows = "".join(f"T1,Acme,L1,Ali,0912,contractor,2024-05-01T08:00,2024-05-03T18:00,08:00,18:00,Maintenance,desc,Sara,worker {i},C{i}\n" for i in range(3))
+    rows += "T2,Acme,L1,Ali,0912,contractor,not-a-date,2024-05-03T18:00,08:00,18:00,Maintenance,desc,Sara,worker,\n"
+    response = client.post("/api/permits/bulk", content=(HEADER + rows).encode(), headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["permits_created"] == 1
+    assert data["workers_created"] == 3
+    assert data["errors"][0]["line"] == 5
+
+def test_bulk_import_rejects_unknown_format():
+    response = client.post("/api/permits/bulk", content=b"x", headers={"content-type": "text/plain"})
+    assert response.status_code == 415
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from app import app
+from query_budget import assert_max_queries
+
+client = TestClient(app)
+
+def test_dashboard_summary_budget():
+    with assert_max_queries(1):
+        client.get("/api/dashboard/summary")
+
+def test_permit_dashboard_budget():
+    with assert_max_queries(3):
+        client.get("/api/permits/dashboard")
+
+def test_contract_list_budget():
+    with assert_max_queries(1):
+        client.get("/api/contracts/", params={"limit": 20})
+
+def test_db_metrics_exported():
+    client.get("/api/dashboard/summary")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_request_db_statements_count{handler="/api/dashboard/summary"}' in response.text
+
+def test_permit_detail_budget():
+    from app import SessionLocal
+    from models import PermitRequest, WorkerPermit
+    db = SessionLocal()
+    permit = PermitRequest(company_name="budget test", job_location="unit 1", job_type="Maintenance")
+    db.add(permit)
+    db.flush()
+    db.add_all([WorkerPermit(permit_request_id=permit.id, name=f"worker {i}") for i in range(3)])
+    db.commit()
+    try:
+        # کارگرها در همان کوئری جزئیات بارگذاری می‌شوند (بدون N+1)
+        with assert_max_queries(1):
+            response = client.get(f"/api/permits/request/{permit.id}")
+        assert response.status_code == 200
+        assert len(response.json()["workers"]) == 3
+    finally:
+        db.query(WorkerPermit).filter(WorkerPermit.permit_request_id == permit.id).delete()
+        db.delete(permit)
+        db.commit()
+        db.close()
@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+PERMIT = {
+    "company_name": "Zephyrcorp", "job_location": "L1", "onsite_in_charge": "Ali", "contact_no": "0912",
+    "tenant_or_contractor": "contractor", "job_date_from": "2024-05-01T08:00:00", "job_date_to": "2024-05-03T18:00:00",
+    "job_time_from": "08:00", "job_time_to": "18:00", "job_type": "Maintenance", "job_description": "Replace escalator handrail", "requested_by": "Sara"
+}
+
+def test_search_finds_permit_by_prefix():
+    permit_id = client.post("/api/permits/request", json=PERMIT).json()["id"]
+    response = client.get("/api/search/", params={"q": "escalator hand", "kinds": "permit"})
+    assert response.status_code == 200
+    assert permit_id in [r["id"] for r in response.json()["results"]]
+
+def test_search_invalid_kind():
+    response = client.get("/api/search/", params={"q": "escalator", "kinds": "invoice"})
+    assert response.status_code == 400
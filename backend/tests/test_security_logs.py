@@ -0,0 +1,24 @@
+import json
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from app import app
+
+client = TestClient(app)
+
+def test_batch_ingest_is_idempotent():
+    round_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    lines = [json.dumps({"id": f"{round_id}-{i}", "store_id": f"store-{i}", "status": "open", "guard_id": "guard-1", "check_time": now}) for i in range(3)]
+    body = "\n".join(lines + ["{broken"])
+    first = client.post("/api/operations/securitylog/batch", content=body, headers={"content-type": "application/x-ndjson"}).json()
+    assert first["inserted"] == 3
+    assert first["errors"][0]["line"] == 4
+    retry = client.post("/api/operations/securitylog/batch", content=body, headers={"content-type": "application/x-ndjson"}).json()
+    assert retry["inserted"] == 0
+    assert retry["duplicates"] == 3
+
+def test_log_outside_retention_rejected():
+    response = client.post("/api/operations/securitylog", json={"store_id": "store-1", "status": "open", "guard_id": "guard-1", "check_time": "2001-01-01T00:00:00"})
+    assert response.status_code == 400
@@ -0,0 +1,82 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from app import app, SessionLocal
+from models import WorkerPermit
+from services import blob_service, upload_service
+
+client = TestClient(app)
+
+PERMIT = {
+    "company_name": "Acme", "job_location": "Unit 9", "onsite_in_charge": "Ali", "contact_no": "0912",
+    "tenant_or_contractor": "contractor", "job_date_from": "2031-07-01T00:00:00", "job_date_to": "2031-07-01T00:00:00",
+    "job_time_from": "08:00", "job_time_to": "10:00", "job_type": "Maintenance", "job_description": "desc", "requested_by": "Sara"
+}
+
+def license_url():
+    permit_id = client.post("/api/permits/request", json=PERMIT).json()["id"]
+    return f"/api/permits/request/{permit_id}/upload_license"
+
+def leftover_parts():
+    incoming = blob_service.staging_path("")
+    return [name for name in os.listdir(incoming) if name.endswith(".part")] if os.path.isdir(incoming) else []
+
+def multipart(*parts, close=True):
+    body = b""
+    for field, filename, content_type, content in parts:
+        body += b"--BOUNDARY\r\n"
+        body += f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode()
+        body += f"Content-Type: {content_type}\r\n\r\n".encode() + content + b"\r\n"
+    if close:
+        body += b"--BOUNDARY--\r\n"
+    return body
+
+def post_multipart(url, body):
+    return client.post(url, content=body, headers={"Content-Type": "multipart/form-data; boundary=BOUNDARY"})
+
+def test_upload_oversize_part(monkeypatch):
+    monkeypatch.setattr(upload_service.COMPANY_LICENSE, "max_bytes", 1024)
+    response = client.post(license_url(), files={"license_file": ("license.pdf", b"%PDF-1.4 " + b"x" * 2048, "application/pdf")})
+    assert response.status_code == 413
+    assert leftover_parts() == []
+
+def test_upload_magic_mismatch():
+    response = client.post(license_url(), files={"license_file": ("license.pdf", b"\x89PNG\r\n\x1a\n not a pdf", "application/pdf")})
+    assert response.status_code == 415
+    assert leftover_parts() == []
+
+def test_upload_duplicate_field():
+    part = ("license_file", "license.pdf", "application/pdf", b"%PDF-1.4 one")
+    response = post_multipart(license_url(), multipart(part, part))
+    assert response.status_code == 400
+    assert leftover_parts() == []
+
+def test_upload_truncated_body():
+    body = multipart(("license_file", "license.pdf", "application/pdf", b"%PDF-1.4 partial"), close=False)
+    response = post_multipart(license_url(), body[:-10])
+    assert response.status_code == 400
+    assert leftover_parts() == []
+
+def test_upload_failed_rename_is_undone(monkeypatch):
+    db = SessionLocal()
+    worker = WorkerPermit(name="Reza", code="W-1")
+    db.add(worker)
+    db.commit()
+    url = f"/api/permits/worker/{worker.id}/upload"
+    db.close()
+    moved = []
+    replace = os.replace
+    def failing_replace(src, dst):
+        if src.endswith(".part"):
+            if moved:
+                raise OSError("disk full")
+            moved.append(dst)
+        return replace(src, dst)
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        client.post(url, files={
+            "id_card": ("id.png", b"\x89PNG\r\n\x1a\n card", "image/png"),
+            "insurance": ("insurance.pdf", b"%PDF-1.4 insurance", "application/pdf"),
+        })
+    assert moved and not os.path.exists(moved[0])
+    assert leftover_parts() == []
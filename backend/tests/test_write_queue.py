@@ -0,0 +1,35 @@
+import threading
+import uuid
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app import engine, SessionLocal
+from models import Task
+import write_queue
+from write_queue import WriteQueue, run_write
+
+def test_timed_out_write_is_not_committed(monkeypatch):
+    queue = WriteQueue(wait_ms=0)
+    queue.start(sessionmaker(bind=engine, expire_on_commit=False))
+    monkeypatch.setattr(write_queue, "writer", queue)
+    monkeypatch.setattr(write_queue, "WRITE_TIMEOUT_SECONDS", 0.2)
+    marker = "timed-out-" + uuid.uuid4().hex
+    release = threading.Event()
+
+    def slow(session):
+        session.add(Task(title=marker))
+        release.wait(5)
+
+    try:
+        # واحد در حال اجراست که فراخوان timeout می‌گیرد؛ نباید بعداً commit شود
+        with pytest.raises(TimeoutError):
+            run_write(None, slow)
+        release.set()
+        assert run_write(None, lambda session: "done") == "done"
+    finally:
+        release.set()
+        queue.stop()
+    db = SessionLocal()
+    try:
+        assert db.query(Task).filter(Task.title == marker).count() == 0
+    finally:
+        db.close()
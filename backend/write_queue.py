@@ -0,0 +1,165 @@
+# write_queue.py
+# صف نوشتن تک‌نویسنده با group commit برای SQLite
+# هر درخواست یک unit of work (تابعی که session می‌گیرد) ارسال می‌کند؛ یک thread نویسنده
+# واحدهای در انتظار را با هم اجرا و با یک commit ثبت می‌کند و نتیجه هر واحد به فراخوان خودش برمی‌گردد.
+# با WRITE_QUEUE=1 فعال می‌شود؛ در غیر این صورت run_write همان commit معمولی روی session درخواست است.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+WRITE_QUEUE_ENABLED = os.environ.get("WRITE_QUEUE", "0") == "1"
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "200"))
+WRITE_BATCH_WAIT_MS = float(os.environ.get("WRITE_BATCH_WAIT_MS", "2"))
+WRITE_TIMEOUT_SECONDS = float(os.environ.get("WRITE_TIMEOUT_SECONDS", "30"))
+
+_STOP = object()
+
+class WriteFuture(Future):
+    # فراخوانی که منتظر نمانده (timeout) واحدش را رها می‌کند؛ نویسنده درست قبل از commit
+    # واحد را claim می‌کند و واحد رهاشده را برمی‌گرداند. بعد از claim رها کردن ممکن نیست.
+    def __init__(self):
+        super().__init__()
+        self._claim_lock = threading.Lock()
+        self._abandoned = False
+        self._claimed = False
+
+    def abandon(self) -> bool:
+        if self.cancel():
+            return True
+        with self._claim_lock:
+            if self._claimed:
+                return False
+            self._abandoned = True
+            return True
+
+    def claim(self) -> bool:
+        with self._claim_lock:
+            if self._abandoned:
+                return False
+            self._claimed = True
+            return True
+
+    def drop(self):
+        self.set_exception(TimeoutError("write abandoned after the caller timed out"))
+
+class WriteQueue:
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, wait_ms: float = WRITE_BATCH_WAIT_MS):
+        self.batch_size = batch_size
+        self.wait_seconds = wait_ms / 1000.0
+        self.session_factory = None
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # session_factory باید expire_on_commit=False داشته باشد تا اشیای برگشتی بعد از commit قابل خواندن بمانند
+    def start(self, session_factory):
+        if self.running:
+            return
+        self.session_factory = session_factory
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, unit) -> WriteFuture:
+        future = WriteFuture()
+        self._queue.put((unit, future))
+        return future
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.wait_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [(unit, future) for unit, future in self._collect(item) if future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        session = self.session_factory()
+        try:
+            results = []
+            try:
+                for unit, future in batch:
+                    results.append(unit(session))
+                    session.flush()
+                live = []
+                for unit, future in batch:
+                    if future.claim():
+                        live.append((unit, future))
+                    else:
+                        future.drop()
+                if len(live) < len(batch):
+                    # فراخوانی در همین فاصله رها شد؛ دسته بدون آن دوباره اجرا می‌شود
+                    session.rollback()
+                    if live:
+                        self._run_batch(live)
+                    return
+                session.commit()
+            except Exception:
+                # یک واحد شکست خورد؛ دسته برگشت داده می‌شود و هر واحد جداگانه اجرا می‌شود
+                # تا فقط همان فراخوان خطای خودش را بگیرد
+                session.rollback()
+                self._run_individually(session, batch)
+                return
+            for (unit, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            session.close()
+
+    def _run_individually(self, session, batch):
+        for unit, future in batch:
+            try:
+                result = unit(session)
+                if not future.claim():
+                    session.rollback()
+                    future.drop()
+                    continue
+                session.commit()
+            except Exception as exc:
+                session.rollback()
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+writer = WriteQueue()
+
+def run_write(db, unit):
+    if writer.running:
+        future = writer.submit(unit)
+        try:
+            return future.result(timeout=WRITE_TIMEOUT_SECONDS)
+        except TimeoutError:
+            # اگر هنوز commit نشده، رها می‌شود تا بعد از خطای فراخوان ثبت نشود
+            if future.abandon():
+                raise
+            return future.result()
+    result = unit(db)
+    db.commit()
+    return result
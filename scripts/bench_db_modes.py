@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# مقایسه requests/sec بین DB_MODE=sync و DB_MODE=async با ۲۰۰ کلاینت هم‌زمان
+#
+# اجرا:
+#   cd backend && DB_MODE=sync  uvicorn app:app --port 8000
+#   cd backend && DB_MODE=async uvicorn app:app --port 8001
+#   python scripts/bench_db_modes.py --url sync=http://127.0.0.1:8000 --url async=http://127.0.0.1:8001
+#
+# اگر TOKEN تنظیم شود برای مسیرهای نیازمند احراز هویت (tasks) به‌صورت Bearer ارسال می‌شود.
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/dashboard/summary",
+    "/api/permits/?limit=50",
+    "/api/operations/securitylog?limit=50",
+    "/api/tasks/?limit=50",
+]
+
+async def worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+async def run(base_url, paths, concurrency, duration, token):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        # گرم‌کردن اتصال‌ها و کش‌ها
+        await asyncio.gather(*(client.get(p) for p in paths), return_exceptions=True)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async DB mode")
+    parser.add_argument("--url", action="append", required=True, help="label=base_url, e.g. async=http://127.0.0.1:8001")
+    parser.add_argument("--path", action="append", help="request path (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+    paths = args.path or DEFAULT_PATHS
+    token = os.environ.get("TOKEN")
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'requests':>10}{'errors':>8}")
+    for item in args.url:
+        label, _, base_url = item.partition("=")
+        result = asyncio.run(run(base_url, paths, args.concurrency, args.duration, token))
+        print(f"{label:<10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['requests']:>10}{result['errors']:>8}")
+
+if __name__ == "__main__":
+    main()
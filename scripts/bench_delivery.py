@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# اندازه‌گیری توان ارسال ایمیل/پیامک transportها در برابر سرورهای جایگزین محلی
+#
+# اجرا از ریشه مخزن:
+#   python scripts/bench_delivery.py --messages 2000 --workers 8
+#   python scripts/bench_delivery.py --pool-size 1 --per-connection 1   # یک اتصال تازه برای هر پیام (رفتار بدون pool)
+#   python scripts/bench_delivery.py --rate 200                         # با token bucket
+#
+# سرورهای fake_delivery_servers در همین process اجرا می‌شوند؛ هیچ پیامی بیرون نمی‌رود.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.services.delivery_transport_service import SmtpTransport, HttpSmsGateway, TokenBucket
+from fake_delivery_servers import start_servers
+
+def run(label, send, count, workers):
+    errors = []
+
+    def one(i):
+        try:
+            send(i)
+        except Exception as exc:
+            errors.append(f"{type(exc).__name__}: {exc}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:6} {count} msgs in {elapsed:.2f}s -> {count / elapsed:.0f} msg/s, errors={len(errors)}")
+    for error in sorted(set(errors))[:5]:
+        print(f"       {error}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--per-connection", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="token bucket rate per provider (0 = unlimited)")
+    args = parser.parse_args()
+
+    stats, smtp_port, sms_port, stop = start_servers()
+    try:
+        smtp = SmtpTransport(host="127.0.0.1", port=smtp_port, pool_size=args.pool_size,
+                             messages_per_connection=args.per_connection, rate=0)
+        sms = HttpSmsGateway(url=f"http://127.0.0.1:{sms_port}/sms", pool_size=args.pool_size, rate=0)
+        # bucket مستقل برای هر اجرا تا اجراهای قبلی روی آن اثر نگذارند
+        smtp.bucket = TokenBucket(args.rate, max(int(args.rate), 1))
+        sms.bucket = TokenBucket(args.rate, max(int(args.rate), 1))
+        run("email", lambda i: smtp.send(f"tenant{i}@mall.local", "bench", f"message {i}"), args.messages, args.workers)
+        run("sms", lambda i: sms.send(f"0912{i:07d}", f"message {i}"), args.messages, args.workers)
+        smtp.close()
+        sms.close()
+        time.sleep(0.2)
+        print(f"received: emails={stats.emails} sms={stats.sms}")
+    finally:
+        stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# اجرای EXPLAIN QUERY PLAN روی کوئری‌های واقعی روترها و شکست در صورت full scan
+#
+# اجرا از ریشه مخزن:
+#   python scripts/check_query_plans.py
+#
+# یک دیتابیس موقت با مهاجرت‌های Alembic تا head ساخته و با چند سطر نمونه پر می‌شود. مسیرهای پرتکرار
+# (با فیلترها و کرسر) از طریق TestClient صدا زده می‌شوند و دستورهای SQL هر مسیر با db_metrics
+# جمع‌آوری می‌شوند؛ کارهای پس‌زمینه (outbox، شمارنده‌ها، blob GC، خروجی گرفتن، پارتیشن‌ها) هم
+# مستقیم زیر capture_statements اجرا می‌شوند. هر دستور متمایز با پیشوند EXPLAIN QUERY PLAN اجرا می‌شود.
+# خطوطی مثل «SCAN tasks» (بدون ایندکس) یا «USE TEMP B-TREE FOR ORDER BY» باعث شکست می‌شوند.
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# قبل از import اپ: دیتابیس موقت و حالت sync بدون صف نوشتن
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "plans.db")
+os.environ["DB_MODE"] = "sync"
+os.environ["WRITE_QUEUE"] = "0"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend import db_metrics
+from backend.app import engine, SessionLocal, dashboard_summary
+from backend.models import (
+    Task, WorkflowStep, Contract, ContractStatusEnum, ContractWorkflowStep, PermitRequest, Shop, Rental, ShopUpdate,
+    Notification, User, Role, Department, Tenant, Survey, SurveyResponse, MaintenanceRequest, MaintenanceWorkflowStep,
+)
+from backend.pagination import encode_cursor
+from backend.routes import (
+    tasks, users, notifications, contracts, permits, shops, operations, search, reports, maintenance, blobs,
+)
+from backend.routes.auth import create_access_token
+from backend.services import counter_service, outbox_service, blob_service, export_service, security_log_service
+
+# ابتدای ماه جاری: لاگ‌های امنیتی قدیمی‌تر از بازه نگهداری پذیرفته نمی‌شوند
+NOW = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+LATER = NOW + timedelta(days=60)
+# جدول‌های مرجع کوچک که اسکن کامل (و مرتب‌سازی موقت) آن‌ها مشکلی ندارد
+SMALL_TABLES = {"roles", "departments", "security_log_partitions"}
+# اسکن کامل عمدی: لیست‌های بدون صفحه‌بندی مدیریتی و شمارش دوباره کل جدول در کارهای هم‌ترازی
+FULL_SCANS = {
+    "GET /api/users/": {"users"},
+    "GET /api/reports/survey": {"surveys"},
+    "counters.reconcile": {"users"},
+    "blobs.reconcile": {"blobs"},
+}
+ROUTERS = (tasks, users, notifications, contracts, permits, shops, operations, search, reports, maintenance, blobs)
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+def seed(db):
+    admin_role = Role(name="superadmin")
+    staff_role = Role(name="security")
+    department = Department(name="facilities")
+    db.add_all([admin_role, staff_role, department])
+    db.flush()
+    admin = User(username="plans-admin", password_hash="x", role_id=admin_role.id, department_id=department.id)
+    staff = User(username="plans-staff", password_hash="x", role_id=staff_role.id, department_id=department.id)
+    db.add_all([admin, staff])
+    db.flush()
+    tenant = Tenant(shop_name="plans", user_id=admin.id)
+    shop = Shop(name="plans", location="A", size="small")
+    db.add_all([tenant, shop])
+    db.flush()
+    contract = Contract(tenant_id=tenant.id, shop_id=shop.id, start_date=NOW, end_date=LATER, amount=1, status=ContractStatusEnum.active)
+    task = Task(title="plans", created_by=admin.id, department_id=department.id, created_at=NOW)
+    permit = PermitRequest(
+        date=NOW, company_name="plans", job_location="unit 12", onsite_in_charge="plans", contact_no="0",
+        tenant_or_contractor="tenant", job_date_from=NOW, job_date_to=NOW, job_time_from="08:00", job_time_to="18:00",
+        job_type="Maintenance", job_description="plans", requested_by="plans"
+    )
+    request = MaintenanceRequest(tenant_id=tenant.id, description="plans", status="approved", created_at=NOW)
+    survey = Survey(title="plans", questions="[]")
+    notification = Notification(title="plans", message="plans", sent_by=admin.id, created_at=NOW)
+    db.add_all([contract, task, permit, request, survey, notification])
+    db.flush()
+    db.add_all([
+        ContractWorkflowStep(contract_id=contract.id, step="ثبت اولیه", user_id=admin.id),
+        WorkflowStep(task_id=task.id, step="ثبت اولیه", user_id=admin.id),
+        MaintenanceWorkflowStep(maintenance_request_id=request.id, step="ثبت اولیه", user_id=admin.id),
+        SurveyResponse(survey_id=survey.id, answers="[]"),
+        Rental(shop_id=shop.id, tenant="plans", start_date=NOW),
+        ShopUpdate(shop_id=shop.id, updated_by=admin.id, update_type="phone", details="plans", updated_at=NOW),
+    ])
+    db.commit()
+    security_log_service.create_log(db.connection(), security_log_service.LogRecord(store_id=shop.id, status="open", guard_id=staff.id, check_time=NOW))
+    db.commit()
+    return {
+        "admin": admin.id, "staff": staff.id, "department": department.id, "tenant": tenant.id, "shop": shop.id,
+        "contract": contract.id, "task": task.id, "permit": permit.id, "request": request.id,
+        "survey": survey.id, "notification": notification.id,
+    }
+
+def hot_requests(ids):
+    # کرسر مقدار‌دار و کرسر NULL (ستون‌های nullable بخش NULL را جدا می‌خوانند)
+    after = encode_cursor(NOW, "x")
+    after_null = encode_cursor(None, "x")
+    start, end, day = NOW.isoformat(), LATER.isoformat(), NOW.date().isoformat()
+    dates = f"date_from={start}&date_to={end}"
+    return [
+        ("admin", f"/api/tasks/?cursor={after}"),
+        ("admin", f"/api/tasks/?department_id={ids['department']}&status=pending&{dates}&cursor={after}"),
+        ("staff", f"/api/tasks/?cursor={after}"),
+        ("admin", f"/api/tasks/{ids['task']}"),
+        ("admin", f"/api/tasks/{ids['task']}/workflow"),
+        ("admin", f"/api/tasks/department/{ids['department']}?cursor={after}"),
+        ("admin", "/api/users/"),
+        ("admin", f"/api/notifications/?cursor={after}"),
+        ("admin", f"/api/notifications/?email_sent=pending&sent_by={ids['admin']}&{dates}"),
+        ("admin", f"/api/notifications/{ids['notification']}/deliveries"),
+        ("admin", f"/api/contracts/?cursor={after}"),
+        ("admin", f"/api/contracts/?status=active&shop_id={ids['shop']}&{dates}&cursor={after}"),
+        ("admin", f"/api/contracts/?tenant_id={ids['tenant']}"),
+        ("admin", f"/api/contracts/overlaps?shop_id={ids['shop']}&start_date={start}&end_date={end}"),
+        ("admin", f"/api/contracts/{ids['contract']}"),
+        ("admin", f"/api/contracts/{ids['contract']}/workflow"),
+        ("admin", f"/api/permits/?cursor={after}"),
+        ("admin", f"/api/permits/?cursor={after_null}"),
+        ("admin", f"/api/permits/?status=pending&job_type=Maintenance&{dates}&cursor={after}"),
+        ("admin", "/api/permits/pending/facilities"),
+        ("admin", f"/api/permits/calendar?date={day}&view=week"),
+        ("admin", f"/api/permits/calendar?date={day}&location=unit%2012"),
+        ("admin", f"/api/permits/calendar/conflicts?job_location=unit%2012&job_date_from={start}&job_time_from=20:00&job_time_to=02:00"),
+        ("admin", f"/api/permits/request/{ids['permit']}/conflicts"),
+        ("admin", f"/api/permits/request/{ids['permit']}"),
+        ("admin", "/api/permits/dashboard"),
+        ("admin", f"/api/shops/?cursor={encode_cursor(ids['shop'], ids['shop'])}"),
+        ("admin", f"/api/shops/?location=A&size=small&cursor={encode_cursor(ids['shop'], ids['shop'])}"),
+        ("admin", f"/api/shops/availability?start_date={start}&end_date={end}&location=A&min_days=7"),
+        ("admin", f"/api/shops/rental?shop_id={ids['shop']}&{dates}&cursor={after}"),
+        ("admin", f"/api/shops/update?shop_id={ids['shop']}&update_type=phone&{dates}&cursor={after}"),
+        ("admin", f"/api/operations/securitylog?{dates}&cursor={after}"),
+        ("admin", f"/api/operations/securitylog?store_id={ids['shop']}&status=open&guard_id={ids['staff']}&{dates}"),
+        ("admin", "/api/operations/securitylog/partitions"),
+        ("admin", "/api/search/?q=plan"),
+        ("admin", "/api/search/?q=plan&kinds=permit,task"),
+        ("admin", "/api/reports/survey"),
+        ("admin", f"/api/reports/survey/{ids['survey']}/responses"),
+        ("admin", f"/api/maintenance/workflow/{ids['request']}"),
+        ("admin", "/api/dashboard/summary"),
+    ]
+
+def background_jobs(db):
+    # همان توابعی که threadهای پس‌زمینه و خروجی گرفتن صدا می‌زنند
+    jobs = {
+        "outbox.claim": lambda: outbox_service.Dispatcher().claim(db, NOW),
+        "counters.reconcile": lambda: counter_service.reconcile_all(engine),
+        "blobs.collect_garbage": lambda: blob_service.collect_garbage(engine),
+        "blobs.reconcile": lambda: blob_service.reconcile(engine),
+        "security_logs.prepare_partitions": lambda: security_log_service.prepare_partitions(engine, NOW),
+        "security_logs.apply_retention": lambda: security_log_service.apply_retention(engine, NOW),
+    }
+    for kind in export_service.KINDS:
+        jobs[f"export.{kind}"] = lambda kind=kind: (export_service.count(db, kind, NOW, LATER), list(export_service.documents(db, kind, NOW, LATER)))
+    return jobs
+
+def capture(ids):
+    app = FastAPI()
+    for module in ROUTERS:
+        app.include_router(module.router)
+    app.add_api_route("/api/dashboard/summary", dashboard_summary, methods=["GET"])
+    app.add_middleware(db_metrics.QueryMetricsMiddleware)
+    client = TestClient(app, raise_server_exceptions=False)
+    tokens = {name: create_access_token({"sub": ids[name]}) for name in ("admin", "staff")}
+
+    captured = {}
+    errors = []
+    with db_metrics.capture_requests() as requests:
+        for who, url in hot_requests(ids):
+            response = client.get(url, headers={"Authorization": f"Bearer {tokens[who]}"})
+            # پاسخ خطا یعنی زنجیره کامل کوئری‌های مسیر اجرا نشده است
+            if response.status_code != 200:
+                errors.append(f"GET {url} -> {response.status_code}")
+    for handler, stats in requests:
+        captured.setdefault(f"GET {handler}", []).extend(stats.statements)
+
+    db = SessionLocal()
+    try:
+        for name, job in background_jobs(db).items():
+            with db_metrics.capture_statements() as stats:
+                job()
+            db.rollback()
+            captured.setdefault(name, []).extend(stats.statements)
+    finally:
+        db.close()
+    return captured, errors
+
+def explained(statements):
+    seen = []
+    for statement in statements:
+        if statement.lstrip().upper().startswith(EXPLAINED) and statement not in seen:
+            seen.append(statement)
+    return seen
+
+TABLE = re.compile(r"^(?:SCAN|SEARCH) (\w+)(.*)$")
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+
+def problems(plan_rows, allowed=()):
+    details = [row[-1] for row in plan_rows]
+    # اسکن نتیجه یک subquery (مثل LIMIT داخلی joinedload) اسکن جدول نیست
+    small = SMALL_TABLES | set(allowed) | {m.group(1) for m in map(SUBQUERY.match, details) if m}
+    tables = {m.group(1) for m in map(TABLE.match, details) if m}
+    found = []
+    for detail in details:
+        if detail.startswith("USE TEMP B-TREE"):
+            if not tables <= small:
+                found.append(detail)
+            continue
+        match = TABLE.match(detail)
+        if match and detail.startswith("SCAN") and "INDEX" not in match.group(2) and match.group(1) not in small:
+            found.append(detail)
+    return found
+
+def main():
+    db = SessionLocal()
+    try:
+        ids = seed(db)
+    finally:
+        db.close()
+    captured, errors = capture(ids)
+
+    failed = 0
+    with engine.connect() as conn:
+        for name, statements in captured.items():
+            for statement in explained(statements):
+                # پارامترها NULL هستند؛ برنامه اجرای SQLite به مقدار پارامترها بستگی ندارد
+                rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, (None,) * statement.count("?")).fetchall()
+                bad = problems(rows, FULL_SCANS.get(name, ()))
+                status = "FAIL" if bad else "ok"
+                print(f"{status:<5}{name}")
+                print(f"       {' '.join(statement.split())[:160]}")
+                for row in rows:
+                    print(f"         {row[-1]}")
+                failed += bool(bad)
+    for error in errors:
+        print(f"ERROR {error}")
+    if failed:
+        print(f"\n{failed} quer{'y' if failed == 1 else 'ies'} fall back to a full scan or temp sort")
+    if failed or errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
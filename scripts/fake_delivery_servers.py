@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# سرورهای جایگزین محلی برای ایمیل و پیامک (بدون ارسال واقعی)
+#
+# اجرا:
+#   python scripts/fake_delivery_servers.py --smtp-port 8025 --sms-port 8026
+#   EMAIL_TRANSPORT=smtp SMTP_PORT=8025 SMS_GATEWAY=http SMS_GATEWAY_URL=http://127.0.0.1:8026/sms uvicorn app:app
+#
+# SMTP با aiosmtpd پیام‌ها را فقط می‌شمارد؛ sink پیامک هر POST JSON را می‌پذیرد و 202 برمی‌گرداند.
+# --sms-fail-rate درصدی از درخواست‌ها را با 503 رد می‌کند تا retry در outbox قابل مشاهده باشد.
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aiosmtpd.controller import Controller
+
+class Stats:
+    def __init__(self):
+        self.emails = 0
+        self.sms = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class SinkHandler:
+    def __init__(self, stats: Stats, verbose: bool = False):
+        self.stats = stats
+        self.verbose = verbose
+
+    async def handle_DATA(self, server, session, envelope):
+        self.stats.add("emails")
+        if self.verbose:
+            print(f"[FAKE SMTP] {envelope.mail_from} -> {envelope.rcpt_tos}")
+        return "250 Message accepted"
+
+def sms_handler(stats: Stats, fail_rate: float, verbose: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if random.random() < fail_rate:
+                stats.add("rejected")
+                self._reply(503, b'{"error": "busy"}')
+                return
+            stats.add("sms")
+            if verbose:
+                print(f"[FAKE SMS] {json.loads(body)}")
+            self._reply(202, b'{"status": "queued"}')
+
+        def _reply(self, status: int, payload: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_servers(smtp_port: int = 0, sms_port: int = 0, sms_fail_rate: float = 0.0, verbose: bool = False):
+    # (stats, smtp_port, sms_port, stop) را برمی‌گرداند؛ پورت صفر یعنی پورت آزاد
+    stats = Stats()
+    if not smtp_port:
+        with ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler) as probe:
+            smtp_port = probe.server_address[1]
+    controller = Controller(SinkHandler(stats, verbose), hostname="127.0.0.1", port=smtp_port)
+    controller.start()
+    sms_server = ThreadingHTTPServer(("127.0.0.1", sms_port), sms_handler(stats, sms_fail_rate, verbose))
+    sms_server.daemon_threads = True
+    threading.Thread(target=sms_server.serve_forever, name="fake-sms", daemon=True).start()
+
+    def stop():
+        sms_server.shutdown()
+        sms_server.server_close()
+        controller.stop()
+
+    return stats, smtp_port, sms_server.server_address[1], stop
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--smtp-port", type=int, default=8025)
+    parser.add_argument("--sms-port", type=int, default=8026)
+    parser.add_argument("--sms-fail-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    stats, smtp_port, sms_port, stop = start_servers(args.smtp_port, args.sms_port, args.sms_fail_rate, args.verbose)
+    print(f"fake SMTP on 127.0.0.1:{smtp_port}, fake SMS on http://127.0.0.1:{sms_port}/sms (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"emails={stats.emails} sms={stats.sms} rejected={stats.rejected}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+
+if __name__ == "__main__":
+    main()